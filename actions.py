@@ -0,0 +1,126 @@
+"""
+actions.py - Background executor for side-effecting desktop actions.
+Handlers hand slow side effects (waiting for a window, typing, hotkeys, closing
+apps) to ActionExecutor and reply at once with a job ID. Actions sharing a key
+(usually the target app) run one after another in submission order; actions
+with different keys run in parallel on the worker pool.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import get_logger, request_id
+
+log = get_logger("actions")
+
+
+class Job:
+    def __init__(self, key, description):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.description = description
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.request_id = request_id.get()  # the request that queued it, for the logs
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "key": self.key,
+            "description": self.description,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "request_id": self.request_id,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class ActionExecutor:
+    def __init__(self, max_workers=4, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="aura-action")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        # key -> jobs waiting behind the one currently running for that key
+        self._queues = {}
+
+    def submit(self, key, func, *args, description=None):
+        """Queue func(*args) behind earlier actions with the same key; return the job ID."""
+        job = Job(key, description or func.__name__)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            if key is not None and key in self._queues:
+                self._queues[key].append((job, func, args))
+                return job.id
+            if key is not None:
+                self._queues[key] = deque()
+        self._pool.submit(self._run, job, func, args)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job finishes; return it (None if unknown)."""
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def _run(self, job, func, args):
+        token = request_id.set(job.request_id)
+        try:
+            self._execute(job, func, args)
+        finally:
+            request_id.reset(token)
+
+    def _execute(self, job, func, args):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = func(*args)
+            job.status = "done"
+        except Exception as e:
+            log.warning("action failed", job=job.id, action=job.description, error=str(e))
+            job.error = str(e)
+            job.status = "failed"
+        job.finished = time.time()
+        job.done.set()
+
+        if job.key is None:
+            return
+        with self._lock:
+            queue = self._queues[job.key]
+            if queue:
+                following = queue.popleft()
+            else:
+                del self._queues[job.key]
+                following = None
+        if following is not None:
+            self._pool.submit(self._run, *following)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_executor():
+    """Process-wide executor, so ordering per app holds across processors."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ActionExecutor()
+        return _default
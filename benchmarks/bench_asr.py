@@ -0,0 +1,155 @@
+"""
+bench_asr.py - Real-time factor and word error rate of the speech backends on
+the spoken-command fixtures in benchmarks/fixtures/asr (transcripts.tsv lists
+each WAV with its reference text). Reports model load time, RTF (processing
+time / audio duration), p50/p95 latency, time to first partial result and WER.
+Record the fixtures once with --record (reads each phrase from the microphone),
+or regenerate the committed ones with --synthesise (pyttsx3, resampled to 16 kHz).
+Run from the repo root: python benchmarks/bench_asr.py [--backend vosk --backend whisper]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import read_wav
+from recognizers import make_backend, NotUnderstood, RecognitionError
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "asr")
+SAMPLE_RATE = 16000
+PAD_SECONDS = 0.3  # silence either side of a synthesised phrase, as in a recording
+
+
+def load_manifest(directory):
+    entries = []
+    with open(os.path.join(directory, "transcripts.tsv"), encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not line.startswith("#"):
+                name, text = line.split("\t", 1)
+                entries.append((os.path.join(directory, name), text))
+    return entries
+
+
+def words(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + deletions + insertions)."""
+    ref, hyp = words(reference), words(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1], len(ref)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+
+def record(entries):
+    import speech_recognition as sr
+    recognizer = sr.Recognizer()
+    with sr.Microphone(sample_rate=16000) as source:
+        recognizer.adjust_for_ambient_noise(source, duration=1)
+        for path, text in entries:
+            input(f"Press Enter, then say: {text!r} ")
+            audio = recognizer.listen(source, timeout=8, phrase_time_limit=5)
+            with open(path, "wb") as f:
+                f.write(audio.get_wav_data(convert_rate=16000, convert_width=2))
+            print(f"  saved {os.path.basename(path)}")
+
+
+def synthesise(entries):
+    """Speak each phrase with the default pyttsx3 voice and save it as 16 kHz mono 16-bit."""
+    import numpy as np
+    import pyttsx3
+    engine = pyttsx3.init()
+    with tempfile.TemporaryDirectory() as directory:
+        for path, text in entries:
+            tmp = os.path.join(directory, "phrase.wav")
+            engine.save_to_file(text, tmp)
+            engine.runAndWait()
+            clip = read_wav(tmp)
+            samples = np.frombuffer(clip.frame_data, dtype=np.int16).astype(np.float64)
+            # Band-limited resample: keep the spectrum below the new Nyquist frequency
+            size = int(round(len(samples) * SAMPLE_RATE / clip.sample_rate))
+            spectrum = np.fft.rfft(samples)[:size // 2 + 1]
+            samples = np.fft.irfft(spectrum, size) * size / len(samples)
+            pad = np.zeros(int(PAD_SECONDS * SAMPLE_RATE))
+            samples = np.concatenate([pad, samples, pad])
+            with wave.open(path, "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(SAMPLE_RATE)
+                f.writeframes(np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes())
+            print(f"  saved {os.path.basename(path)} ({len(samples) / SAMPLE_RATE:.2f} s)")
+
+
+def run(name, entries):
+    backend = make_backend(name)
+    start = time.perf_counter()
+    backend.warm_up()
+    load = time.perf_counter() - start
+    latencies, first_partials, audio_seconds, errors, total_words = [], [], 0.0, 0, 0
+    for path, reference in entries:
+        clip = read_wav(path)
+        partial_at = []
+        start = time.perf_counter()
+        try:
+            text = backend.recognize(clip, on_partial=lambda t: partial_at or partial_at.append(time.perf_counter()))
+        except NotUnderstood:
+            text = ""
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        if partial_at:
+            first_partials.append(partial_at[0] - start)
+        audio_seconds += clip.duration
+        e, n = word_errors(reference, text)
+        errors += e
+        total_words += n
+        if e:
+            print(f"  {os.path.basename(path)}: heard {text!r}")
+    first = f"{percentile(first_partials, 50) * 1e3:.0f} ms" if first_partials else "n/a"
+    print(f"{name:<8} load {load:6.2f} s  RTF {sum(latencies) / audio_seconds:5.3f}  "
+          f"p50 {percentile(latencies, 50) * 1e3:6.0f} ms  p95 {percentile(latencies, 95) * 1e3:6.0f} ms  "
+          f"first partial {first}  WER {errors / total_words:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", action="append", help="google, vosk or whisper (repeatable; default AURA_ASR)")
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory with transcripts.tsv and the WAV files")
+    parser.add_argument("--record", action="store_true", help="record the fixtures from the microphone")
+    parser.add_argument("--synthesise", action="store_true", help="regenerate the fixtures with pyttsx3")
+    args = parser.parse_args()
+    entries = load_manifest(args.fixtures)
+    if args.record:
+        record(entries)
+        return
+    if args.synthesise:
+        synthesise(entries)
+        return
+    missing = [os.path.basename(path) for path, _ in entries if not os.path.exists(path)]
+    if missing:
+        sys.exit(f"{len(missing)} fixture WAVs missing from {args.fixtures} (e.g. {missing[0]}); "
+                 f"record them with --record or generate them with --synthesise")
+    print(f"{len(entries)} fixtures")
+    for name in args.backend or [None]:
+        try:
+            run(name or os.environ.get("AURA_ASR") or "google", entries)
+        except RecognitionError as e:
+            print(f"{name}: {e}")
+
+
+if __name__ == "__main__":
+    main()
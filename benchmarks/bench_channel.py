@@ -0,0 +1,206 @@
+"""
+bench_channel.py - Load test of the WebSocket command channel (wsserver.py)
+against the HTTP request-per-command path (POST /api/command) on the same
+server process. The server runs in a subprocess with the network lookup faked
+by a sleep (--slow seconds, a slow Wikipedia answer), so only local work is
+measured. Scenarios, each over HTTP keep-alive and over WebSocket:
+- fast commands from --clients concurrent clients, each in its own session,
+  one command at a time (what the UI does) and, for WebSocket, pipelined with
+  up to 16 in flight on one connection;
+- the same while one more client asks slow questions in its own session
+  (do fast commands wait behind it?);
+- an overload burst of slow questions beyond AURA_WS_MAX_QUEUE, showing how
+  many are refused with 503 instead of queueing.
+Run from the repo root: python benchmarks/bench_channel.py [--clients 8] [--commands 300]
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COMMANDS = ["add task water the plants", "show tasks", "what time is it", "tell me a joke",
+            "calculate 2 + 2 * 3", "read notes", "remind me to call mom", "show reminders"]
+PIPELINE_DEPTH = 16
+OVERLOAD_QUEUE = 128  # room for the pipelined scenario: 8 clients x 16
+
+
+def serve(args):
+    """Server side: fake the slow lookup, then run the async server mode."""
+    import server
+    import wsserver
+
+    def slow_lookup(query, sources=None):
+        time.sleep(args.slow)
+        return "wikipedia", f"{query} is a thing."
+
+    server.knowledge.lookup = slow_lookup
+    wsserver.main(["--host", "127.0.0.1", "--port", str(args.port), "--ws-port", str(args.ws_port)])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, env):
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--slow", str(args.slow),
+                             "--port", str(args.port), "--ws-port", str(args.ws_port)],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    for port in (args.port, args.ws_port):
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    proc.kill()
+                    raise SystemExit("server did not start")
+                time.sleep(0.1)
+    return proc
+
+
+def summary(label, latencies, elapsed, errors=0):
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1e3
+    extra = f"   errors {errors}" if errors else ""
+    print(f"  {label:<34}{len(latencies) / elapsed:8.0f} cmd/s   p50 {pick(0.5):7.2f} ms   p95 {pick(0.95):7.2f} ms"
+          f"   p99 {pick(0.99):7.2f} ms{extra}")
+
+
+# --- HTTP: one POST per command on a keep-alive connection per client ------------------
+
+def http_client(port, session, commands, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Content-Type": "application/json", "X-AURA-Session": session}
+    for command in commands:
+        start = time.perf_counter()
+        conn.request("POST", "/api/command", json.dumps({"command": command}), headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        errors[0] += response.status != 200
+    conn.close()
+
+
+def run_http(port, sessions_commands):
+    latencies, errors = [], [0]
+    threads = [threading.Thread(target=http_client, args=(port, session, commands, latencies, errors))
+               for session, commands in sessions_commands]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - start, errors[0]
+
+
+# --- WebSocket: one connection per client, depth commands in flight -------------------
+
+async def ws_client(port, session, commands, depth, latencies, errors):
+    from websockets.asyncio.client import connect
+
+    async with connect(f"ws://127.0.0.1:{port}/ws?session={session}", compression=None, max_queue=None) as ws:
+        sent = {}
+        window = asyncio.Semaphore(depth)
+
+        async def receive():
+            for _ in commands:
+                reply = json.loads(await ws.recv())
+                latencies.append(time.perf_counter() - sent.pop(reply["id"]))
+                errors[0] += "error" in reply
+                window.release()
+
+        receiver = asyncio.create_task(receive())
+        for n, command in enumerate(commands):
+            await window.acquire()
+            rid = f"{session}-{n}"
+            sent[rid] = time.perf_counter()
+            await ws.send(json.dumps({"id": rid, "command": command}))
+        await receiver
+
+
+def run_ws(port, sessions_commands, depth=1):
+    latencies, errors = [], [0]
+
+    async def clients():
+        await asyncio.gather(*(ws_client(port, session, commands, depth, latencies, errors)
+                               for session, commands in sessions_commands))
+
+    start = time.perf_counter()
+    asyncio.run(clients())
+    return latencies, time.perf_counter() - start, errors[0]
+
+
+# --- Scenarios ----------------------------------------------------------------------
+
+def fast_load(args, tag):
+    return [(f"{tag}{c}", [COMMANDS[(c + i) % len(COMMANDS)] for i in range(args.commands)])
+            for c in range(args.clients)]
+
+
+def throughput(args):
+    print(f"{args.clients} clients x {args.commands} fast commands:")
+    summary("HTTP POST per command", *run_http(args.port, fast_load(args, "h")))
+    summary("WebSocket, 1 in flight", *run_ws(args.ws_port, fast_load(args, "w")))
+    summary(f"WebSocket, {PIPELINE_DEPTH} in flight", *run_ws(args.ws_port, fast_load(args, "p"), PIPELINE_DEPTH))
+
+
+def with_slow_client(args):
+    questions = max(1, int(args.commands * 0.01 / args.slow))
+    print(f"same, while another session asks {questions} questions taking {args.slow * 1e3:.0f} ms each:")
+    for label, run, port in (("HTTP POST per command", run_http, args.port),
+                             ("WebSocket, 1 in flight", run_ws, args.ws_port)):
+        slow = threading.Thread(target=run, args=(port, [("slow" + label[0], ["what is a quasar"] * questions)]))
+        slow.start()
+        time.sleep(args.slow / 2)  # the slow question is already running
+        summary(label + " (fast clients)", *run(port, fast_load(args, "s" + label[0])))
+        slow.join()
+
+
+def overload(args):
+    burst = OVERLOAD_QUEUE * 2
+    print(f"overload: {burst} slow questions at once over WebSocket (AURA_WS_MAX_QUEUE={OVERLOAD_QUEUE}):")
+    load = [(f"o{c}", ["what is a pulsar"]) for c in range(burst)]
+    latencies, elapsed, errors = run_ws(args.ws_port, load)
+    print(f"  {burst - errors} answered, {errors} refused with 503 in {elapsed:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--commands", type=int, default=300, help="commands per client")
+    parser.add_argument("--slow", type=float, default=0.5, help="seconds the faked network lookup takes")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--ws-port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+        return
+    args.port, args.ws_port = free_port(), free_port()
+    env = dict(os.environ, AURA_DATA_DIR=tempfile.mkdtemp(prefix="aura-bench-channel-"), AURA_WARM_UP="0",
+               AURA_LOG_LEVEL="warning", AURA_WS_MAX_QUEUE=str(OVERLOAD_QUEUE))
+    proc = start_server(args, env)
+    try:
+        throughput(args)
+        with_slow_client(args)
+        overload(args)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+bench_close.py - Close latency with a few hundred unrelated processes running.
+Compares the old full process_iter() scan, the PID registry (app launched by
+AURA) and the incremental name index. Linux only: /bin/sleep copies stand in
+for desktop apps.
+Run from the repo root: python benchmarks/bench_close.py [num_processes]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+
+from processes import ProcessIndex, ProcessRegistry
+
+ROUNDS = 20
+
+
+def scan_close(exe_name):
+    # The old close_application: walk every process on each close
+    found = False
+    for proc in psutil.process_iter(['name']):
+        try:
+            if proc.info['name'] and proc.info['name'].lower() == exe_name.lower():
+                proc.terminate()
+                found = True
+        except Exception:
+            pass
+    return found
+
+
+def timed(label, launch, close):
+    samples = []
+    for _ in range(ROUNDS):
+        proc = launch()
+        time.sleep(0.01)
+        start = time.perf_counter()
+        close()
+        samples.append(time.perf_counter() - start)
+        proc.wait()
+    samples.sort()
+    print(f"{label:<22} median {samples[len(samples) // 2] * 1e3:7.2f} ms   max {samples[-1] * 1e3:7.2f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tmp = tempfile.mkdtemp()
+    target = os.path.join(tmp, "auratarget")
+    shutil.copy(shutil.which("sleep"), target)
+    background = [subprocess.Popen(["sleep", "600"]) for _ in range(count)]
+    try:
+        print(f"{len(psutil.pids())} processes running, {count} of them dummies")
+        registry = ProcessRegistry(ProcessIndex(max_age=0))
+        registry.index.refresh()
+
+        timed("full scan (before)", lambda: subprocess.Popen([target, "600"]),
+              lambda: scan_close("auratarget"))
+
+        def launch_registered():
+            proc = subprocess.Popen([target, "600"])
+            registry.register("target", proc)
+            return proc
+        timed("pid registry", launch_registered, lambda: registry.close("target"))
+
+        # Not launched through the registry: name index, diffed on every close here
+        timed("name index (diff)", lambda: subprocess.Popen([target, "600"]),
+              lambda: registry.close("other", "auratarget"))
+    finally:
+        for proc in background:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
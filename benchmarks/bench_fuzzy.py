@@ -0,0 +1,152 @@
+"""
+bench_fuzzy.py - Accuracy and latency of the fuzzy fallback classifier on the
+noisy transcripts in benchmarks/fixtures/noisy_commands.tsv (misheard commands
+paired with the clean command they should be handled as, plus out-of-scope
+phrases that should stay unrouted). Compares the regex router alone with the
+router plus fuzzy fallback across thresholds, with and without IDF weighting,
+and times classification per command, one at a time and in batches. "exact"
+counts commands whose corrected text is the clean command word for word.
+Run from the repo root: python benchmarks/bench_fuzzy.py
+"""
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzy import FuzzyClassifier
+from model import CommandProcessor
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "noisy_commands.tsv")
+THRESHOLDS = (0.55, 0.6, 0.65, 0.7, 0.75)
+ROUNDS = 200
+
+
+def load_corpus(path=CORPUS):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not line.startswith("#"):
+                noisy, clean = line.split("\t")
+                rows.append((noisy, None if clean == "-" else clean))
+    return rows
+
+
+def outcome(processor, cmd):
+    """What a command ends up doing: the intent, plus the app for open/close."""
+    intent, match = processor.router.route(cmd)
+    if intent is None:
+        return None
+    app = None
+    if intent.name in ("apps.open", "history.app_last_opened"):
+        app = match.group(1)
+    elif intent.name == "apps.close":
+        target = re.search(r'close (\w+)', cmd)
+        app = target.group(1) if target else None
+    return intent.name, app
+
+
+def resolve(processor, cmd, fuzzy=True):
+    """(outcome, command) process() would dispatch, without running the handler's side effects."""
+    result = outcome(processor, cmd)
+    if not fuzzy:
+        return result, cmd
+    if result is None:
+        intent, _, fixed = processor._fuzzy_route(cmd)
+        return (outcome(processor, fixed), fixed) if intent is not None else (None, cmd)
+    if result[0] not in ("apps.open", "apps.close"):
+        return result, cmd
+    intent, _, fixed = processor._fuzzy_route(cmd)
+    if intent is None:
+        return result, cmd
+    fixed_result = outcome(processor, fixed)
+    if not re.match(r'open|close', cmd) and intent.name != result[0]:
+        # Words before the verb were another command misheard
+        return fixed_result, fixed
+    if result[1] is not None and not processor._known_app(result[1]):
+        # An unknown app is only replaced by a known one, otherwise nothing is done
+        if fixed_result[0] == result[0] and processor._known_app(fixed_result[1]):
+            return fixed_result, fixed
+        return None, cmd
+    return result, cmd
+
+
+def evaluate(processor, rows, fuzzy=True):
+    correct = exact = in_scope = false_accepts = out_of_scope = 0
+    misses = []
+    with contextlib.redirect_stdout(io.StringIO()):  # silence [DEBUG] lines
+        for noisy, clean in rows:
+            got, command = resolve(processor, noisy, fuzzy)
+            if clean is None:
+                out_of_scope += 1
+                if got is not None:
+                    false_accepts += 1
+                    misses.append((noisy, got, None))
+            else:
+                in_scope += 1
+                expected = outcome(processor, clean)
+                if got == expected:
+                    correct += 1
+                    exact += command == clean
+                else:
+                    misses.append((noisy, got, expected))
+    return correct / in_scope, exact / in_scope, false_accepts / max(1, out_of_scope), misses
+
+
+def latency(classifier, commands, batch_size=None):
+    """Per-command classification times in microseconds, starting each round with a cold window cache."""
+    times = []
+    for _ in range(ROUNDS):
+        classifier._cache.clear()
+        if batch_size is None:
+            for command in commands:
+                start = time.perf_counter()
+                classifier.classify(command)
+                times.append((time.perf_counter() - start) * 1e6)
+        else:
+            for i in range(0, len(commands), batch_size):
+                batch = commands[i:i + batch_size]
+                start = time.perf_counter()
+                classifier.classify_batch(batch)
+                times.append((time.perf_counter() - start) * 1e6 / len(batch))
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.95)], times[-1]
+
+
+def main():
+    rows = load_corpus()
+    processor = CommandProcessor()
+    exemplars = tuple(processor._exemplars())
+    print(f"corpus: {sum(1 for _, c in rows if c)} noisy commands, {sum(1 for _, c in rows if not c)} out of scope;"
+          f" {len(processor.fuzzy.texts)} exemplars, {len(processor.fuzzy.vocab)} n-grams")
+
+    accuracy, exact, false_accepts, _ = evaluate(processor, rows, fuzzy=False)
+    print(f"router only            accuracy {accuracy:6.1%}   exact {exact:6.1%}   false accepts {false_accepts:6.1%}")
+    for idf in (False, True):
+        for threshold in THRESHOLDS:
+            processor._fuzzy = FuzzyClassifier(exemplars, threshold, idf=idf)
+            accuracy, exact, false_accepts, _ = evaluate(processor, rows)
+            print(f"+ fuzzy {'tf-idf' if idf else 'tf    '} >= {threshold:.2f} accuracy {accuracy:6.1%}"
+                  f"   exact {exact:6.1%}   false accepts {false_accepts:6.1%}")
+
+    processor._fuzzy = None  # back to the default classifier
+    accuracy, exact, false_accepts, misses = evaluate(processor, rows)
+    print(f"default ({processor.fuzzy.threshold}): accuracy {accuracy:.1%}, false accepts {false_accepts:.1%}; misses:")
+    for noisy, got, expected in misses:
+        print(f"  {noisy!r:34} -> {got}   expected {expected}")
+
+    start = time.perf_counter()
+    FuzzyClassifier(exemplars)
+    print(f"build: {(time.perf_counter() - start) * 1e3:.1f} ms")
+    commands = [noisy for noisy, _ in rows]
+    for label, batch_size in (("single", None), ("batch of 16", 16), ("whole corpus", len(commands))):
+        p50, p95, worst = latency(processor.fuzzy, commands, batch_size)
+        print(f"latency per command, {label:<13} p50 {p50:6.0f} us   p95 {p95:6.0f} us   max {worst:6.0f} us")
+
+
+if __name__ == "__main__":
+    main()
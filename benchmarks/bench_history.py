@@ -0,0 +1,110 @@
+"""
+bench_history.py - Command history: memory per entry, append cost at capacity and
+"what did I open today" lookups. Compares the old list of dicts trimmed with
+pop(0) against the CommandHistory ring buffer of __slots__ entries.
+Run from the repo root: python benchmarks/bench_history.py [capacity]
+"""
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import CommandHistory
+
+ROUNDS = 200000
+MEMORY_ENTRIES = 10000  # large enough that allocator free lists do not skew bytes/entry
+APPS = ["chrome", "notepad", "spotify", "word", "excel"]
+
+
+def commands(count):
+    now = datetime.datetime.now()
+    result = []
+    for i in range(count):
+        if i % 20 == 0:
+            app = APPS[i // 20 % len(APPS)]
+            result.append((f"open {app}", now, "apps.open", app))
+        else:
+            result.append((f"what is the capital of country {i}", now, "knowledge.question", None))
+    return result
+
+
+def fill_old(capacity, items):
+    history = []
+    for command, timestamp, intent, app in items:
+        history.append({'command': command, 'timestamp': timestamp, 'app_opened': None})
+        if app:
+            history[-1]['app_opened'] = app
+        if len(history) > capacity:
+            history.pop(0)
+    return history
+
+
+def fill_new(capacity, items):
+    history = CommandHistory(capacity)
+    for command, timestamp, intent, app in items:
+        entry = history.append(command, timestamp, intent)
+        if app:
+            history.set_app(entry, app)
+            history.set_undo(entry, ("close_app", app))
+    return history
+
+
+def memory_per_entry(fill, capacity):
+    # Commands and timestamps are created up front, so only the history's own
+    # containers (entries, slots, indexes, undo stack) are measured
+    items = commands(capacity)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    history = fill(capacity, items)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del history
+    return used / capacity
+
+
+def append_cost(fill, capacity):
+    items = commands(ROUNDS)
+    start = time.perf_counter()
+    fill(capacity, items)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def opened_today_old(history, since):
+    return [e['app_opened'] for e in reversed(history) if e['app_opened'] and e['timestamp'] >= since]
+
+
+def opened_today_new(history, since):
+    return [e.app for e in history.entries(intent="apps.open", since=since) if e.app]
+
+
+def query_cost(func, history, since, rounds=2000):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(history, since)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    capacities = [int(sys.argv[1])] if len(sys.argv) > 1 else [100, 10000]
+    since = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    print(f"bytes/entry ({MEMORY_ENTRIES} entries): list of dicts {memory_per_entry(fill_old, MEMORY_ENTRIES):.0f}"
+          f", ring buffer {memory_per_entry(fill_new, MEMORY_ENTRIES):.0f} (incl. indexes and undo stack)")
+    for capacity in capacities:
+        print(f"capacity {capacity}:")
+        print(f"  append (us)   list of dicts {append_cost(fill_old, capacity):7.2f}"
+              f"   ring buffer {append_cost(fill_new, capacity):7.2f}")
+        old, new = fill_old(capacity, commands(capacity)), fill_new(capacity, commands(capacity))
+        print(f"  opened today  list of dicts {query_cost(opened_today_old, old, since):7.1f} us"
+              f"   ring buffer {query_cost(opened_today_new, new, since):7.1f} us")
+        start = time.perf_counter()
+        undone = 0
+        while new.pop_undo()[0] is not None:
+            undone += 1
+        print(f"  undo all      {undone} actions in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
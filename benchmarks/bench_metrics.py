@@ -0,0 +1,133 @@
+"""
+bench_metrics.py - Cost of the always-on instrumentation: metric updates and
+structured log calls on their own, CommandProcessor.process with and without
+its histogram and log record, a Flask request with and without the metrics and
+request-ID hooks, and rendering /metrics. Logs go to /dev/null at info level.
+Run from the repo root: python benchmarks/bench_metrics.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AURA_DATA_DIR", tempfile.mkdtemp(prefix="aura-bench-metrics-"))
+
+import logs
+import metrics
+
+logs.configure(level="info", stream=open(os.devnull, "w"))
+
+import model
+import server
+
+ROUNDS = 100000
+COMMANDS = ["add task water the plants", "show tasks", "remind me to call mom", "read notes",
+            "what time is it", "tell me a joke", "calculate 2 + 2 * 3", "blah blah blah"]
+REQUESTS = 2000
+
+
+class NullMetric:
+    def labels(self, *values):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+class NullLogger:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def per_call(func, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def primitives():
+    registry = metrics.Registry()
+    count = registry.register(metrics.Counter("bench_total", "bench"))
+    labelled = registry.register(metrics.Counter("bench_labelled_total", "bench", ["intent"]))
+    hist = registry.register(metrics.Histogram("bench_seconds", "bench", ["intent"]))
+    log = logs.get_logger("bench")
+    print("primitive costs (us per call):")
+    for name, func in (
+            ("counter.inc()", lambda: count.inc()),
+            ("counter.labels(x).inc()", lambda: labelled.labels("tasks.show").inc()),
+            ("histogram.labels(x).observe()", lambda: hist.labels("tasks.show").observe(0.0012)),
+            ("log.debug() below level", lambda: log.debug("event", command="show tasks")),
+            ("log.info() as JSON", lambda: log.info("event", command="show tasks", intent="tasks.show"))):
+        print(f"  {name:<32}{per_call(func):8.2f}")
+
+
+def process_cost(processor, rounds=2000):
+    start = time.perf_counter()
+    for i in range(rounds):
+        processor.process(COMMANDS[i % len(COMMANDS)])
+        if i % 200 == 199:
+            processor.tasks.clear()
+            processor.notes.clear()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def command_overhead():
+    processor = model.CommandProcessor()
+    processor.warm_up(background=False)
+    process_cost(processor)  # warm caches and the fuzzy classifier
+    instrumented = min(process_cost(processor) for _ in range(5))
+    saved = model.COMMAND_SECONDS, model.COMMAND_ERRORS, model.log
+    model.COMMAND_SECONDS = model.COMMAND_ERRORS = NullMetric()
+    model.log = NullLogger()
+    try:
+        bare = min(process_cost(processor) for _ in range(5))
+    finally:
+        model.COMMAND_SECONDS, model.COMMAND_ERRORS, model.log = saved
+    print(f"process() per command: bare {bare:.1f} us, instrumented {instrumented:.1f} us"
+          f" (+{instrumented - bare:.1f} us, {(instrumented - bare) / bare:+.1%})")
+
+
+def request_cost(client):
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.get("/api/tasks")
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def request_overhead():
+    client = server.app.test_client()
+    request_cost(client)
+    instrumented = min(request_cost(client) for _ in range(5))
+    hooks = (server.app.before_request_funcs, server.app.after_request_funcs, server.app.teardown_request_funcs)
+    saved = [dict(h) for h in hooks]
+    for h in hooks:
+        h.clear()
+    try:
+        bare = min(request_cost(client) for _ in range(5))
+    finally:
+        for h, old in zip(hooks, saved):
+            h.update(old)
+    print(f"GET /api/tasks (test client): bare {bare:.0f} us, with hooks {instrumented:.0f} us"
+          f" (+{instrumented - bare:.0f} us, {(instrumented - bare) / bare:+.1%})")
+
+
+def render_cost():
+    text = metrics.REGISTRY.render()
+    series = sum(1 for line in text.splitlines() if not line.startswith("#"))
+    print(f"/metrics render: {per_call(metrics.REGISTRY.render, 200):.0f} us for {series} series")
+
+
+def main():
+    primitives()
+    command_overhead()
+    request_overhead()
+    render_cost()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+bench_pipeline.py - Serial voice loop vs the concurrent VoicePipeline, driven
+from WAV fixtures in real time (a clip "arrives" after its own duration, like a
+microphone) back to back. Recognition is a stand-in with a fixed round trip,
+speech is the fake TTS engine, and commands go through the real
+CommandProcessor. Reports p50/p95 per stage and end to end (speech captured ->
+first audio of the reply), and total wall time. Without barge-in the speaker is
+the bottleneck for back-to-back commands, so replies queue behind each other.
+Run from the repo root: python benchmarks/bench_pipeline.py [utterances]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import CommandProcessor
+from pipeline import VoicePipeline, LatencyStats, Turn, wav_source
+from speak import VoiceSpeaker, FakeEngine
+
+SECONDS_PER_WORD = 0.1  # fixture speech, 4x faster than real to keep the run short
+RECOGNISE_LATENCY = 0.25  # recogniser round trip per utterance
+WORDS_PER_SECOND = 12.0  # fake TTS speed
+COMMANDS = ["what time is it", "add task buy milk", "show tasks", "calculate 12 * 7",
+            "what's the date today", "remind me to call mom", "show reminders", "tell me a joke"]
+
+
+def make_fixtures(directory, count, rate=16000):
+    transcripts = {}
+    for i in range(count):
+        text = COMMANDS[i % len(COMMANDS)]
+        path = os.path.join(directory, f"utterance_{i:03d}.wav")
+        frames = int(len(text.split()) * SECONDS_PER_WORD * rate)
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(rate)
+            f.writeframes(b"\x00\x00" * frames)
+        transcripts[path] = text
+    return transcripts
+
+
+def make_recognize(transcripts):
+    def recognize(clip):
+        time.sleep(RECOGNISE_LATENCY)
+        return transcripts[clip.path]
+    return recognize
+
+
+def run_serial(paths, transcripts):
+    # The old main_voice loop: listen, recognise, process, then speak to the end
+    processor = CommandProcessor()
+    engine = FakeEngine(WORDS_PER_SECOND)
+    speaker = VoiceSpeaker(engine_factory=lambda: engine)
+    recognize = make_recognize(transcripts)
+    stats = LatencyStats()
+    start = time.perf_counter()
+    source = iter(wav_source(paths, realtime=True))
+    for turn_id in range(1, len(paths) + 1):
+        turn = Turn(turn_id)
+        t0 = time.perf_counter()
+        turn.audio = next(source)
+        t1 = time.perf_counter()
+        turn.text = recognize(turn.audio)
+        t2 = time.perf_counter()
+        turn.response = processor.process(turn.text)
+        t3 = time.perf_counter()
+        spoken = len(engine.spoken)
+        speaker.speak(turn.response)
+        time.sleep(0.15)
+        first_audio = engine.spoken[spoken][1] if len(engine.spoken) > spoken else time.perf_counter()
+        turn.stamps = {"capture": (t0, t1), "recognise": (t1, t2), "process": (t2, t3),
+                       "speak": (t3, first_audio)}
+        stats.add_turn(turn)
+    return stats, time.perf_counter() - start
+
+
+def run_pipeline(paths, transcripts, barge_in=False):
+    processor = CommandProcessor()
+    speaker = VoiceSpeaker(streaming=True, engine_factory=lambda: FakeEngine(WORDS_PER_SECOND), settle=0)
+    on_command = (lambda text: speaker.interrupt()) if barge_in else None
+    pipeline = VoicePipeline(wav_source(paths, realtime=True), make_recognize(transcripts),
+                             processor.process, speaker.say, on_command=on_command, keep_turns=len(paths))
+    start = time.perf_counter()
+    pipeline.run()
+    speaker.wait()
+    elapsed = time.perf_counter() - start
+    speaker.close()
+    assert [t.text for t in pipeline.turns] == [transcripts[p] for p in paths], "turns lost or reordered"
+    return pipeline.stats, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    directory = tempfile.mkdtemp(prefix="aura-wav-")
+    try:
+        transcripts = make_fixtures(directory, count)
+        paths = sorted(transcripts)
+        results = []
+        runs = (("serial loop", run_serial),
+                ("pipeline, replies queue up", run_pipeline),
+                ("pipeline with barge-in (as main_voice)", lambda p, t: run_pipeline(p, t, barge_in=True)))
+        for label, run in runs:
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats, elapsed = run(paths, transcripts)
+            results.append(f"{label}: {count} utterances in {elapsed:.2f} s\n{stats.report()}")
+        print("\n\n".join(results))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
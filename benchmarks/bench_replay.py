@@ -0,0 +1,456 @@
+"""
+bench_replay.py - Replays a corpus of a few thousand commands through
+CommandProcessor.process and through the Flask app with every side effect
+faked: webbrowser, subprocess.Popen, pyautogui, psutil and the HTTP session
+behind the knowledge lookups (answers, empty results and errors, instantly).
+The corpus (benchmarks/fixtures/replay_commands.tsv) pairs each command with
+the intent process() reports for it and covers every intent and handler branch
+plus empty, unknown and misheard commands. Reports throughput, p50/p99 latency
+and memory allocated per command for each intent, checks that every command
+still routes to its recorded intent, and compares against the stored baseline
+(benchmarks/baselines/replay.json), exiting 1 on a routing change or a
+slowdown beyond --tolerance. Timings are machine-specific: run with
+--save-baseline on your own machine before comparing.
+Run from the repo root: python benchmarks/bench_replay.py [--rounds N] [--save-baseline]
+(--generate rebuilds the corpus from the templates below)
+"""
+import argparse
+import collections
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import zlib
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AURA_DATA_DIR", tempfile.mkdtemp(prefix="aura-bench-replay-"))
+
+import logs
+
+logs.configure(stream=open(os.devnull, "w"))
+
+import model
+import processes
+import sampler
+from actions import ActionExecutor
+from cache import AnswerCache
+from lookup import KnowledgeLookup
+from model import CommandProcessor
+from processes import ProcessIndex, ProcessRegistry
+from sampler import SystemSampler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(HERE, "fixtures", "replay_commands.tsv")
+NOISY = os.path.join(HERE, "fixtures", "noisy_commands.tsv")
+BASELINE = os.path.join(HERE, "baselines", "replay.json")
+CORPUS_SIZE = 3000
+MIN_DELTA_US = 20  # slowdowns smaller than this are noise, whatever the ratio
+
+# --- Corpus -------------------------------------------------------------------
+
+SLOTS = {
+    "task": ["buy milk", "water the plants", "call the bank", "finish the report", "book flights",
+             "pay rent", "renew passport", "clean the garage", "email grandma", "fix the bike"],
+    "note": ["call mom", "take the bins out", "feed the cat", "pick up the dry cleaning",
+             "send the invoice", "stretch", "back up the laptop", "check the oven"],
+    "n": ["1", "2", "3", "4", "12", "40"],
+    "app": ["notepad", "calculator", "chrome", "spotify", "word", "excel", "powerpoint"],
+    "unknown_app": ["photoshop", "zoom", "slack", "steam", "vlc"],
+    "service": ["youtube", "maps", "github", "gmail", "netflix", "weather", "news"],
+    "text": ["hello world", "meeting notes", "shopping list", "dear sir"],
+    "song": ["lofi beats", "bohemian rhapsody", "jazz for work", "rain sounds"],
+    "topic": ["python", "alan turing", "the moon", "photosynthesis", "kyoto", "jazz", "volcanoes",
+              "the roman empire", "black holes", "honey bees", "chess", "the nile"],
+    "expr": ["2 + 2", "3 * (4 + 5)", "sqrt(16)", "2 ** 10", "17 / 4", "sin(pi / 2)", "100 - 7 * 3"],
+    "range": ["x squared for 1 to 100", "x * 2 for x from 1 to 5", "sqrt(x) for 1 to 1000"],
+    "bad_expr": ["foo(", "2 +", "import os"],
+    "huge_expr": ["10 ** 10 ** 10", "9 ** 999999", "10 ** 5000"],
+    "path": ["c:/tools/paint.exe", "c:/games/chess.exe", "/usr/bin/gimp"],
+    "name": ["paint", "chess", "gimp"],
+    "good": ["good", "great", "happy"], "bad": ["sad", "bad", "terrible"], "okay": ["okay", "fine", "alright"],
+    "junk": ["blah blah blah", "reticulate the splines", "purple monkey dishwasher", "xyzzy"],
+}
+
+TEMPLATES = [
+    "remind me to {note}", "remind me to", "read notes", "show reminders", "clear notes",
+    "add task {task}", "add task {task}", "add task", "show tasks", "list tasks",
+    "complete task {n}", "complete task", "clear tasks",
+    "add app path {path} as {name}", "add app path nowhere",
+    "how are you", "i am {good}", "i'm {bad}", "i am {okay}", "tell me a joke", "make me laugh",
+    "tell me a fun fact", "what do you like", "what are your hobbies", "what can you do",
+    "tell me about yourself", "what's your favorite color", "thanks", "thank you so much",
+    "hello", "hey there",
+    "what did i open", "which apps did i open today", "when did i last open {app}",
+    "open {app}", "open {app}", "open {app} and type {text}", "open comet", "open comet and search {topic}",
+    "open {unknown_app}", "open {service}", "open {service} and search {topic}", "open web service {service}",
+    "undo", "undo last {n}", "close", "close {app}", "close {unknown_app}",
+    "what time is it", "current time", "what date is it", "today's date",
+    "play {song}", "play {song} on youtube",
+    "new tab", "close tab", "close all tabs", "next tab", "previous tab",
+    "search {topic}", "search for {topic}", "wikipedia {topic}",
+    "what is {topic}", "who is {topic}", "how do {topic} work", "explain {topic}",
+    "goodbye", "calculate {expr}", "calculate {range}", "calculate {bad_expr}", "calculate {huge_expr}",
+    "system info", "{junk}", "", "...",
+]
+
+
+def generate_corpus(size=CORPUS_SIZE, seed=19):
+    """Commands drawn from the templates above plus the misheard commands in
+    noisy_commands.tsv, each paired with the intent process() reports for it."""
+    rng = random.Random(seed)
+    with open(NOISY, encoding="utf-8") as f:
+        noisy = [line.split("\t")[0] for line in f.read().splitlines() if line and not line.startswith("#")]
+    commands = []
+    for i in range(size):
+        if i % 10 == 9:
+            commands.append(rng.choice(noisy))
+            continue
+        template = rng.choice(TEMPLATES)
+        commands.append(template.format_map({k: rng.choice(v) for k, v in SLOTS.items()}))
+    with fake_side_effects():
+        processor = make_processor()
+        labelled = []
+        for command in commands:
+            processor.process(command)
+            labelled.append((processor._handled, command))
+    return labelled
+
+
+def load_corpus(path=CORPUS):
+    with open(path, encoding="utf-8") as f:
+        return [tuple(line.split("\t", 1)) for line in f.read().splitlines() if not line.startswith("#")]
+
+
+def save_corpus(corpus, path=CORPUS):
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("# intent\tcommand - generated by bench_replay.py --generate\n")
+        for intent, command in corpus:
+            f.write(f"{intent}\t{command}\n")
+
+
+# --- Fakes ----------------------------------------------------------------------
+
+class FakeBrowser:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def get(self, name):
+        return self
+
+    def open(self, url):
+        self.calls["webbrowser.open"] += 1
+        return True
+
+    def open_new_tab(self, url):
+        self.calls["webbrowser.open_new_tab"] += 1
+        return True
+
+
+class FakePopen:
+    calls = None
+    _next_pid = 40000
+
+    def __init__(self, args, *rest, **kwargs):
+        FakePopen.calls["subprocess.Popen"] += 1
+        FakePopen._next_pid += 1
+        self.pid = FakePopen._next_pid
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = -15
+
+
+def fake_pyautogui(calls):
+    module = types.ModuleType("pyautogui")
+    for name in ("write", "press", "hotkey"):
+        module.__dict__[name] = lambda *args, _name=name, **kwargs: calls.update([f"pyautogui.{_name}"])
+    return module
+
+
+class FakeProcess:
+    def __init__(self, pid, name):
+        self.pid = pid
+        self._name = name
+
+    def name(self):
+        return self._name
+
+    def terminate(self):
+        pass
+
+    def cpu_percent(self, interval=None):
+        return 1.5
+
+    def memory_info(self):
+        return types.SimpleNamespace(rss=80 * 2 ** 20)
+
+    def num_threads(self):
+        return 12
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+
+class FakePsutil:
+    """The slice of psutil that sampler.py and processes.py use, over a fixed process table."""
+    Error = type("Error", (Exception,), {})
+
+    def __init__(self, calls):
+        self.calls = calls
+        names = ["notepad.exe", "chrome.exe", "Spotify.exe", "WINWORD.EXE", "explorer.exe", "svchost.exe"]
+        self.table = {1000 + i: names[i % len(names)] for i in range(300)}
+
+    def pids(self):
+        self.calls["psutil.pids"] += 1
+        return list(self.table)
+
+    def Process(self, pid):
+        return FakeProcess(pid, self.table.get(pid, "python.exe"))
+
+    def pid_exists(self, pid):
+        return pid in self.table
+
+    def cpu_percent(self, interval=None):
+        self.calls["psutil.cpu_percent"] += 1
+        return 12.5
+
+    def virtual_memory(self):
+        return types.SimpleNamespace(percent=48.0)
+
+    def disk_usage(self, path):
+        return types.SimpleNamespace(percent=61.0)
+
+
+class FakeResponse:
+    def __init__(self, status, data):
+        self.status = status
+        self.data = data
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise OSError(f"{self.status} Server Error")
+
+    def json(self):
+        return self.data
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Answers lookups at once; the query's hash picks an answer, an empty result or an error."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls["http.get"] += 1
+        query = params.get("q") or params.get("gsrsearch")
+        kind = zlib.crc32(f"{url}|{query}".encode()) % 4
+        if kind == 3:
+            return FakeResponse(503, None)
+        if kind == 2:
+            return FakeResponse(200, {})
+        text = (f"{query.capitalize()} is a subject with a long history. It has been studied for centuries. "
+                f"Many books describe it in detail.")
+        if "duckduckgo" in url:
+            data = {"Abstract": text} if kind == 0 else {"RelatedTopics": [{"Text": text}]}
+        else:
+            data = {"query": {"pages": {"1": {"extract": text}}}}
+        return FakeResponse(200, data)
+
+
+@contextlib.contextmanager
+def fake_side_effects():
+    """Patch out every desktop, system and network side effect; yields a Counter of calls to the fakes."""
+    calls = collections.Counter()
+    FakePopen.calls = calls
+    psutil = FakePsutil(calls)
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(model, "webbrowser", FakeBrowser(calls)))
+        stack.enter_context(mock.patch("subprocess.Popen", FakePopen))
+        # pyautogui is imported inside the handlers; patch.dict would also drop every module imported meanwhile
+        saved = sys.modules.get("pyautogui")
+        sys.modules["pyautogui"] = fake_pyautogui(calls)
+        stack.callback(lambda: sys.modules.pop("pyautogui") if saved is None else sys.modules.update(pyautogui=saved))
+        stack.enter_context(mock.patch.object(sampler, "psutil", psutil))
+        stack.enter_context(mock.patch.object(processes, "psutil", psutil))
+        # Skip the handlers' waits for windows to appear; only model.py's, as the store's flusher sleeps too
+        no_sleep = types.SimpleNamespace(**dict(vars(time), sleep=lambda seconds: None))
+        stack.enter_context(mock.patch.object(model, "time", no_sleep))
+        stack.enter_context(mock.patch.object(KnowledgeLookup, "session", property(lambda self: FakeSession(calls))))
+        yield calls
+
+
+def make_processor():
+    cache = AnswerCache(path=None)
+    return CommandProcessor(answer_cache=cache, knowledge=KnowledgeLookup(cache=cache),
+                            sampler=SystemSampler(), processes=ProcessRegistry(ProcessIndex()),
+                            actions=ActionExecutor())
+
+
+# --- Replay -----------------------------------------------------------------------
+
+def replay_direct(corpus, rounds):
+    """Per-intent latencies (seconds) over `rounds` fresh processors, after one warm-up pass."""
+    latencies = collections.defaultdict(list)
+    mismatches = []
+    elapsed = 0.0
+    for round_ in range(rounds + 1):
+        processor = make_processor()
+        start = time.perf_counter()
+        for intent, command in corpus:
+            t0 = time.perf_counter()
+            processor.process(command)
+            if round_:
+                latencies[intent].append(time.perf_counter() - t0)
+            elif processor._handled != intent:
+                mismatches.append((command, intent, processor._handled))
+        if round_:
+            elapsed += time.perf_counter() - start
+    return latencies, len(corpus) * rounds / elapsed, mismatches
+
+
+def replay_allocations(corpus):
+    """Per-intent bytes allocated at peak while each command runs, traced by tracemalloc."""
+    allocated = collections.defaultdict(list)
+    processor = make_processor()
+    for _, command in corpus[:200]:  # warm caches outside the trace
+        processor.process(command)
+    processor = make_processor()
+    tracemalloc.start()
+    try:
+        for intent, command in corpus:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            processor.process(command)
+            allocated[intent].append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return allocated
+
+
+def replay_flask(corpus, rounds):
+    """Per-intent latencies of POST /api/command through the Flask test client, one session per round."""
+    import server
+    server.answer_cache = AnswerCache(path=None)  # keep fake answers out of aura_cache.db
+    server.knowledge = KnowledgeLookup(cache=server.answer_cache)
+    client = server.app.test_client()
+    latencies = collections.defaultdict(list)
+    elapsed = 0.0
+    for round_ in range(rounds + 1):
+        headers = {"X-AURA-Session": f"replay-{os.getpid()}-{round_}"}
+        start = time.perf_counter()
+        for intent, command in corpus:
+            t0 = time.perf_counter()
+            client.post("/api/command", json={"command": command}, headers=headers)
+            if round_:
+                latencies[intent].append(time.perf_counter() - t0)
+        if round_:
+            elapsed += time.perf_counter() - start
+    return latencies, len(corpus) * rounds / elapsed
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(latencies, throughput, allocated=None):
+    intents = {}
+    for intent, times in sorted(latencies.items()):
+        intents[intent] = {"count": len(times), "p50_us": round(percentile(times, 0.5) * 1e6, 1),
+                           "p99_us": round(percentile(times, 0.99) * 1e6, 1)}
+        if allocated is not None:
+            intents[intent]["alloc_kib"] = round(percentile(allocated[intent], 0.5) / 1024, 1)
+    return {"throughput": round(throughput, 1), "intents": intents}
+
+
+# --- Report -------------------------------------------------------------------------
+
+def report(label, result, baseline, tolerance):
+    """Print one mode's table next to its baseline; returns the regressions found."""
+    regressions = []
+    base = (baseline or {}).get(label)
+    print(f"\n{label}: {result['throughput']:.0f} commands/s" +
+          (f" (baseline {base['throughput']:.0f})" if base else ""))
+    if base and result["throughput"] < base["throughput"] / (1 + tolerance):
+        regressions.append(f"{label} throughput {result['throughput']:.0f}/s < baseline {base['throughput']:.0f}/s")
+    has_alloc = any("alloc_kib" in row for row in result["intents"].values())
+    print(f"  {'intent':<26}{'n':>6}{'p50 us':>10}{'p99 us':>10}" + (f"{'alloc KiB':>11}" if has_alloc else "") +
+          ("   p50 vs baseline" if base else ""))
+    for intent, row in result["intents"].items():
+        line = f"  {intent:<26}{row['count']:>6}{row['p50_us']:>10.1f}{row['p99_us']:>10.1f}"
+        if has_alloc:
+            line += f"{row['alloc_kib']:>11.1f}"
+        old = base and base["intents"].get(intent)
+        if old:
+            change = row["p50_us"] / old["p50_us"] - 1 if old["p50_us"] else 0.0
+            flag = change > tolerance and row["p50_us"] - old["p50_us"] > MIN_DELTA_US
+            line += f"   {change:+7.1%}{'  REGRESSION' if flag else ''}"
+            if flag:
+                regressions.append(f"{label} {intent} p50 {old['p50_us']:.0f} -> {row['p50_us']:.0f} us")
+        elif base:
+            line += "   (new)"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rounds", type=int, default=3, help="timed passes over the corpus per mode")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/throughput slowdown")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE}")
+    parser.add_argument("--generate", action="store_true", help=f"rebuild {CORPUS} from the templates")
+    args = parser.parse_args()
+
+    if args.generate:
+        save_corpus(generate_corpus())
+    corpus = load_corpus()
+    with fake_side_effects() as calls:
+        latencies, throughput, mismatches = replay_direct(corpus, args.rounds)
+        direct = summarize(latencies, throughput, replay_allocations(corpus))
+        latencies, throughput = replay_flask(corpus, args.rounds)
+        flask = summarize(latencies, throughput)
+
+    routed = set(direct["intents"])
+    unreached = [it.name for it in CommandProcessor.router.intents if it.name not in routed]
+    print(f"corpus: {len(corpus)} commands, {len(routed)} distinct outcomes; "
+          f"intents never handled: {', '.join(unreached) or 'none'}")
+    print("calls to the fakes: " + ", ".join(f"{name} {count}" for name, count in sorted(calls.items())))
+
+    baseline = None
+    if os.path.exists(BASELINE) and not args.save_baseline:
+        with open(BASELINE, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"baseline: {baseline['machine']}, Python {baseline['python']}")
+    regressions = [f"routing: {command!r} -> {got}, corpus says {expected}" for command, expected, got in mismatches]
+    regressions += report("direct", direct, baseline, args.tolerance)
+    regressions += report("flask", flask, baseline, args.tolerance)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+        with open(BASELINE, "w", encoding="utf-8", newline="\n") as f:
+            json.dump({"machine": f"{platform.system()} {platform.machine()}", "python": platform.python_version(),
+                       "corpus": len(corpus), "direct": direct, "flask": flask}, f, indent=1)
+            f.write("\n")
+        print(f"\nbaseline saved to {BASELINE}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
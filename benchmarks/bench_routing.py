@@ -0,0 +1,61 @@
+"""
+bench_routing.py - Per-command routing cost of the compiled intent router
+versus the old linear if/elif chain (one `in` test or re.search per branch).
+Run from the repo root: python benchmarks/bench_routing.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import CommandProcessor
+
+router = CommandProcessor.router
+
+HIT_FIRST = "remind me to buy milk"
+HIT_LATE = "system info"
+MISS = "please reticulate the splines before lunch"
+
+# One command per branch, for an average over the whole chain.
+CORPUS = [
+    "remind me to call mom", "show reminders", "clear notes", "add task buy milk",
+    "show tasks", "complete task 2", "clear tasks", "add app path c:/x.exe as x",
+    "how are you", "i am happy", "i am sad", "i am fine", "tell me a joke",
+    "tell me a fun fact", "what are your hobbies", "what can you do",
+    "what's your favorite color", "thanks", "hello there", "open notepad",
+    "undo", "close chrome", "what time is it", "what date is it",
+    "play lofi beats", "new tab", "search weather tomorrow", "wikipedia python",
+    "what is gravity", "goodbye", "calculate 2 + 2", "system info", MISS,
+]
+
+
+def linear_route(cmd):
+    # What the old chain did: test every branch in order, looking each
+    # pattern up in the re module cache on every call.
+    for it in router.intents:
+        for kw in it.keywords:
+            if kw in cmd:
+                return it
+        for p in it.patterns:
+            if re.search(p.pattern, cmd):
+                return it
+        if cmd in it.exact:
+            return it
+    return None
+
+
+def bench(label, func, cmd, number=20000):
+    best = min(timeit.repeat(lambda: func(cmd), number=number, repeat=5))
+    print(f"{label:<8} {cmd!r:<50} {best / number * 1e6:8.2f} us/command")
+
+
+if __name__ == "__main__":
+    for cmd in (HIT_FIRST, HIT_LATE, MISS):
+        assert (linear_route(cmd) or None) is router.route(cmd)[0]
+        bench("before", linear_route, cmd)
+        bench("after", router.route, cmd)
+    for label, func in (("before", linear_route), ("after", router.route)):
+        best = min(timeit.repeat(lambda: [func(c) for c in CORPUS], number=2000, repeat=5))
+        print(f"{label:<8} {'mean over corpus':<50} {best / 2000 / len(CORPUS) * 1e6:8.2f} us/command")
@@ -0,0 +1,62 @@
+"""
+bench_sessions.py - Load test for per-session processors in server.py.
+Many simulated clients, each with its own X-AURA-Session, add tasks and read
+them back concurrently through the Flask app. Checks that no session sees
+another's tasks and reports throughput for 1 vs N client threads.
+Run from the repo root: python benchmarks/bench_sessions.py [sessions] [commands_per_session]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the simulated sessions' stores out of the real data directory
+os.environ.setdefault('AURA_DATA_DIR', tempfile.mkdtemp(prefix='aura-bench-'))
+
+import server
+
+
+def client_run(session_id, commands, errors):
+    client = server.app.test_client()
+    headers = {'X-AURA-Session': session_id}
+    for i in range(commands):
+        client.post('/api/command', json={'command': f'add task {session_id} item {i}'}, headers=headers)
+    text = client.post('/api/command', json={'command': 'show tasks'}, headers=headers).get_json()['response']
+    lines = text.splitlines()[1:]
+    if len(lines) != commands or any(session_id not in line for line in lines):
+        errors.append(session_id)
+
+
+def run(num_sessions, commands, threads):
+    server.sessions.max_sessions = max(server.sessions.max_sessions, num_sessions)
+    errors = []
+    ids = [f"bench-{threads}-{n}" for n in range(num_sessions)]
+    start = time.perf_counter()
+    if threads == 1:
+        for session_id in ids:
+            client_run(session_id, commands, errors)
+    else:
+        workers = [threading.Thread(target=client_run, args=(sid, commands, errors)) for sid in ids]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    elapsed = time.perf_counter() - start
+    total = num_sessions * (commands + 1)
+    return (f"{threads:>4} client thread(s): {total} requests in {elapsed:6.2f} s "
+            f"= {total / elapsed:8.0f} req/s, isolation failures: {len(errors)}")
+
+
+if __name__ == "__main__":
+    num_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    commands = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"sessions: {num_sessions}, commands per session: {commands}")
+    for threads in (1, num_sessions):
+        # Silence the processor's per-command debug prints
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = run(num_sessions, commands, threads)
+        print(report)
@@ -0,0 +1,174 @@
+"""
+bench_speculation.py - Perceived latency with and without speculative routing
+on interim transcripts (speculate.py), replaying commands from the replay
+corpus (benchmarks/fixtures/replay_commands.tsv) as speech.
+Each command is "spoken" one word every --word-ms, and every --interim-ms the
+recogniser's interim transcript so far (ending in a partial word, as browser
+recognisers report it) is sent to processor.speculator. The final transcript
+arrives --final-delay ms after the last word, as a recogniser waits for
+silence before finalising. A --revise share of utterances has its last
+interims misheard, so the final command differs and the speculative work must
+be discarded. Side effects are
+faked as in bench_replay.py, with each network lookup taking --lookup-ms.
+Perceived latency is from the final transcript to the response, compared with
+process() on the final transcript alone, for questions, list/system reads and
+everything else; also reports how often speculation was committed and how many
+extra handler runs and lookups it cost.
+Run from the repo root: python benchmarks/bench_speculation.py [--utterances 40] [--users 4]
+"""
+import argparse
+import collections
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_replay import fake_side_effects, load_corpus, make_processor
+
+import speculate
+
+GROUPS = {
+    "questions": {"knowledge.question", "knowledge.wikipedia"},
+    "list and system reads": {"tasks.show", "notes.show", "system.info"},
+}
+OTHER = "everything else"
+
+
+def group_of(intent):
+    for group, intents in GROUPS.items():
+        if intent in intents:
+            return group
+    return OTHER
+
+
+def pick_utterances(corpus, per_group, rng):
+    by_group = collections.defaultdict(list)
+    for intent, command in corpus:
+        if intent != "empty" and command.strip():
+            by_group[group_of(intent)].append(command)
+    picked = []
+    for group in list(GROUPS) + [OTHER]:
+        for command in rng.sample(by_group[group], min(per_group, len(by_group[group]))):
+            picked.append((group, command))
+    rng.shuffle(picked)
+    return picked
+
+
+def interims(command, rng, args):
+    """(time, transcript) of each interim result while command is spoken; the last word is sometimes misheard."""
+    words = command.split()
+    if rng.random() < args.revise:
+        words[-1] = words[-1][:-1] or "uh"
+    timeline = []
+    elapsed = args.interim_ms
+    total = len(words) * args.word_ms
+    while elapsed < total:
+        spoken, partial = divmod(elapsed, args.word_ms)
+        word = words[int(spoken)]
+        heard = words[:int(spoken)] + [word[:max(1, round(len(word) * partial / args.word_ms))]]
+        timeline.append((elapsed, " ".join(heard)))
+        elapsed += args.interim_ms
+    timeline.append((total, " ".join(words)))
+    return timeline
+
+
+class CountingLookup:
+    """Stands in for KnowledgeLookup.lookup: every call takes seconds, as an uncached web answer would."""
+
+    def __init__(self, lookup, seconds, counts):
+        self.lookup = lookup
+        self.seconds = seconds
+        self.counts = counts
+
+    def __call__(self, query, sources=None):
+        self.counts["lookups"] += 1
+        time.sleep(self.seconds)
+        return self.lookup(query, sources)
+
+
+def user(utterances, args, speculative, results, counts, seed):
+    rng = random.Random(seed)
+    processor = make_processor()
+    processor.knowledge.lookup = CountingLookup(processor.knowledge.lookup, args.lookup_ms / 1e3, counts)
+    processor._speculator = speculate.Speculator(processor, settle=args.settle / 1e3)
+    for group, command in utterances:
+        timeline = interims(command, rng, args)
+        if speculative:
+            said = 0.0
+            for at, text in timeline:
+                time.sleep((at - said) / 1e3)
+                said = at
+                processor.speculator.interim(text)
+            time.sleep(args.final_delay / 1e3)
+        start = time.perf_counter()
+        response = processor.process(command)
+        results.append((group, command, time.perf_counter() - start, response))
+
+
+def run(utterances, args, speculative):
+    results, counts = [], collections.Counter()
+    shares = [utterances[i::args.users] for i in range(args.users)]
+    threads = [threading.Thread(target=user, args=(share, args, speculative, results, counts, 22 + i))
+               for i, share in enumerate(shares)]
+    before = outcome_counts()
+    with fake_side_effects():
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    after = outcome_counts()
+    return results, counts, {outcome: after[outcome] - before.get(outcome, 0) for outcome in after}
+
+
+def outcome_counts():
+    return {values[0]: child.value for values, child in speculate.SPECULATIONS._children.items()}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--utterances", type=int, default=40, help="utterances per group")
+    parser.add_argument("--users", type=int, default=4, help="concurrent speakers, each with its own processor")
+    parser.add_argument("--word-ms", type=float, default=350.0, help="speech rate (350 ms ~ 170 words a minute)")
+    parser.add_argument("--interim-ms", type=float, default=120.0, help="how often interim results arrive")
+    parser.add_argument("--final-delay", type=float, default=600.0, help="silence before the final transcript")
+    parser.add_argument("--lookup-ms", type=float, default=500.0, help="time a network answer takes")
+    parser.add_argument("--settle", type=float, default=speculate.SETTLE_SECONDS * 1e3,
+                        help="how long an interim must stay the newest before its handler starts")
+    parser.add_argument("--revise", type=float, default=0.1, help="share of utterances whose last word is misheard")
+    args = parser.parse_args()
+    utterances = pick_utterances(load_corpus(), args.utterances, random.Random(22))
+    print(f"{len(utterances)} utterances, {args.users} speakers, a word every {args.word_ms:.0f} ms,"
+          f" interims every {args.interim_ms:.0f} ms, final {args.final_delay:.0f} ms after the last word, lookups {args.lookup_ms:.0f} ms,"
+          f" {args.revise:.0%} with a misheard last interim (settle {args.settle:.0f} ms)")
+
+    baseline, base_counts, _ = run(utterances, args, speculative=False)
+    spec, spec_counts, outcomes = run(utterances, args, speculative=True)
+
+    print(f"\nperceived latency, final transcript -> response (ms):")
+    print(f"  {'':<24}{'final only p50/p95':>22}{'speculative p50/p95':>24}{'saved p50':>12}")
+    for group in list(GROUPS) + [OTHER]:
+        base = [t for g, _, t, _ in baseline if g == group]
+        fast = [t for g, _, t, _ in spec if g == group]
+        print(f"  {group:<24}{percentile(base, 0.5):11.1f} /{percentile(base, 0.95):7.1f}"
+              f"{percentile(fast, 0.5):13.1f} /{percentile(fast, 0.95):7.1f}"
+              f"{percentile(base, 0.5) - percentile(fast, 0.5):12.1f}")
+
+    expected = {command: response for g, command, _, response in baseline if g == "questions"}
+    wrong = sum(1 for g, command, _, response in spec if g == "questions" and response != expected[command])
+    committed = outcomes.get("committed", 0)
+    print(f"\nspeculation: {committed} committed, {outcomes.get('discarded', 0)} started and discarded,"
+          f" {outcomes.get('skipped', 0)} interims superseded before starting")
+    print(f"network lookups: {base_counts['lookups']} final only, {spec_counts['lookups']} speculative"
+          f" ({spec_counts['lookups'] - base_counts['lookups']:+d}); answers differing from final-only: {wrong}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+bench_startup.py - Import-time breakdown and time-to-first-response.
+Runs `python -X importtime` for model and server and prints the slowest
+imports, then measures wall time from interpreter launch to the first
+answered command for CommandProcessor() and for the Flask app.
+Run from the repo root: python benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+FIRST_RESPONSE = {
+    "CommandProcessor()": (
+        "from model import CommandProcessor\n"
+        "print(CommandProcessor().process('add task buy milk'), flush=True)\n"
+    ),
+    "server.py": (
+        "import server\n"
+        "r = server.app.test_client().post('/api/command', json={'command': 'add task buy milk'})\n"
+        "print(r.get_json()['response'], flush=True)\n"
+    ),
+}
+
+
+def import_breakdown(module, top=12):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line.split("|")
+        try:
+            rows.append((int(parts[1]), int(parts[0].split(":")[1]), parts[2].rstrip()))
+        except (IndexError, ValueError):
+            continue
+    rows.sort(reverse=True)
+    print(f"\n-X importtime for 'import {module}' (cumulative / self, microseconds)")
+    for cumulative, self_us, name in rows[:top]:
+        print(f"  {cumulative:>9} {self_us:>9}  {name}")
+
+
+def first_response(label, code):
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for line in proc.stdout:
+            if not line.startswith("[DEBUG]"):
+                break
+        samples.append(time.perf_counter() - start)
+        proc.kill()
+        proc.wait()
+    samples.sort()
+    print(f"{label:<20} time to first response: median {samples[len(samples) // 2] * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    for module in ("model", "server"):
+        import_breakdown(module)
+    print()
+    for label, code in FIRST_RESPONSE.items():
+        first_response(label, code)
@@ -0,0 +1,59 @@
+"""
+bench_store.py - Write throughput and startup replay time of the op-log store.
+Appends N history/task operations through CommandProcessor-shaped records,
+then measures replay from the raw log and from snapshot + short log tail.
+Run from the repo root: python benchmarks/bench_store.py [num_ops]
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import OpLogStore
+
+
+def write_ops(directory, count, compact_every):
+    store = OpLogStore(directory, compact_every=compact_every)
+    state = store.load()
+    store.attach(lambda: state)
+    now = datetime.datetime.now()
+    start = time.perf_counter()
+    for i in range(count):
+        if i % 10 == 0:
+            state["tasks"].append({"task": f"task {i}", "completed": False})
+            store.record("task_add", task=f"task {i}")
+        else:
+            store.record("history_add", hseq=i + 1, command=f"what is item {i}", timestamp=now)
+    store.sync()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return elapsed
+
+
+def replay(directory):
+    start = time.perf_counter()
+    state = OpLogStore(directory).load()
+    return time.perf_counter() - start, state
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for label, compact_every in (("log only", count * 10), ("with snapshots", 10000)):
+        directory = tempfile.mkdtemp(prefix="aura-store-")
+        try:
+            elapsed = write_ops(directory, count, compact_every)
+            size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+            replay_time, state = replay(directory)
+            print(f"{label:<15} {count} ops: write {count / elapsed:9.0f} ops/s, "
+                  f"on disk {size / 1e6:6.2f} MB, replay {replay_time * 1e3:7.1f} ms "
+                  f"({len(state['tasks'])} tasks)")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+bench_textindex.py - Build time, memory and query latency of the offline
+knowledge index (textindex.py) at a million documents.
+Writes a synthetic JSONL.gz corpus shaped like Wikipedia abstracts (Zipf
+word frequencies, two-sentence bodies, two- or three-word titles), streams it
+into a fresh index and reports documents per second, peak RSS growth during
+the build (flat, since nothing is held in memory) and the index size. Then
+times TextIndex.search for exact titles, title words in another order, words
+from an abstract's body, a single very common word, and misses.
+Run from the repo root: python benchmarks/bench_textindex.py [--docs N] [--corpus DUMP]
+(--corpus indexes a real abstracts dump or JSONL file instead of the synthetic one)
+"""
+import argparse
+import gzip
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textindex import TextIndex, read_documents
+
+VOCABULARY = 50000
+QUERIES = 1000
+SYLLABLES = ["ka", "lo", "mi", "ren", "to", "sa", "vel", "dor", "an", "qui", "ber", "ux", "zel", "po", "ti",
+             "mar", "eth", "go", "lin", "sha"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES, rng.integers(2, 5))))
+    return sorted(words, key=lambda w: rng.random())
+
+
+def write_corpus(path, docs, rng):
+    """Synthetic abstracts; returns the (title, body words) of a sample of documents to query for."""
+    words = vocabulary(VOCABULARY, rng)
+    ranks = np.arange(1, VOCABULARY + 1)
+    p = 1.0 / ranks ** 1.07
+    p /= p.sum()
+    sample_every = max(1, docs // (QUERIES * 2))
+    samples = []
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as f:
+        for start in range(0, docs, 10000):
+            count = min(10000, docs - start)
+            lengths = rng.integers(25, 60, count)
+            body = rng.choice(VOCABULARY, lengths.sum(), p=p)
+            titles = rng.integers(500, VOCABULARY, (count, 3))  # titles use rarer words
+            offset = 0
+            for i in range(count):
+                doc_words = [words[w] for w in body[offset:offset + lengths[i]]]
+                offset += lengths[i]
+                title_words = [words[w].capitalize() for w in titles[i][:2 + i % 2]]
+                half = len(doc_words) // 2
+                text = " ".join(doc_words[:half]).capitalize() + ". " + " ".join(doc_words[half:]).capitalize() + "."
+                f.write(json.dumps({"title": " ".join(title_words), "text": text}) + "\n")
+                if (start + i) % sample_every == 0:
+                    samples.append((title_words, doc_words))
+    return words, samples
+
+
+def percentiles(times):
+    times = sorted(times)
+    pick = lambda q: times[min(len(times) - 1, int(len(times) * q))] * 1e3
+    return f"p50 {pick(0.5):6.2f} ms   p95 {pick(0.95):6.2f} ms   p99 {pick(0.99):6.2f} ms   max {times[-1] * 1e3:6.2f} ms"
+
+
+def time_queries(index, label, questions):
+    index.search(questions[0])
+    times = []
+    hits = 0
+    for question in questions:
+        start = time.perf_counter()
+        hits += index.search(question) is not None
+        times.append(time.perf_counter() - start)
+    print(f"  {label:<22} {percentiles(times)}   hits {hits / len(questions):5.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--docs", type=int, default=1000000)
+    parser.add_argument("--corpus", help="an abstracts dump or JSONL file to index instead")
+    args = parser.parse_args()
+    rng = np.random.default_rng(20)
+    workdir = tempfile.mkdtemp(prefix="aura-bench-textindex-")
+    try:
+        run(args, rng, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, rng, workdir):
+    corpus = args.corpus
+    words = samples = None
+    if corpus is None:
+        corpus = os.path.join(workdir, "abstracts.jsonl.gz")
+        start = time.perf_counter()
+        words, samples = write_corpus(corpus, args.docs, rng)
+        print(f"corpus: {args.docs} synthetic abstracts, {os.path.getsize(corpus) / 2 ** 20:.0f} MiB gzipped,"
+              f" written in {time.perf_counter() - start:.0f} s")
+
+    index = TextIndex(os.path.join(workdir, "knowledge.db"))
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    added = index.build(read_documents(corpus))
+    elapsed = time.perf_counter() - start
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    size = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir)
+               if name.startswith("knowledge.db"))
+    print(f"build: {added} documents in {elapsed:.0f} s ({added / elapsed:.0f} docs/s),"
+          f" peak RSS +{rss_growth:.0f} MiB, index {size / 2 ** 20:.0f} MiB")
+
+    print(f"query latency over {QUERIES} questions each:")
+    if samples is None:
+        # A real dump: ask for the titles of a spread of its documents
+        titles = [title for n, (title, _) in enumerate(read_documents(corpus)) if n % 97 == 0][:QUERIES]
+        time_queries(index, "who is <title>", [f"who is {title}" for title in titles])
+        return
+    picked = [samples[i] for i in rng.choice(len(samples), QUERIES)]
+    time_queries(index, "exact title", [f"who is {' '.join(title)}" for title, _ in picked])
+    time_queries(index, "title words reordered", [f"what is {' '.join(reversed(title))}" for title, _ in picked])
+    time_queries(index, "two body words", [f"explain {body[3]} {body[-4]}" for _, body in picked])
+    time_queries(index, "one very common word", [f"what is {words[i]}" for i in rng.integers(0, 20, QUERIES)])
+    time_queries(index, "miss", [f"what is {''.join(rng.choice(SYLLABLES, 6))}" for _ in range(QUERIES)])
+
+
+if __name__ == "__main__":
+    main()
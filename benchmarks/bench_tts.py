@@ -0,0 +1,92 @@
+"""
+bench_tts.py - Blocking vs sentence-streaming speech on a fake TTS engine (no
+audio device needed). Reports how long the caller is blocked, time to first
+audio, total speaking time and barge-in latency, and checks that streamed
+speech says every sentence in order.
+Run from the repo root: python benchmarks/bench_tts.py [words_per_second]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speak import VoiceSpeaker, FakeEngine, speech_chunks
+
+SYNTH_PER_WORD = 0.002  # assumed synthesis cost before a text starts playing
+
+REPLIES = {
+    "short": "The time is 04:10 PM.",
+    "wikipedia": (
+        "A galaxy is a system of stars, stellar remnants, interstellar gas, dust, and dark matter "
+        "bound together by gravity. The word is derived from the Greek galaxias, literally milky, "
+        "a reference to the Milky Way galaxy that contains the Solar System. Galaxies range in size "
+        "from dwarfs with less than a thousand stars to the largest known supergiants with one "
+        "hundred trillion stars."),
+    "capabilities": "\n".join([
+        "I can help you with many things!",
+        " System Control: I can open and close applications on your computer",
+        " Web Navigation: I can open websites and search the internet",
+        " Information: I can tell you the time, date, and system status",
+        " Task Management: I can maintain your to-do list and set reminders",
+        " Knowledge: I can search Wikipedia and answer questions",
+        "Feel free to ask me to help with any of these tasks!",
+    ]),
+}
+
+
+def blocking(text, wps):
+    engine = FakeEngine(wps, SYNTH_PER_WORD)
+    speaker = VoiceSpeaker(engine_factory=lambda: engine)
+    start = time.perf_counter()
+    speaker.speak(text)
+    blocked = time.perf_counter() - start
+    first = engine.spoken[0][1] - start
+    return blocked, first, blocked
+
+
+def streaming(text, wps):
+    engine = FakeEngine(wps, SYNTH_PER_WORD)
+    speaker = VoiceSpeaker(streaming=True, engine_factory=lambda: engine, settle=0)
+    speaker.say("warm up")
+    speaker.wait()
+    engine.spoken.clear()
+    start = time.perf_counter()
+    utterance = speaker.say(text)
+    blocked = time.perf_counter() - start
+    utterance.wait()
+    total = utterance.finished - start
+    spoken = [t for t, _, _, done in engine.spoken if done]
+    assert spoken == speech_chunks(text), "streamed speech lost or reordered sentences"
+    speaker.close()
+    return blocked, engine.spoken[0][1] - start, total
+
+
+def barge_in(text, wps, after=0.3):
+    engine = FakeEngine(wps, SYNTH_PER_WORD)
+    speaker = VoiceSpeaker(streaming=True, engine_factory=lambda: engine, settle=0)
+    utterance = speaker.say(text)
+    time.sleep(after)
+    start = time.perf_counter()
+    speaker.interrupt()
+    speaker.wait()
+    silent = engine.spoken[-1][2] - start
+    cut = sum(1 for _ in engine.spoken) < len(utterance.chunks)
+    speaker.close()
+    return max(silent, 0.0), utterance.cancelled and cut
+
+
+def main():
+    wps = float(sys.argv[1]) if len(sys.argv) > 1 else 30.0  # 10x a typical 3 words/s
+    print(f"fake engine at {wps:g} words/s, {SYNTH_PER_WORD * 1e3:g} ms/word synthesis")
+    print(f"{'reply':<13}{'mode':<11}{'blocked ms':>11}{'first audio ms':>16}{'total ms':>10}")
+    for name, text in REPLIES.items():
+        for mode, run in (("blocking", blocking), ("streaming", streaming)):
+            blocked, first, total = run(text, wps)
+            print(f"{name:<13}{mode:<11}{blocked * 1e3:11.1f}{first * 1e3:16.2f}{total * 1e3:10.1f}")
+    latency, cancelled = barge_in(REPLIES["wikipedia"], wps)
+    print(f"barge-in: silent {latency * 1e3:.2f} ms after interrupt(), rest of reply dropped: {cancelled}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+bench_ttscache.py - Time to first audio of fixed replies with and without the
+speech cache, on a fake TTS engine and player (no audio device needed). The
+CommandProcessor's static replies are prewarmed into a temporary cache, then
+every reply is spoken once by an uncached and once by a cached speaker; also
+reports prewarm cost, barge-in on cached audio and LRU eviction under a size limit.
+Run from the repo root: python benchmarks/bench_ttscache.py [synth_ms_per_word]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logs
+from speak import VoiceSpeaker, FakeEngine, FakePlayer
+from ttscache import AudioCache
+from model import CommandProcessor
+
+WORDS_PER_SECOND = 30.0  # 10x a typical 3 words/s, to keep the run short
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100.0 * len(values)))]
+
+
+def make_speaker(synth, cache=None):
+    engine = FakeEngine(WORDS_PER_SECOND, synth)
+    player = FakePlayer()
+    speaker = VoiceSpeaker(streaming=True, engine_factory=lambda: engine, settle=0,
+                           cache=cache, player_factory=lambda: player)
+    return speaker, engine, player
+
+
+def wait_rendered(speaker, cache, count):
+    while speaker._renders or len(cache) < count:
+        time.sleep(0.005)
+
+
+def first_audio(replies, speaker, engine, player):
+    """Seconds from say() to the start of the first sentence's audio, per reply."""
+    delays = []
+    for text in replies:
+        engine.spoken.clear()
+        player.played.clear()
+        utterance = speaker.say(text)
+        utterance.wait()
+        starts = [s[1] for s in engine.spoken] + [p[1] for p in player.played]
+        delays.append(min(starts) - utterance.queued)
+    return delays
+
+
+def main():
+    synth = (float(sys.argv[1]) if len(sys.argv) > 1 else 10.0) / 1000.0
+    logs.configure(level="warning")
+    replies = CommandProcessor().static_responses()
+    print(f"{len(replies)} static replies, fake engine at {WORDS_PER_SECOND:g} words/s, "
+          f"{synth * 1e3:g} ms/word synthesis")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AudioCache(os.path.join(directory, "full"))
+        speaker, engine, player = make_speaker(synth, cache)
+        start = time.perf_counter()
+        sentences = speaker.prewarm(replies)
+        wait_rendered(speaker, cache, sentences)
+        print(f"prewarm: {sentences} sentences in {time.perf_counter() - start:.2f} s, "
+              f"{cache.size / 1024:.0f} KiB on disk")
+
+        plain = make_speaker(synth)
+        results = {"uncached": first_audio(replies, *plain), "cached": first_audio(replies, speaker, engine, player)}
+        synthesised = len(engine.spoken)
+        print(f"{'speaker':<10}{'first audio p50 ms':>20}{'p95 ms':>10}{'max ms':>10}")
+        for name, delays in results.items():
+            print(f"{name:<10}{percentile(delays, 50) * 1e3:20.2f}{percentile(delays, 95) * 1e3:10.2f}"
+                  f"{max(delays) * 1e3:10.2f}")
+        print(f"sentences synthesised by the cached speaker: {synthesised}")
+
+        # Barge-in while a cached reply plays
+        utterance = speaker.say(max(replies, key=len))
+        utterance.started.wait()
+        time.sleep(0.05)
+        stop = time.perf_counter()
+        speaker.interrupt()
+        while not player.played or player.played[-1][3]:
+            time.sleep(0.001)
+        print(f"barge-in on cached audio: silent {(player.played[-1][2] - stop) * 1e3:.2f} ms after interrupt()")
+        speaker.close()
+        plain[0].close()
+
+        # LRU: a cache with room for about half the sentences keeps the most recently played
+        limit = cache.size // 2
+        small = AudioCache(os.path.join(directory, "small"), max_bytes=limit)
+        speaker, engine, player = make_speaker(0.0, small)
+        speaker.prewarm(replies)
+        while speaker._renders:
+            time.sleep(0.005)
+        speaker.say(replies[-1]).wait()
+        reopened = AudioCache(small.directory, max_bytes=limit)
+        print(f"LRU at {limit / 1024:.0f} KiB: kept {len(small)} of {sentences} sentences "
+              f"({small.size / 1024:.0f} KiB), last reply played from cache: {len(player.played) > 0}, "
+              f"{len(reopened)} found again after a restart")
+        speaker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+bench_wakeword.py - False accepts, false rejects and CPU cost of the wake-word
+spotter (wakeword.py) on streaming audio.
+Fixture audio is synthesised by default: a formant synthesiser (harmonics of a
+pitch contour shaped by three moving formants, noise for fricatives and stop
+bursts) speaks "aura" and command-like sentences full of sound-alikes
+("more", "error", "arrow", "era", "story", "tomorrow"; words that contain the
+whole wake word, like "laura", need the recogniser to tell apart and are left
+out). Templates are enrolled from ENROL_COUNT renditions by one speaker in the
+same noise; the stream has the same
+speaker (each rendition with its own pitch, rate and formant jitter) and other
+speakers, saying the wake word alone, the wake word followed by a command, and
+commands without it, with pauses, over pink noise at --snr. With --fixtures DIR
+the audio is recorded mono 16-bit 16 kHz WAVs instead: DIR/enrol/*.wav (the wake
+word alone), DIR/wake/*.wav (utterances starting with it) and DIR/other/*.wav.
+Reports the spotter's CPU time per second of audio, false-reject rate and
+false accepts per hour over a threshold sweep (the default marked), how long
+after the wake word a detection comes, and how many recogniser calls WakeGate
+saves behind the endpointer (vad.py).
+Run from the repo root: python benchmarks/bench_wakeword.py [--minutes 10] [--snr 15] [--fixtures DIR]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import logs
+import vad
+import wakeword
+
+logs.configure(level="warning")
+
+RATE = 16000
+ENROL_COUNT = wakeword.ENROL_COUNT
+CHUNK = RATE * vad.FRAME_MS // 1000
+LATE_SECONDS = 0.3  # a detection this long after the wake word ends still counts
+
+# F1, F2, F3 (Hz), relative level, duration (ms) for voiced sounds
+VOICED = {
+    "aa": (730, 1090, 2440, 1.0, 120), "ao": (570, 840, 2410, 1.0, 130), "ah": (640, 1190, 2390, 1.0, 90),
+    "ax": (500, 1500, 2500, 0.8, 80), "iy": (270, 2290, 3010, 0.9, 110), "ih": (390, 1990, 2550, 0.9, 80),
+    "eh": (530, 1840, 2480, 1.0, 90), "ae": (660, 1720, 2410, 1.0, 120), "uw": (300, 870, 2240, 0.9, 110),
+    "uh": (440, 1020, 2240, 0.9, 80), "ow": (450, 800, 2620, 1.0, 120), "er": (490, 1350, 1690, 0.9, 120),
+    "ay": (660, 1500, 2500, 1.0, 150), "r": (420, 1300, 1600, 0.7, 60), "l": (360, 1000, 2700, 0.6, 60),
+    "w": (300, 700, 2200, 0.6, 50), "y": (280, 2200, 2900, 0.6, 50), "m": (250, 1000, 2200, 0.3, 70),
+    "n": (250, 1700, 2600, 0.3, 60), "ng": (250, 2000, 2700, 0.3, 60), "z": (250, 1700, 2600, 0.3, 70),
+}
+# Frequency band (Hz), level, duration (ms) for noise; stops are a closure then a burst
+UNVOICED = {"s": ((4000, 7500), 0.35, 100), "sh": ((2000, 5000), 0.35, 100), "f": ((1000, 7000), 0.12, 90),
+            "h": ((500, 3000), 0.1, 60), "th": ((1500, 7000), 0.1, 80)}
+STOPS = {"t": (3000, 6000), "k": (1500, 3500), "p": (500, 2000), "d": (2500, 5000), "g": (1200, 3000),
+         "b": (300, 1500)}
+
+WAKE = ["ao", "r", "ax"]
+WORDS = {
+    "for": "f ao r", "more": "m ao r", "error": "eh r er", "arrow": "ae r ow", "era": "ih r ax", "morning": "m ao r n ih ng",
+    "story": "s t ao r iy", "sorry": "s aa r iy", "what": "w ah t", "time": "t ay m", "is": "ih z", "it": "ih t",
+    "show": "sh ow", "tasks": "t ae s k s", "open": "ow p ax n", "music": "m y uw z ih k", "the": "th ax",
+    "weather": "w eh th er", "add": "ae d", "note": "n ow t", "call": "k ao l", "mom": "m aa m",
+    "remind": "r iy m ay n d", "me": "m iy", "to": "t uw", "play": "p l ay", "hello": "h ax l ow",
+    "all": "ao l", "right": "r ay t", "tomorrow": "t ax m aa r ow", "borrow": "b aa r ow", "or": "ao r",
+}
+SOUND_ALIKES = ["for", "more", "error", "arrow", "era", "morning", "story",
+                "sorry", "all", "borrow", "tomorrow", "or"]
+COMMAND_WORDS = [w for w in WORDS if w not in SOUND_ALIKES]
+
+
+class Speaker:
+    def __init__(self, rng, f0=None, formants=None, rate=None):
+        self.rng = rng
+        self.f0 = f0 or rng.uniform(95, 240)
+        self.formants = formants or rng.uniform(0.9, 1.15)
+        self.rate = rate or rng.uniform(0.85, 1.2)
+
+    def say(self, phonemes):
+        """int16-range float samples of one breath group."""
+        rng = self.rng
+        f0 = self.f0 * rng.uniform(0.92, 1.08)
+        scale = self.formants * rng.uniform(0.97, 1.03)
+        rate = self.rate * rng.uniform(0.85, 1.15)
+        targets, pieces = [], []
+        for p in phonemes:
+            if p in VOICED:
+                f1, f2, f3, level, ms = VOICED[p]
+                n = int(ms / rate * RATE / 1000 * rng.uniform(0.85, 1.15))
+                targets.append((len(pieces), (f1 * scale, f2 * scale, f3 * scale, level), n))
+                pieces.append(("voiced", n))
+            elif p in UNVOICED:
+                band, level, ms = UNVOICED[p]
+                pieces.append(("noise", int(ms / rate * RATE / 1000), band, level))
+            else:
+                pieces.append(("closure", int(0.04 / rate * RATE)))
+                pieces.append(("noise", int(0.015 * RATE), STOPS[p], 0.3))
+        total = sum(p[1] for p in pieces)
+        out = np.zeros(total)
+        # Formant tracks: targets at each voiced sound's middle, linear in between
+        starts = np.cumsum([0] + [p[1] for p in pieces[:-1]])
+        centres = [starts[i] + n // 2 for i, _, n in targets]
+        values = np.array([v for _, v, _ in targets])
+        t = np.arange(total)
+        tracks = [np.interp(t, centres, values[:, k]) for k in range(4)]
+        pitch = f0 * (1 + 0.1 * np.sin(np.pi * t / total)) * (1 - 0.15 * t / total)
+        phase = 2 * np.pi * np.cumsum(pitch) / RATE
+        voicing = np.zeros(total)
+        for (kind, n, *rest), start in zip(pieces, starts):
+            if kind == "voiced":
+                ramp = min(n // 4, int(0.015 * RATE))
+                envelope = np.ones(n)
+                envelope[:ramp] = np.linspace(0, 1, ramp)
+                envelope[n - ramp:] = np.linspace(1, 0, ramp)
+                voicing[start:start + n] = envelope
+            elif kind == "noise":
+                band, level = rest
+                spectrum = np.fft.rfft(np.random.default_rng(rng.randrange(2 ** 32)).standard_normal(n))
+                freqs = np.fft.rfftfreq(n, 1 / RATE)
+                spectrum[(freqs < band[0]) | (freqs > band[1])] = 0
+                burst = np.fft.irfft(spectrum, n)
+                out[start:start + n] += burst / (np.abs(burst).max() + 1e-9) * level * np.hanning(n)
+        voiced = np.zeros(total)
+        for k in range(1, int(5000 / f0) + 1):
+            f = k * pitch
+            gain = sum(weight / (1 + ((f - tracks[i]) / (60 + 0.06 * tracks[i])) ** 2)
+                       for i, weight in enumerate((1.0, 0.6, 0.3)))
+            voiced += gain * np.sin(k * phase) / np.sqrt(k)
+        voiced *= tracks[3] * voicing
+        out += voiced / (np.abs(voiced).max() + 1e-9)
+        return out * 8000
+
+
+def pink(rng, n):
+    spectrum = np.fft.rfft(np.random.default_rng(rng.randrange(2 ** 32)).standard_normal(n))
+    spectrum /= np.sqrt(np.maximum(np.arange(len(spectrum)), 1))
+    return np.fft.irfft(spectrum, n)
+
+
+def rms(x):
+    return float(np.sqrt(np.mean(np.square(x)))) or 1e-9
+
+
+def sentence(rng, with_alikes=True):
+    words = rng.sample(COMMAND_WORDS, rng.randint(2, 4))
+    if with_alikes:
+        for _ in range(rng.randint(1, 2)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(SOUND_ALIKES))
+    return words
+
+
+def in_noise(rng, samples, speech_level, snr):
+    background = pink(rng, len(samples))
+    noisy = samples + background * speech_level / rms(background) / 10 ** (snr / 20)
+    return np.clip(noisy, -32768, 32767).astype("<i2")
+
+
+def synthetic_stream(minutes, snr, seed):
+    """(samples, enrolment clips, wake words as (start, end, by the enrolled speaker))"""
+    rng = random.Random(seed)
+    user = Speaker(rng, f0=130, formants=1.0, rate=1.0)
+    others = [Speaker(rng) for _ in range(6)]
+    # Enrolment is recorded in the same room, so with the same background
+    pad = np.zeros(int(0.3 * RATE))
+    enrol = [np.concatenate([pad, user.say(WAKE), pad]) for _ in range(ENROL_COUNT)]
+    parts, wakes, offset = [], [], 0
+    while offset < minutes * 60 * RATE:
+        gap = np.zeros(int(rng.uniform(0.6, 2.0) * RATE))
+        parts.append(gap)
+        offset += len(gap)
+        speaker = user if rng.random() < 0.6 else rng.choice(others)
+        roll = rng.random()
+        if roll < 0.35:
+            words = [] if roll < 0.12 else sentence(rng, with_alikes=False)
+            audio = speaker.say(WAKE)
+            wakes.append((offset / RATE, (offset + len(audio)) / RATE, speaker is user))
+            if words:
+                audio = np.concatenate([audio, np.zeros(int(rng.uniform(0.05, 0.25) * RATE)),
+                                        speaker.say(" ".join(WORDS[w] for w in words).split())])
+        else:
+            audio = speaker.say(" ".join(WORDS[w] for w in sentence(rng)).split())
+        audio *= 10 ** (rng.uniform(-6, 3) / 20)
+        parts.append(audio)
+        offset += len(audio)
+    samples = np.concatenate(parts + [np.zeros(RATE)])
+    level = rms(samples[np.abs(samples) > 100])
+    return in_noise(rng, samples, level, snr), [in_noise(rng, e, level, snr) for e in enrol], wakes
+
+
+def read_fixture(path):
+    with wave.open(path, "rb") as f:
+        if f.getnchannels() != 1 or f.getsampwidth() != 2 or f.getframerate() != RATE:
+            raise SystemExit(f"{path}: expected mono 16-bit {RATE} Hz")
+        return np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+
+
+def recorded_stream(directory, seed):
+    """The recorded clips in a shuffled stream with pauses; a wake word is the first second of a wake clip."""
+    rng = random.Random(seed)
+    listing = lambda sub: sorted(os.path.join(directory, sub, n) for n in os.listdir(os.path.join(directory, sub))
+                                 if n.endswith(".wav"))
+    enrol = [read_fixture(p) for p in listing("enrol")]
+    clips = [(p, True) for p in listing("wake")] + [(p, False) for p in listing("other")]
+    rng.shuffle(clips)
+    parts, wakes, offset = [], [], 0
+    for path, is_wake in clips:
+        gap = np.zeros(int(rng.uniform(0.6, 2.0) * RATE), "<i2")
+        audio = read_fixture(path)
+        parts += [gap, audio]
+        offset += len(gap)
+        if is_wake:
+            wakes.append((offset / RATE, offset / RATE + min(1.0, len(audio) / RATE), True))
+        offset += len(audio)
+    return np.concatenate(parts + [np.zeros(RATE, "<i2")]), enrol, wakes
+
+
+def fire(scores, threshold):
+    """Detection times for a threshold, with the spotter's refractory period."""
+    hop = wakeword.HOP_MS / 1000
+    window = wakeword.WINDOW_MS / 1000
+    quiet = int(wakeword.REFRACTORY_SECONDS / hop)
+    times, next_allowed = [], 0
+    for i in np.flatnonzero(scores < threshold):
+        if i >= next_allowed:
+            times.append(i * hop + window)
+            next_allowed = i + 1 + quiet
+    return times
+
+
+def score_detections(times, wakes):
+    """(false rejects by group, false accepts, delays after the wake word's end)"""
+    hit = set()
+    false_accepts, delays = 0, []
+    for t in times:
+        match = next((i for i, (start, end, _) in enumerate(wakes) if start <= t <= end + LATE_SECONDS), None)
+        if match is None:
+            false_accepts += 1
+        elif match not in hit:
+            hit.add(match)
+            delays.append(t - wakes[match][1])
+    missed = {True: 0, False: 0}
+    for i, (_, _, own) in enumerate(wakes):
+        missed[own] += i not in hit
+    return missed, false_accepts, delays
+
+
+def gate_counts(samples, spotter):
+    """Utterances the endpointer passes on, and how many WakeGate lets through to the recogniser."""
+    endpointer = vad.Endpointer(RATE)
+    gate = wakeword.WakeGate(spotter)
+    data = samples.tobytes()
+    utterances = admitted = 0
+    for offset in range(0, len(data), 2 * CHUNK):
+        pcm = data[offset:offset + 2 * CHUNK]
+        gate.listen(pcm)
+        for segment in endpointer.feed(pcm):
+            utterances += 1
+            admitted += gate.admit(segment) is not None
+    return utterances, admitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--minutes", type=float, default=10.0, help="length of the synthetic stream")
+    parser.add_argument("--snr", type=float, default=15.0, help="speech to pink noise, dB")
+    parser.add_argument("--fixtures", help="directory with enrol/, wake/ and other/ WAVs")
+    args = parser.parse_args()
+    if args.fixtures:
+        samples, enrol, wakes = recorded_stream(args.fixtures, 24)
+    else:
+        samples, enrol, wakes = synthetic_stream(args.minutes, args.snr, 24)
+    templates = [wakeword.template_from(clip) for clip in enrol]
+    seconds = len(samples) / RATE
+    negative_hours = (seconds - sum(end - start for start, end, _ in wakes)) / 3600
+    own = sum(1 for *_, o in wakes if o)
+    print(f"{seconds / 60:.1f} min of audio, {len(wakes)} wake words ({own} by the enrolled speaker),"
+          f" {len(templates)} templates of {sum(len(t) for t in templates) / len(templates):.0f} frames")
+
+    # CPU: the real streaming path in 20 ms chunks, as main_voice feeds it
+    spotter = wakeword.WakeWordSpotter(templates)
+    data = samples.tobytes()
+    spotter.feed(data[:2 * CHUNK])
+    start = time.process_time()
+    for offset in range(2 * CHUNK, len(data), 2 * CHUNK):
+        spotter.feed(data[offset:offset + 2 * CHUNK])
+    cpu = time.process_time() - start
+    print(f"\nCPU: {cpu / seconds * 1e3:.1f} ms per audio second (real-time factor {cpu / seconds:.4f})")
+
+    scores = wakeword.WakeWordSpotter(templates).scores(data)
+    print(f"\n  {'threshold':>9}{'FRR enrolled':>14}{'FRR others':>12}{'FA/hour':>9}{'delay p50 ms':>14}")
+    for threshold in sorted({4.0, 4.5, 5.0, 5.5, 6.0, 6.5, wakeword.DEFAULT_THRESHOLD}):
+        missed, false_accepts, delays = score_detections(fire(scores, threshold), wakes)
+        others = len(wakes) - own
+        mark = " (default)" if threshold == wakeword.DEFAULT_THRESHOLD else ""
+        delay = f"{np.median(delays) * 1e3:14.0f}" if delays else f"{'-':>14}"
+        print(f"  {threshold:9.2f}{missed[True] / max(own, 1):14.1%}"
+              f"{(missed[False] / others if others else 0):12.1%}{false_accepts / negative_hours:9.1f}{delay}{mark}")
+
+    utterances, admitted = gate_counts(samples, wakeword.WakeWordSpotter(templates))
+    print(f"\nrecogniser calls: {utterances} utterances from the endpointer, {admitted} after the wake-word gate"
+          f" ({len(wakes)} wake words in the audio)")
+
+
+if __name__ == "__main__":
+    main()
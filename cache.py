@@ -0,0 +1,130 @@
+"""
+cache.py - Persistent TTL/LRU cache for knowledge lookups (DuckDuckGo, Wikipedia).
+Answers are kept in a bounded in-memory LRU and written through to a SQLite
+file so they survive restarts. Each source has its own TTL; failed lookups are
+cached as None with a shorter negative TTL so an outage is not retried per call.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from logs import get_logger
+
+log = get_logger("cache")
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aura_cache.db')
+
+DEFAULT_TTLS = {
+    "duckduckgo": 24 * 3600,
+    "wikipedia": 7 * 24 * 3600,
+}
+DEFAULT_NEGATIVE_TTL = 5 * 60
+
+
+def normalize_query(query):
+    """Cache key for a query: lowercase, single-spaced, no trailing punctuation."""
+    query = re.sub(r'\s+', ' ', query.lower()).strip()
+    return query.rstrip('?.! ')
+
+
+class AnswerCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=512, ttls=None,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, default_ttl=3600):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.negative_ttl = negative_ttl
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS answers ("
+                    "source TEXT, key TEXT, value TEXT, expires REAL, "
+                    "PRIMARY KEY (source, key))")
+                self._db.execute("DELETE FROM answers WHERE expires < ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning("answer cache disabled on disk", error=str(e))
+                self._db = None
+
+    def get(self, source, query):
+        """Return (found, value); value is None for a cached failure."""
+        key = (source, normalize_query(query))
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires FROM answers WHERE source = ? AND key = ?", key).fetchone()
+                if row:
+                    entry = row
+                    self._remember(key, entry)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    self._forget(key)
+                self.misses += 1
+                return False, None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            if entry[0] is None:
+                self.negative_hits += 1
+            return True, entry[0]
+
+    def put(self, source, query, value):
+        """Store an answer; a None value is cached with the negative TTL."""
+        key = (source, normalize_query(query))
+        ttl = self.negative_ttl if value is None else self.ttls.get(source, self.default_ttl)
+        entry = (value, time.time() + ttl)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (source, key, value, expires) VALUES (?, ?, ?, ?)",
+                    key + entry)
+                self._db.commit()
+
+    def cached(self, source, query, fetch):
+        """Return the cached answer for query, calling fetch(query) on a miss."""
+        found, value = self.get(source, query)
+        if found:
+            return value
+        value = fetch(query) or None
+        self.put(source, query, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "entries": len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _forget(self, key):
+        self._memory.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM answers WHERE source = ? AND key = ?", key)
+            self._db.commit()
@@ -0,0 +1,194 @@
+"""
+calculator.py - Safe arithmetic engine for the "calculate" command.
+Expressions are parsed with ast, checked against a whitelist of nodes and math
+functions, and compiled once into a tree of closures kept in an LRU cache.
+Evaluation enforces hard limits on exponent size, integer bit-length and time,
+so input like 9**9**9 is rejected instead of pinning a CPU core. The bit-length
+limit keeps results under Python's 4300-digit limit for converting ints to text. A compiled
+expression can also be evaluated over a NumPy range of x values.
+"""
+import ast
+import math
+import operator
+import re
+import time
+from functools import lru_cache
+
+from lazy import LazyModule
+
+np = LazyModule("numpy")
+
+
+class CalculatorError(ValueError):
+    """The expression is invalid, unsupported or exceeds a cost limit."""
+
+
+class LimitExceeded(CalculatorError):
+    """The expression would be too expensive to evaluate."""
+
+
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+VARIABLES = ("x",)
+
+FUNCTIONS = {
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "sinh": math.sinh, "cosh": math.cosh, "tanh": math.tanh,
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log,
+    "log10": math.log10, "log2": math.log2, "floor": math.floor,
+    "ceil": math.ceil, "fabs": math.fabs, "degrees": math.degrees,
+    "radians": math.radians, "hypot": math.hypot, "abs": abs, "round": round,
+}
+# NumPy names for the vectorised backend where they differ from math's
+NUMPY_FUNCTIONS = {"asin": "arcsin", "acos": "arccos", "atan": "arctan"}
+
+BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+UNARY = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+_WORDS = [
+    (r'\bto the power of\b', '**'), (r'\bsquared\b', '**2'), (r'\bcubed\b', '**3'),
+    (r'\bmultiplied by\b', '*'), (r'\btimes\b', '*'), (r'\bdivided by\b', '/'),
+    (r'\bplus\b', '+'), (r'\bminus\b', '-'), (r'\bmod(?:ulo)?\b', '%'),
+]
+
+
+def normalize_expression(text):
+    """Turn spoken arithmetic into Python syntax ("2 x 3", "x squared", "2^8")."""
+    expr = text.strip().lower().replace('×', '*').replace('÷', '/').replace('^', '**')
+    for pattern, repl in _WORDS:
+        expr = re.sub(pattern, repl, expr)
+    # "x" between numbers is multiplication; elsewhere it is the variable
+    expr = re.sub(r'(?<=[\d)])\s*x\s*(?=[\d(])', '*', expr)
+    return re.sub(r'\s+', ' ', expr).strip()
+
+
+class _Env:
+    __slots__ = ("x", "vector", "deadline")
+
+    def __init__(self, x, vector, deadline):
+        self.x = x
+        self.vector = vector
+        self.deadline = deadline
+
+
+class Calculator:
+    def __init__(self, max_length=200, max_nodes=100, max_exponent=10000,
+                 max_bits=14000, time_limit=0.05, max_points=100000, cache_size=256):
+        self.max_length = max_length
+        self.max_nodes = max_nodes
+        self.max_exponent = max_exponent
+        self.max_bits = max_bits
+        self.time_limit = time_limit
+        self.max_points = max_points
+        self.compile = lru_cache(maxsize=cache_size)(self._compile)
+
+    def evaluate(self, text):
+        """Evaluate an expression to an int or float."""
+        func = self.compile(normalize_expression(text))
+        env = _Env(None, False, time.perf_counter() + self.time_limit)
+        try:
+            return func(env)
+        except CalculatorError:
+            raise
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise CalculatorError(str(e)) from e
+
+    def evaluate_range(self, text, start, stop):
+        """Evaluate an expression in x for every integer x in [start, stop] at once."""
+        count = abs(stop - start) + 1
+        if count > self.max_points:
+            raise LimitExceeded(f"at most {self.max_points} values per range")
+        step = 1 if stop >= start else -1
+        xs = np.arange(start, stop + step, step, dtype=np.float64)
+        func = self.compile(normalize_expression(text))
+        env = _Env(xs, True, time.perf_counter() + self.time_limit)
+        try:
+            with np.errstate(all="ignore"):
+                result = func(env)
+        except CalculatorError:
+            raise
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise CalculatorError(str(e)) from e
+        return np.broadcast_to(np.asarray(result, dtype=np.float64), xs.shape)
+
+    def _compile(self, expr):
+        if not expr:
+            raise CalculatorError("empty expression")
+        if len(expr) > self.max_length:
+            raise LimitExceeded(f"expression longer than {self.max_length} characters")
+        try:
+            tree = ast.parse(expr, mode="eval")
+        except SyntaxError as e:
+            raise CalculatorError(f"invalid expression: {e.msg}") from e
+        if sum(1 for _ in ast.walk(tree)) > self.max_nodes:
+            raise LimitExceeded(f"expression has more than {self.max_nodes} parts")
+        return self._node(tree.body)
+
+    def _node(self, node):
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            value = node.value
+            return lambda env: value
+        if isinstance(node, ast.Name):
+            if node.id in CONSTANTS:
+                value = CONSTANTS[node.id]
+                return lambda env: value
+            if node.id in VARIABLES:
+                return self._variable
+            raise CalculatorError(f"unknown name '{node.id}'")
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY:
+            op = UNARY[type(node.op)]
+            operand = self._node(node.operand)
+            return lambda env: op(operand(env))
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY:
+            op_type = type(node.op)
+            left, right = self._node(node.left), self._node(node.right)
+            return lambda env: self._binary(op_type, left(env), right(env), env)
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in FUNCTIONS and not node.keywords):
+            name = node.func.id
+            args = [self._node(a) for a in node.args]
+            return lambda env: self._call(name, [a(env) for a in args], env)
+        raise CalculatorError(f"unsupported syntax: {type(node).__name__}")
+
+    @staticmethod
+    def _variable(env):
+        if env.x is None:
+            raise CalculatorError("x is only allowed in range queries, e.g. 'x squared for 1 to 10'")
+        return env.x
+
+    def _check_time(self, env):
+        if time.perf_counter() > env.deadline:
+            raise LimitExceeded("calculation took too long")
+
+    def _binary(self, op_type, left, right, env):
+        self._check_time(env)
+        if not env.vector and type(left) is int and type(right) is int:
+            if op_type is ast.Pow:
+                if abs(right) > self.max_exponent:
+                    raise LimitExceeded(f"exponent larger than {self.max_exponent}")
+                if left.bit_length() * abs(right) > self.max_bits:
+                    raise LimitExceeded(f"result larger than {self.max_bits} bits")
+            elif op_type is ast.Mult and left.bit_length() + right.bit_length() > self.max_bits:
+                raise LimitExceeded(f"result larger than {self.max_bits} bits")
+        result = BINARY[op_type](left, right)
+        if type(result) is int and result.bit_length() > self.max_bits:
+            raise LimitExceeded(f"result larger than {self.max_bits} bits")
+        return result
+
+    def _call(self, name, args, env):
+        self._check_time(env)
+        if env.vector:
+            return getattr(np, NUMPY_FUNCTIONS.get(name, name))(*args)
+        return FUNCTIONS[name](*args)
+
+
+def format_number(value):
+    """Short spoken form: integral floats without '.0', others to 6 significant digits."""
+    value = float(value)
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.6g}"
@@ -0,0 +1,104 @@
+"""
+feeds.py - Versioned change feed for the tasks and reminders lists.
+Every change to a list bumps that list's version and is pushed as a small delta
+(add / complete / clear, and their undos) to subscribers, so the list windows can update the
+moment a command runs instead of polling. Versions also back the ETags of the
+JSON list endpoints; the epoch keeps them distinct across restarts.
+"""
+import copy
+import queue
+import threading
+import uuid
+
+LISTS = ("tasks", "reminders")
+
+# Store operation -> (list, delta op)
+LIST_OPS = {
+    "task_add": ("tasks", "add"),
+    "task_complete": ("tasks", "complete"),
+    "tasks_clear": ("tasks", "clear"),
+    "task_remove": ("tasks", "remove"),
+    "task_uncomplete": ("tasks", "uncomplete"),
+    "tasks_restore": ("tasks", "reset"),
+    "note_add": ("reminders", "add"),
+    "notes_clear": ("reminders", "clear"),
+    "note_remove": ("reminders", "remove"),
+    "notes_restore": ("reminders", "reset"),
+}
+
+
+class Subscription:
+    def __init__(self, lists, maxsize):
+        self.lists = frozenset(lists)
+        self.events = queue.Queue(maxsize)
+        self.closed = False  # set when the feed closes or the subscriber falls too far behind
+
+    def get(self, timeout=None):
+        """Next event dict, or None if nothing arrived within timeout."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ListFeed:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.versions = dict.fromkeys(LISTS, 0)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def etag(self, name):
+        return f"{self.epoch}-{name}-{self.versions[name]}"
+
+    def record(self, op, fields):
+        """Publish the delta for a store operation, if it touches a list."""
+        target = LIST_OPS.get(op)
+        if target is None:
+            return
+        name, kind = target
+        delta = {"op": kind}
+        if kind == "add":
+            delta["item"] = {"task": fields["task"], "completed": False} if name == "tasks" else fields["note"]
+        elif kind in ("complete", "uncomplete", "remove"):
+            delta["index"] = fields["index"]
+        elif kind == "reset":
+            delta["items"] = copy.deepcopy(fields["items"])
+        self.publish(name, delta)
+
+    def publish(self, name, delta):
+        with self._lock:
+            self.versions[name] += 1
+            event = dict(delta, list=name, version=self.versions[name])
+            for sub in list(self._subscribers):
+                if name not in sub.lists:
+                    continue
+                try:
+                    sub.events.put_nowait(event)
+                except queue.Full:
+                    # A stalled client would miss deltas; drop it so it reconnects and resyncs
+                    self._drop(sub)
+
+    def subscribe(self, lists=LISTS, maxsize=256):
+        sub = Subscription(lists, maxsize)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def close(self):
+        """End every subscription (e.g. when the owning session is evicted)."""
+        with self._lock:
+            for sub in list(self._subscribers):
+                self._drop(sub)
+
+    def _drop(self, sub):
+        self._subscribers.discard(sub)
+        sub.closed = True
+        try:
+            sub.events.put_nowait(None)
+        except queue.Full:
+            pass
@@ -0,0 +1,170 @@
+"""
+fuzzy.py - Fallback intent classifier for misrecognised commands.
+Exemplar phrases (intent trigger phrases plus "open <app>"-style commands) are
+embedded once as L2-normalised character n-gram (TF or TF-IDF) vectors in a
+NumPy matrix. A command is split into word windows, and every window of every
+command in a batch is scored against all exemplars with a single sparse
+product (gather the exemplar rows for each window's n-grams, segment-sum).
+The best window above the threshold is replaced by its exemplar, which turns
+"shoe tasks" into "show tasks" and "open note pad" into "open notepad".
+"""
+import math
+from functools import lru_cache
+
+from lazy import LazyModule
+
+np = LazyModule("numpy")
+
+NGRAM_SIZES = (2, 3, 4)
+
+
+def ngrams(text):
+    """Character n-gram counts of text, padded so word edges form their own n-grams."""
+    padded = f" {text} "
+    counts = {}
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            gram = padded[i:i + n]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class FuzzyMatch:
+    __slots__ = ("intent", "exemplar", "score", "corrected")
+
+    def __init__(self, intent, exemplar, score, corrected):
+        self.intent = intent
+        self.exemplar = exemplar
+        self.score = score
+        self.corrected = corrected
+
+    def __repr__(self):
+        return f"<FuzzyMatch {self.intent} {self.corrected!r} {self.score:.2f}>"
+
+
+class FuzzyClassifier:
+    def __init__(self, exemplars, threshold=0.65, idf=False, length_penalty=0.4):
+        """
+        exemplars:      (intent name, phrase) pairs; the first intent listed for a phrase wins
+        threshold:      minimum cosine score (after the length penalty) to accept a match
+        idf:            weight n-grams by inverse document frequency across intents; off by
+                        default, as it favours the rare n-grams that recognition errors garble
+        length_penalty: score lost in proportion to the length difference between a window
+                        and an exemplar, so "tasks" alone does not take over "show tasks"
+        """
+        self.threshold = threshold
+        self.length_penalty = length_penalty
+        seen = {}
+        for name, text in exemplars:
+            seen.setdefault(text, name)
+        self.texts = list(seen)
+        self.intents = [seen[t] for t in self.texts]
+        self._index = {t: j for j, t in enumerate(self.texts)}
+        self.max_words = max(len(t.split()) for t in self.texts) + 1
+
+        docs = [ngrams(t) for t in self.texts]
+        self.vocab = {}
+        for doc in docs:
+            for gram in doc:
+                self.vocab.setdefault(gram, len(self.vocab))
+        # Document frequency per intent, so templated "open <app>" phrases do not make "open" look common
+        by_intent = {}
+        for name, doc in zip(self.intents, docs):
+            by_intent.setdefault(name, set()).update(doc)
+        df = [0] * len(self.vocab)
+        for grams in by_intent.values():
+            for gram in grams:
+                df[self.vocab[gram]] += 1
+        n = len(by_intent)
+        self._idf = [math.log((1 + n) / (1 + d)) + 1 if idf else 1.0 for d in df]
+        # n-grams no exemplar has still count towards a window's norm
+        self._unknown_idf = math.log(1 + n) + 1 if idf else 1.0
+
+        # One row per n-gram (plus an all-zero row for windows with no known n-grams),
+        # one column per exemplar, each column L2-normalised
+        matrix = np.zeros((len(self.vocab) + 1, len(docs)), dtype=np.float32)
+        for j, doc in enumerate(docs):
+            for gram, tf in doc.items():
+                col = self.vocab[gram]
+                matrix[col, j] = tf * self._idf[col]
+        matrix /= np.linalg.norm(matrix, axis=0, keepdims=True)
+        self._matrix = matrix
+        self._zero_row = len(self.vocab)
+        self._lengths = np.array([len(t) for t in self.texts], dtype=np.float32)
+        self._cache = {}  # window text -> _features()
+
+    def classify(self, command):
+        """Best FuzzyMatch for command, or None if nothing scores above the threshold."""
+        return self.classify_batch([command])[0]
+
+    def classify_batch(self, commands):
+        """classify() for many commands at once: all their windows are scored in one product."""
+        rows, weights, starts, windows, lengths, norms, spans = [], [], [], [], [], [], []
+        verbatim = []
+        for command in commands:
+            words = command.split()
+            first = len(windows)
+            for size in range(1, min(self.max_words, len(words)) + 1):
+                for start in range(len(words) - size + 1):
+                    text = " ".join(words[start:start + size])
+                    cols, values, norm = self._features(text)
+                    starts.append(len(rows))
+                    rows.extend(cols)
+                    weights.extend(values)
+                    if text in self._index:
+                        verbatim.append((len(windows), text))
+                    windows.append((start, size))
+                    lengths.append(len(text))
+                    norms.append(norm)
+            spans.append((first, len(windows)))
+        results = [None] * len(commands)
+        if not windows:
+            return results
+
+        gathered = self._matrix[rows] * np.asarray(weights, dtype=np.float32)[:, None]
+        scores = np.add.reduceat(gathered, starts, axis=0) / np.asarray(norms, dtype=np.float32)[:, None]
+        lengths = np.array(lengths, dtype=np.float32)[:, None]
+        scores *= 1 - self.length_penalty * np.abs(lengths - self._lengths) / np.maximum(lengths, self._lengths)
+        for w, text in verbatim:
+            scores[w, self._index[text]] = 0  # already an exemplar: nothing to correct
+        best_exemplar = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(windows)), best_exemplar]
+
+        for index, (first, last) in enumerate(spans):
+            if first == last:
+                continue
+            w = first + int(best_score[first:last].argmax())
+            score = float(best_score[w])
+            if score < self.threshold:
+                continue
+            exemplar = int(best_exemplar[w])
+            start, size = windows[w]
+            words = commands[index].split()
+            corrected = " ".join(words[:start] + [self.texts[exemplar]] + words[start + size:])
+            results[index] = FuzzyMatch(self.intents[exemplar], self.texts[exemplar], score, corrected)
+        return results
+
+    def _features(self, text):
+        """(matrix rows, weights, norm) for a window; cached, as the same words recur."""
+        features = self._cache.get(text)
+        if features is None:
+            cols, values, norm = [], [], 0.0
+            for gram, tf in ngrams(text).items():
+                col = self.vocab.get(gram)
+                weight = tf * (self._idf[col] if col is not None else self._unknown_idf)
+                norm += weight * weight
+                if col is not None:
+                    cols.append(col)
+                    values.append(weight)
+            if not cols:
+                cols, values = [self._zero_row], [0.0]
+            if len(self._cache) >= 4096:
+                self._cache.clear()
+            features = self._cache[text] = (cols, values, math.sqrt(norm) or 1.0)
+        return features
+
+
+@lru_cache(maxsize=8)
+def shared_classifier(exemplars):
+    """Classifier for a tuple of exemplars, shared by processors with the same apps."""
+    return FuzzyClassifier(exemplars)
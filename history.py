@@ -0,0 +1,146 @@
+"""
+history.py - Bounded command history with intent/app indexes and an undo stack.
+Entries are compact __slots__ records in a fixed-size ring buffer addressed by
+sequence number. Appending at capacity overwrites the oldest slot in O(1), and
+any entry is found by its seq in O(1). Per-intent and per-app indexes hold seqs
+in order, so queries like "what did I open today" walk only matching entries,
+newest first. The undo stack holds the seqs of entries with a reversible action.
+"""
+from collections import deque
+
+
+class HistoryEntry:
+    __slots__ = ("seq", "timestamp", "command", "intent", "app", "undo")
+
+    def __init__(self, seq, timestamp, command, intent=None, app=None, undo=None):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.command = command
+        self.intent = intent
+        self.app = app
+        self.undo = undo  # (action, argument) that reverses this command, or None
+
+    def to_dict(self):
+        return {"seq": self.seq, "timestamp": self.timestamp, "command": self.command,
+                "intent": self.intent, "app": self.app,
+                "undo": list(self.undo) if self.undo else None}
+
+    def __repr__(self):
+        return f"<HistoryEntry {self.seq} {self.command!r} intent={self.intent} app={self.app}>"
+
+
+class CommandHistory:
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._next_seq = 1
+        self._len = 0
+        self._by_intent = {}  # intent name -> deque of seqs, oldest first
+        self._by_app = {}  # app name -> deque of seqs, oldest first
+        self._undo = deque()  # seqs of entries with a pending undo action
+
+    @classmethod
+    def from_records(cls, records, capacity=100):
+        """Rebuild from to_dict() records (as saved by the durable store)."""
+        history = cls(capacity)
+        for record in records:
+            entry = history.append(record["command"], record["timestamp"], record.get("intent"),
+                                   seq=record.get("seq"))
+            if record.get("app"):
+                history.set_app(entry, record["app"])
+            if record.get("undo"):
+                history.set_undo(entry, record["undo"])
+        return history
+
+    def append(self, command, timestamp, intent=None, seq=None):
+        if seq is None:
+            seq = self._next_seq
+        self._next_seq = seq + 1
+        slot = seq % self.capacity
+        old = self._slots[slot]
+        if old is not None:
+            self._forget(old)
+        else:
+            self._len += 1
+        entry = self._slots[slot] = HistoryEntry(seq, timestamp, command, intent)
+        if intent is not None:
+            _index(self._by_intent, intent, seq)
+        return entry
+
+    def get(self, seq):
+        entry = self._slots[seq % self.capacity]
+        return entry if entry is not None and entry.seq == seq else None
+
+    def last(self):
+        return self.get(self._next_seq - 1)
+
+    def set_app(self, entry, app):
+        entry.app = app
+        _index(self._by_app, app, entry.seq)
+
+    def set_undo(self, entry, action):
+        entry.undo = tuple(action)
+        self._undo.append(entry.seq)
+
+    def pop_undo(self):
+        """Take the most recent reversible entry off the undo stack; (None, None) if empty."""
+        while self._undo:
+            entry = self.get(self._undo.pop())
+            if entry is not None and entry.undo:
+                action, entry.undo = entry.undo, None
+                return entry, action
+        return None, None
+
+    def entries(self, intent=None, app=None, since=None):
+        """Entries newest first, optionally only one intent or app and not older than since."""
+        if intent is not None:
+            seqs = self._by_intent.get(intent, ())
+        elif app is not None:
+            seqs = self._by_app.get(app, ())
+        else:
+            seqs = range(self._next_seq - self._len, self._next_seq)
+        for seq in reversed(seqs):
+            entry = self.get(seq)
+            if entry is None:
+                continue
+            if since is not None and entry.timestamp < since:
+                break
+            if app is not None and entry.app != app:
+                continue
+            yield entry
+
+    def to_list(self):
+        return [entry.to_dict() for entry in self]
+
+    def __iter__(self):
+        for seq in range(self._next_seq - self._len, self._next_seq):
+            entry = self.get(seq)
+            if entry is not None:
+                yield entry
+
+    def __len__(self):
+        return self._len
+
+    def _forget(self, entry):
+        # The overwritten entry is the oldest, so it sits at the front of each index
+        if entry.intent is not None:
+            _unindex(self._by_intent, entry.intent, entry.seq)
+        if entry.app is not None:
+            _unindex(self._by_app, entry.app, entry.seq)
+        if entry.undo and self._undo and self._undo[0] == entry.seq:
+            self._undo.popleft()
+
+
+def _index(index, key, seq):
+    seqs = index.get(key)
+    if seqs is None:
+        seqs = index[key] = deque()
+    seqs.append(seq)
+
+
+def _unindex(index, key, seq):
+    seqs = index.get(key)
+    if seqs and seqs[0] == seq:
+        seqs.popleft()
+        if not seqs:
+            del index[key]
@@ -0,0 +1,205 @@
+"""
+intents.py - Declarative intent registry for CommandProcessor.
+Handlers declare their trigger keywords/patterns with the @intent decorator and
+IntentRouter compiles them once: every trigger contributes the literal anchors
+any match must contain to a keyword index, and all anchors are folded into one
+alternation (prefix-trie) regex. Routing scans the command once for anchors and then only
+tries the candidate intents, in declaration (first-match) order.
+Intents may also list example phrases; together with their keywords and exact
+phrases they are the exemplars the fuzzy fallback classifier matches against.
+Intents marked read_only change no state and have no side effects, so their
+handlers may run speculatively on interim transcripts (speculate.py). Intents
+marked destructive (clearing lists, closing every tab) only run when a trigger
+matches as spoken, never on a fuzzy guess.
+"""
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+_MAX_EXPANSION = 64
+
+
+def _exact(items):
+    """Return the finite set of strings `items` matches exactly, or None."""
+    strings = {''}
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            alts = {chr(av)}
+        elif op is sre_parse.IN and all(o is sre_parse.LITERAL for o, _ in av):
+            alts = {chr(v) for _, v in av}
+        elif op is sre_parse.SUBPATTERN:
+            alts = _exact(av[-1])
+        elif op is sre_parse.BRANCH:
+            branches = [_exact(b) for b in av[1]]
+            alts = None if None in branches else set().union(*branches)
+        elif op is sre_parse.AT:
+            continue
+        else:
+            alts = None
+        if alts is None or len(strings) * len(alts) > _MAX_EXPANSION:
+            return None
+        strings = {s + a for s in strings for a in alts}
+    return strings
+
+
+def _literals(items):
+    """Return a set of strings one of which every match of `items` must contain,
+    or None if no such set can be derived."""
+    best = None
+
+    def pick(cands):
+        nonlocal best
+        if cands and all(cands) and (best is None or min(map(len, cands)) > min(map(len, best))):
+            best = cands
+
+    run = {''}
+    for op, av in items:
+        exact = _exact([(op, av)])
+        if exact is not None and len(run) * len(exact) <= _MAX_EXPANSION:
+            run = {s + e for s in run for e in exact}
+            continue
+        pick(run)
+        run = {''}
+        if exact is not None:
+            run = exact
+        elif op is sre_parse.SUBPATTERN:
+            pick(_literals(av[-1]))
+        elif op is sre_parse.BRANCH:
+            branches = [_literals(b) for b in av[1]]
+            if None not in branches:
+                pick(set().union(*branches))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            pick(_literals(av[2]))
+    pick(run)
+    return best
+
+
+def required_literals(pattern):
+    """Literal anchors for a compiled pattern, or None if it has none."""
+    if pattern.flags & re.IGNORECASE:
+        return None
+    return _literals(sre_parse.parse(pattern.pattern))
+
+
+def _trie_regex(words):
+    """Build a prefix-trie alternation for words; longer words win at a position."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+class Intent:
+    def __init__(self, name, handler, keywords=(), patterns=(), exact=(), examples=(), read_only=False,
+                 destructive=False):
+        self.name = name
+        self.handler = handler
+        self.keywords = tuple(keywords)
+        self.patterns = tuple(re.compile(p) for p in patterns)
+        self.exact = tuple(exact)
+        self.examples = tuple(examples)
+        self.read_only = read_only
+        self.destructive = destructive
+
+    def exemplars(self):
+        """Phrases that typify this intent: its examples, keywords and exact phrases."""
+        return self.examples + self.keywords + self.exact
+
+    def anchors(self):
+        """Return the literals one of which must appear in any command this
+        intent matches, or None if the intent cannot be indexed."""
+        found = set(self.keywords) | set(self.exact)
+        for p in self.patterns:
+            lits = required_literals(p)
+            if not lits:
+                return None
+            found |= lits
+        return found
+
+    def match(self, cmd):
+        """Return the first pattern match object (or True for keyword/exact hits)."""
+        for p in self.patterns:
+            m = p.search(cmd)
+            if m:
+                return m
+        if cmd in self.exact or any(kw in cmd for kw in self.keywords):
+            return True
+        return None
+
+
+def intent(name, keywords=(), patterns=(), exact=(), examples=(), read_only=False, destructive=False):
+    """Mark a CommandProcessor method as the handler for an intent.
+    examples are typical phrasings for the fuzzy fallback; they do not trigger routing.
+    read_only handlers only read state and may run before the command is final.
+    destructive handlers are left out of the fuzzy fallback."""
+    def decorator(func):
+        func._intent = (name, keywords, patterns, exact, examples, read_only, destructive)
+        return func
+    return decorator
+
+
+class IntentRouter:
+    def __init__(self, intents):
+        self.intents = list(intents)
+        self.by_name = {i.name: i for i in self.intents}
+
+        # Keyword index: anchor literal -> indices of the intents it may trigger.
+        self._always = set()
+        per_intent = []
+        for idx, it in enumerate(self.intents):
+            anchors = it.anchors()
+            if anchors is None:
+                self._always.add(idx)
+            else:
+                per_intent.append((idx, anchors))
+        all_anchors = {a for _, anchors in per_intent for a in anchors}
+        # An anchor found in the command also implies every anchor it contains,
+        # so overlapping keywords ("close" / "close tab") both count as seen.
+        self._index = {
+            a: frozenset(idx for idx, anchors in per_intent if any(b in a for b in anchors))
+            for a in all_anchors
+        }
+        # Zero-width lookahead so anchors are found at every position, even
+        # where they overlap; the trie alternation reports the widest hit.
+        self._anchor_regex = re.compile('(?=(' + _trie_regex(all_anchors) + '))')
+
+    @classmethod
+    def from_class(cls, klass):
+        """Build a router from @intent-decorated methods, in definition order."""
+        intents = []
+        for attr, func in klass.__dict__.items():
+            spec = getattr(func, '_intent', None)
+            if spec:
+                intents.append(Intent(spec[0], attr, *spec[1:]))
+        return cls(intents)
+
+    def candidates(self, cmd):
+        """Indices of the intents whose anchors occur in cmd, in priority order."""
+        found = set(self._always)
+        for anchor in set(self._anchor_regex.findall(cmd)):
+            found |= self._index[anchor]
+        return sorted(found)
+
+    def route(self, cmd):
+        """Return (intent, match) for the first matching intent, or (None, None)."""
+        for idx in self.candidates(cmd):
+            it = self.intents[idx]
+            m = it.match(cmd)
+            if m:
+                return it, m
+        return None, None
@@ -0,0 +1,58 @@
+"""
+lazy.py - Deferred imports for heavy optional dependencies.
+`requests = LazyModule("requests")` binds a stand-in that imports the real
+module on first attribute access, so importing model.py or server.py does not
+pay for libraries a session may never use. warm_up() preloads them on a
+background thread once the process is otherwise idle.
+"""
+import importlib
+import threading
+
+from logs import get_logger
+
+log = get_logger("lazy")
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def import_now(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.import_now(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def warm_up(*targets, background=True):
+    """Load LazyModules and call plain callables, optionally on a daemon thread."""
+    def run():
+        for target in targets:
+            try:
+                if isinstance(target, LazyModule):
+                    target.import_now()
+                else:
+                    target()
+            except Exception as e:
+                log.warning("warm-up failed", target=repr(target), error=str(e))
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="aura-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,119 @@
+"""
+logs.py - Structured logging with request IDs.
+Each record is written as one JSON object per line (AURA_LOG_FORMAT=text for a
+readable console line) carrying the event name, its fields and the ID of the
+request being handled. server.py sets the ID per HTTP request (taken from an
+X-Request-ID header or generated) and the voice pipeline per turn; it lives in a
+context variable, so it follows the command through every module that logs.
+AURA_LOG_LEVEL picks the level (default info).
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+
+request_id = contextvars.ContextVar("aura_request_id", default=None)
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def new_request_id():
+    return os.urandom(8).hex()
+
+
+class request_context:
+    """Run a block with the given request ID (a new one if None) as the current one."""
+
+    def __init__(self, rid=None):
+        self.rid = rid or new_request_id()
+        self._token = None
+
+    def __enter__(self):
+        self._token = request_id.set(self.rid)
+        return self.rid
+
+    def __exit__(self, *exc):
+        request_id.reset(self._token)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(),
+                 "logger": record.name, "event": record.getMessage()}
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        rid = getattr(record, "request_id", None)
+        fields = " ".join(f"{k}={v!r}" for k, v in (getattr(record, "fields", None) or {}).items())
+        line = (f"{self.formatTime(record, '%H:%M:%S')} {record.levelname.lower():<7} "
+                f"{'[' + rid + '] ' if rid else ''}{record.getMessage()} {fields}").rstrip()
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class StructuredLogger:
+    """logger.info("event", key=value, ...); fields are only formatted if the level is enabled."""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level, event, fields, exc_info=False):
+        if self._logger.isEnabledFor(level):
+            # Build the record directly: Logger.log would also walk the stack for the caller
+            if exc_info:
+                exc_info = sys.exc_info()
+            record = self._logger.makeRecord(self._logger.name, level, "", 0, event, None, exc_info or None,
+                                             extra={"fields": fields, "request_id": request_id.get()})
+            self._logger.handle(record)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, exc_info=False, **fields):
+        self._log(logging.ERROR, event, fields, exc_info)
+
+    def isEnabledFor(self, level):
+        return self._logger.isEnabledFor(level)
+
+
+def configure(level=None, fmt=None, stream=None):
+    """Set up the "aura" logger once: one handler, level and format from the environment."""
+    global _configured
+    with _configure_lock:
+        logger = logging.getLogger("aura")
+        if _configured and level is None and fmt is None and stream is None:
+            return logger
+        level = level or os.environ.get("AURA_LOG_LEVEL", "info")
+        fmt = fmt or os.environ.get("AURA_LOG_FORMAT", "json")
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+        for old in list(logger.handlers):
+            logger.removeHandler(old)
+        logger.addHandler(handler)
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+        logger.propagate = False
+        _configured = True
+        return logger
+
+
+def get_logger(name):
+    """Structured logger for a module, e.g. get_logger("model") -> "aura.model"."""
+    configure()
+    return StructuredLogger(f"aura.{name}")
@@ -0,0 +1,171 @@
+"""
+lookup.py - Concurrent, deadline-bounded knowledge lookup.
+DuckDuckGo and Wikipedia are queried in parallel over one keep-alive
+connection pool. The first good answer wins, except that a higher-priority
+source still gets a short grace window to answer. The whole lookup stops at a
+single deadline and the losing requests are cancelled.
+Each source's call time and errors are exported as metrics.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from lazy import LazyModule
+from logs import get_logger
+from metrics import EXTERNAL_SECONDS, EXTERNAL_ERRORS, counter
+
+requests = LazyModule("requests")
+
+log = get_logger("lookup")
+DEADLINE_EXCEEDED = counter("aura_lookup_deadline_exceeded_total",
+                            "Knowledge lookups that ran out of time without an answer")
+
+DDG_API_URL = "https://api.duckduckgo.com/"
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+
+
+def make_session(pool_size=8):
+    """A requests.Session whose connections are pooled and kept alive."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "AURA/1.0 (local voice assistant)"
+    return session
+
+
+class KnowledgeLookup:
+    def __init__(self, cache=None, deadline=5.0, grace=0.3, max_workers=4, session=None):
+        self.cache = cache
+        self.deadline = deadline
+        self.grace = grace
+        self.max_workers = max_workers
+        self._session = session
+        self._session_lock = threading.Lock()
+        # Priority order: earlier sources are preferred when several answer.
+        self.sources = {
+            "duckduckgo": self.duckduckgo,
+            "wikipedia": self.wikipedia,
+        }
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="aura-lookup")
+
+    @property
+    def session(self):
+        """The pooled HTTP session, created (and requests imported) on first use."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = make_session(self.max_workers * 2)
+        return self._session
+
+    def lookup(self, query, sources=None):
+        """Return (source, answer) for the best answer, or (None, None)."""
+        order = list(sources or self.sources)
+        deadline_at = time.monotonic() + self.deadline
+        cancelled = threading.Event()
+        results = {}
+        pending = {}
+        for name in order:
+            if self.cache is not None:
+                found, value = self.cache.get(name, query)
+                if found:
+                    results[name] = value
+                    continue
+            # Workers log under the caller's request ID
+            future = self._executor.submit(contextvars.copy_context().run,
+                                           self._run, name, query, deadline_at, cancelled)
+            pending[future] = name
+
+        grace_until = None
+        try:
+            while True:
+                best = next((n for n in order if results.get(n)), None)
+                if best is not None:
+                    # Only sources ranked above the current best are worth waiting for.
+                    rank = order.index(best)
+                    if not any(order.index(n) < rank for n in pending.values()):
+                        return best, results[best]
+                    if grace_until is None:
+                        grace_until = min(time.monotonic() + self.grace, deadline_at)
+                elif not pending:
+                    return None, None
+                wait_until = grace_until if grace_until is not None else deadline_at
+                timeout = wait_until - time.monotonic()
+                done = ()
+                if timeout > 0:
+                    done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    if best is not None:
+                        return best, results[best]
+                    DEADLINE_EXCEEDED.inc()
+                    log.info("lookup deadline reached", query=query)
+                    return None, None
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+        finally:
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+    def _run(self, name, query, deadline_at, cancelled):
+        if cancelled.is_set():
+            return None
+        start = time.perf_counter()
+        try:
+            answer = self.sources[name](query, deadline_at, cancelled)
+        except Exception as e:
+            if cancelled.is_set():
+                return None
+            EXTERNAL_ERRORS.labels(name).inc()
+            log.warning("lookup failed", source=name, error=str(e))
+            answer = None
+        finally:
+            EXTERNAL_SECONDS.labels(name).observe(time.perf_counter() - start)
+        # A cancelled loser is not a real failure, so it is not negative-cached.
+        if self.cache is not None and not cancelled.is_set():
+            self.cache.put(name, query, answer)
+        return answer
+
+    def _get_json(self, url, params, deadline_at, cancelled):
+        timeout = deadline_at - time.monotonic()
+        if timeout <= 0:
+            return None
+        r = self.session.get(url, params=params, timeout=timeout, stream=True)
+        try:
+            if cancelled.is_set():
+                return None
+            r.raise_for_status()
+            return r.json()
+        finally:
+            r.close()
+
+    def duckduckgo(self, query, deadline_at, cancelled):
+        """Abstract (or first related topic) from the DuckDuckGo Instant Answer API."""
+        params = {"q": query, "format": "json", "no_redirect": 1, "no_html": 1}
+        data = self._get_json(DDG_API_URL, params, deadline_at, cancelled)
+        if not data:
+            return None
+        if data.get('Abstract'):
+            return data['Abstract']
+        # RelatedTopics as fallback
+        for item in data.get('RelatedTopics', []):
+            text = item.get('Text') if isinstance(item, dict) else ''
+            if text:
+                return text
+        return None
+
+    def wikipedia(self, query, deadline_at, cancelled):
+        """Two-sentence intro of the top Wikipedia search hit, in one request."""
+        params = {
+            "action": "query", "format": "json", "redirects": 1,
+            "generator": "search", "gsrsearch": query, "gsrlimit": 1,
+            "prop": "extracts", "exintro": 1, "explaintext": 1, "exsentences": 2,
+        }
+        data = self._get_json(WIKIPEDIA_API_URL, params, deadline_at, cancelled)
+        pages = (data or {}).get('query', {}).get('pages', {})
+        for page in pages.values():
+            extract = (page.get('extract') or '').strip()
+            if extract:
+                return extract
+        return None
@@ -1,57 +1,149 @@
 import speech_recognition as sr
-import pyttsx3
 from model import CommandProcessor
-import time
+from store import OpLogStore, DEFAULT_DATA_DIR
+from speak import VoiceSpeaker, FakeEngine, FakePlayer
+from ttscache import AudioCache
+from pipeline import VoicePipeline, wav_source
+from recognizers import make_backend, NotUnderstood, RecognitionError
+from lazy import warm_up
+from vad import Endpointer, EchoGate, NoiseProfile, FRAME_MS
+from wakeword import WakeGate, default_spotter
+import os
+import sys
 
-# Create ONE engine globally!
-engine = pyttsx3.init()
-engine.setProperty('rate', 180)
-engine.setProperty('volume', 1.0)
-voices = engine.getProperty('voices')
-engine.setProperty('voice', voices[0].id)
+# Create ONE speaker globally, on first use. It streams replies sentence by
+# sentence from its own thread, so speak() returns while the reply plays.
+# AURA_TTS=fake swaps in a silent engine for machines without audio.
+# Sentences it has rendered before are played from a disk cache
+# (AURA_TTS_CACHE=0 turns that off).
+speaker = None
 
-def speak(text):
-    print(f"Assistant says: {text}")
-    engine.say(text)
-    engine.runAndWait()
-    time.sleep(0.15)  # Prevents buffer bug
+# Fixed phrases of the voice loop itself, cached along with the processor's
+GREETING = "Hello! I'm your voice assistant. How can I help you?"
+FAREWELL = "Goodbye! Have a great day."
+NOT_UNDERSTOOD = "I didn't catch that. Could you repeat?"
+LOOP_REPLIES = [GREETING, FAREWELL, NOT_UNDERSTOOD, "Sorry, I had trouble listening.",
+                "Sorry, there was an error with the speech recognition service.",
+                "Sorry, I had trouble with that."]
 
-def main():
-    recognizer = sr.Recognizer()
-    microphone = sr.Microphone()
-    processor = CommandProcessor()
+def get_speaker():
+    global speaker
+    if speaker is None:
+        fake = os.environ.get('AURA_TTS') == 'fake'
+        cache = AudioCache() if os.environ.get('AURA_TTS_CACHE', '1') != '0' else None
+        speaker = VoiceSpeaker(rate=180, volume=1.0, voice_gender=None, streaming=True,
+                               engine_factory=FakeEngine if fake else None, cache=cache,
+                               player_factory=FakePlayer if fake else None)
+    return speaker
 
-    print("Calibrating microphone (please be quiet)...")
-    with microphone as source:
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-    print("Calibration done.")
-
-    speak("Hello! I'm your voice assistant. How can I help you?")
+def speak(text):
+    print(f"Assistant says: {text}")
+    return get_speaker().say(text)
 
+def microphone_source(microphone, endpointer, gate=None, echo=None):
+    """Capture utterances forever; runs on the pipeline's capture thread.
+    The microphone stays open and every frame goes through the endpointer, which
+    yields just the speech once it has been followed by a short silence. With a
+    wake-word gate, only utterances addressed to the assistant are yielded; the
+    echo gate drops the assistant's own voice, so it neither barges in on the
+    reply nor comes back as a command."""
     while True:
         try:
             with microphone as source:
                 print("\nListening...")
-                audio = recognizer.listen(source, timeout=8, phrase_time_limit=5)
-            try:
-                command = recognizer.recognize_google(audio)
-                print(f"You said: {command}")
-                response = processor.process(command)
-                print(f"Response: {response}")
-                speak(response)
-                if "exit" in command.lower() or "goodbye" in command.lower():
-                    break
-            except sr.UnknownValueError:
-                print("Speech not understood")
-                speak("I didn't catch that. Could you repeat?")
-            except sr.RequestError:
-                print("Speech recognition API error")
-                speak("Sorry, there was an error with the speech recognition service.")
+                while True:
+                    pcm = source.stream.read(source.CHUNK)
+                    if gate is not None:
+                        gate.listen(pcm)
+                    if echo is not None:
+                        echo.listen(pcm)
+                    for segment in endpointer.feed(pcm):
+                        clip = segment.clip if gate is None else gate.admit(segment)
+                        if clip is not None and echo is not None:
+                            clip = echo.admit(segment, clip, wake=gate is not None)
+                        if clip is not None:
+                            yield clip
+                            print("\nListening...")
         except Exception as e:
             print(f"Listening error: {str(e)}")
             speak("Sorry, I had trouble listening.")
 
-    speak("Goodbye! Have a great day.")
+def make_recognize(backend):
+    def recognize(audio):
+        command = backend.recognize(audio)
+        print(f"You said: {command}")
+        return command
+    return recognize
+
+def on_error(stage, error):
+    if isinstance(error, NotUnderstood):
+        print("Speech not understood")
+        return NOT_UNDERSTOOD
+    if isinstance(error, RecognitionError):
+        print(f"Speech recognition error: {error}")
+        return "Sorry, there was an error with the speech recognition service."
+    print(f"{stage.capitalize()} error: {str(error)}")
+    return "Sorry, I had trouble with that."
+
+def is_exit(command):
+    return "exit" in command.lower() or "goodbye" in command.lower()
+
+def main(wav_paths=None):
+    """Run the voice loop on the microphone, or on WAV files given on the command line."""
+    # Speech-to-text backend from AURA_ASR: google (online) or vosk / whisper (local models)
+    backend = make_backend()
+    processor = CommandProcessor(store=OpLogStore(os.path.join(DEFAULT_DATA_DIR, "voice")))
+    # Load the assistant's heavy dependencies, the speech model and the TTS
+    # engine in the background while the microphone starts
+    processor.warm_up()
+    warm_up(backend.warm_up)
+    get_speaker()
+
+    endpointer = gate = echo = None
+    if wav_paths:
+        source = wav_source(wav_paths)
+    else:
+        # Last run's noise profile, so there is no calibration pause; the first
+        # run calibrates on its first fraction of a second instead
+        endpointer = Endpointer(16000, profile=NoiseProfile.load())
+        # Only speech after "aura" goes to the recogniser once the wake word is
+        # enrolled (python wakeword.py --enrol); AURA_WAKE_WORD=0 turns it off
+        spotter = default_spotter()
+        if spotter is not None:
+            gate = WakeGate(spotter)
+            print('Say "aura" before a command.')
+        echo = EchoGate(get_speaker(), 16000)
+        microphone = sr.Microphone(sample_rate=16000, chunk_size=16000 * FRAME_MS // 1000)
+        source = microphone_source(microphone, endpointer, gate, echo)
+
+    speak(GREETING)
+    # Fixed replies are synthesised to the audio cache whenever the speaker is idle
+    get_speaker().prewarm(LOOP_REPLIES + processor.static_responses())
+
+    def process(command):
+        response = processor.process(command)
+        print(f"Response: {response}")
+        return response
+
+    # Capture, recognition, processing and speech run concurrently; a newly
+    # recognised command barges in on whatever is still being said
+    pipeline = VoicePipeline(source, make_recognize(backend), process, speak,
+                             on_error=on_error, on_command=lambda command: get_speaker().interrupt(),
+                             is_exit=is_exit)
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        pipeline.stop()
+    if endpointer is not None and endpointer.profile is not None:
+        endpointer.profile.save()
+    if gate is not None:
+        print(f"{gate.dropped} utterances without the wake word were not sent for recognition.")
+    if echo is not None and echo.dropped:
+        print(f"{echo.dropped} utterances of the assistant's own voice were not sent for recognition.")
+    print("\nLatency per stage:\n" + pipeline.stats.report())
+
+    speak(FAREWELL)
+    get_speaker().wait()
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -1,16 +1,62 @@
 import re
 import datetime
 import subprocess
-import webbrowser
 import os
-import wikipedia
 from urllib.parse import quote_plus
-import psutil
-import math
-import requests
+import time
+from intents import intent, IntentRouter
+from cache import AnswerCache
+from lookup import KnowledgeLookup
+from sampler import default_sampler
+from actions import default_executor
+from processes import default_registry
+from lazy import LazyModule, warm_up
+from feeds import ListFeed
+from fuzzy import shared_classifier
+from textindex import default_index
+from speculate import Speculator
+from logs import get_logger
+from metrics import counter, histogram
+from history import CommandHistory
+from speak import split_sentences
+import calculator
+from calculator import Calculator, CalculatorError, LimitExceeded, format_number
+
+webbrowser = LazyModule("webbrowser")
+
+log = get_logger("model")
+COMMAND_SECONDS = histogram("aura_command_duration_seconds",
+                            "Time spent in CommandProcessor.process, by intent handler", ["intent"])
+COMMAND_ERRORS = counter("aura_command_errors_total", "Commands whose handler raised, by intent", ["intent"])
+
+# Constant prompts and acknowledgements returned by handlers below, synthesised
+# ahead of time by the voice loop (see static_responses)
+NOT_UNDERSTOOD = "Sorry, I don't understand that command."
+NO_REMINDER_GIVEN = "Please specify what you'd like me to remind you about."
+NO_REMINDERS = "You don't have any reminders yet."
+REMINDERS_CLEARED = "All reminders have been cleared."
+NO_TASK_GIVEN = "Please specify the task."
+NO_TASKS = "You don't have any tasks yet."
+INVALID_TASK_NUMBER = "Invalid task number."
+NO_TASK_NUMBER = "Please specify the task number to complete."
+TASKS_CLEARED = "All tasks have been cleared."
+NOTHING_TO_UNDO = "No previous commands to undo."
+CANNOT_UNDO = "Cannot undo the last command automatically."
+NOTHING_TO_CLOSE = "No recent application to close."
+OPENING_NEW_TAB = "Opening new tab."
+CLOSING_TAB = "Closing current tab."
+CLOSING_ALL_TABS = "Closing all tabs."
+NEXT_TAB = "Switching to next tab."
+PREVIOUS_TAB = "Switching to previous tab."
+FIXED_REPLIES = (
+    NOT_UNDERSTOOD, NO_REMINDER_GIVEN, NO_REMINDERS, REMINDERS_CLEARED, NO_TASK_GIVEN, NO_TASKS,
+    INVALID_TASK_NUMBER, NO_TASK_NUMBER, TASKS_CLEARED, NOTHING_TO_UNDO, CANNOT_UNDO,
+    NOTHING_TO_CLOSE, OPENING_NEW_TAB, CLOSING_TAB, CLOSING_ALL_TABS, NEXT_TAB, PREVIOUS_TAB,
+)
 
 class CommandProcessor:
-    def __init__(self):
+    def __init__(self, answer_cache=None, sampler=None, actions=None, processes=None, knowledge=None,
+                 store=None, text_index=None):
         # Basic app paths for Windows 
         self.app_paths = {
             "chrome": r"C:\Program Files\Google\Chrome\Application\chrome.exe",
@@ -48,6 +94,14 @@ class CommandProcessor:
         self.default_browser = "comet" 
         
         # Casual conversation data
+        self.greetings = [
+            "Hello! How can I help you today?",
+            "Hi there! Always nice to chat with you!",
+            "Hey! What's on your mind?",
+            "Greetings! How can I assist you?",
+            "Hi! Ready to help whenever you need!"
+        ]
+
         self.jokes = [
             "Why don't scientists trust atoms? Because they make up everything!",
             "What did the grape say when it got stepped on? Nothing, it just let out a little wine!",
@@ -91,12 +145,130 @@ class CommandProcessor:
         self.tasks = []  # Store tasks
         self.custom_apps = {} 
         
-        # Command history tracking
-        self.command_history = []
-        self.max_history = 100 
+        # Command history tracking: a ring buffer indexed by intent and app, with an undo stack
+        self.max_history = 100
+        self.command_history = CommandHistory(self.max_history)
+        self._current = None  # history entry of the command being processed
+
+        # Optional durable store: restore saved state, then log every change to it
+        self.store = store
+        if store is not None:
+            state = store.load()
+            self.notes = state["notes"]
+            self.tasks = state["tasks"]
+            self.custom_apps = state["custom_apps"]
+            self.command_history = CommandHistory.from_records(state["command_history"], self.max_history)
+            store.attach(self._state)
+
+        # Versions and live deltas for the tasks/reminders list windows
+        self.feed = ListFeed()
+
+        # Cached DuckDuckGo/Wikipedia answers, persisted across restarts
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache()
+        self.knowledge = knowledge if knowledge is not None else KnowledgeLookup(cache=self.answer_cache)
+
+        # Offline full-text index of abstracts, asked before the network when one has been built
+        self._text_index = text_index
+
+        # Safe arithmetic for "calculate", with compiled expressions cached
+        self.calculator = Calculator()
+
+        # Slow desktop side effects run on a background executor; process()
+        # records the IDs of the jobs it queued in last_jobs
+        self.actions = actions if actions is not None else default_executor()
+        self.last_jobs = []
+
+        # Processes launched by "open <app>", and a name -> PID index for the rest
+        self._processes = processes
+
+        # CPU/memory/disk are sampled in the background; "system info" reads the latest sample
+        self._sampler = sampler
+
+        # Fallback for misheard commands; built on first use and again when custom apps change
+        self._fuzzy = None
+
+        # Read-only handlers started on interim transcripts, taken by process() if the final command matches
+        self._speculator = None
+
+    @property
+    def processes(self):
+        if self._processes is None:
+            self._processes = default_registry()
+        return self._processes
+
+    @property
+    def sampler(self):
+        if self._sampler is None:
+            self._sampler = default_sampler()
+        return self._sampler
+
+    @property
+    def text_index(self):
+        if self._text_index is None:
+            self._text_index = default_index()
+        return self._text_index
+
+    @property
+    def speculator(self):
+        if self._speculator is None:
+            self._speculator = Speculator(self)
+        return self._speculator
+
+    @property
+    def fuzzy(self):
+        if self._fuzzy is None:
+            self._fuzzy = shared_classifier(tuple(self._exemplars()))
+        return self._fuzzy
+
+    def _exemplars(self):
+        """(intent, phrase) pairs for the fuzzy classifier: intent exemplars and known app/service names.
+        Destructive intents have none, so a misheard command can never be corrected into one."""
+        for it in self.router.intents:
+            if it.destructive:
+                continue
+            for phrase in it.exemplars():
+                yield it.name, phrase
+        apps = sorted(set(self.app_paths) | set(self.custom_apps))
+        for app in apps:
+            yield "apps.open", f"open {app}"
+        for app in apps:
+            yield "apps.close", f"close {app}"
+        for service in self.web_services:
+            yield "web.service", f"open {service}"
+
+    def warm_up(self, background=True):
+        """Preload the lazily imported dependencies and start the background
+        samplers so the first command that needs them does not pay for it."""
+        return warm_up(webbrowser, calculator.np, lambda: self.knowledge.session,
+                       lambda: self.sampler, lambda: self.processes, lambda: self.fuzzy,
+                       background=background)
+
+    def static_responses(self):
+        """Replies whose text never changes, for the speaker to synthesise ahead of time."""
+        replies = self.greetings + self.jokes + self.fun_facts + self.hobbies_responses
+        for responses in self.mood_responses.values():
+            replies += responses
+        # Handlers without side effects that always return the same text
+        for handler in (self._how_are_you, self._capabilities, self._favorite, self._thanks, self._goodbye):
+            replies.append(handler("", None))
+        return replies + list(FIXED_REPLIES)
 
     def process(self, command):
         """Process voice commands and return text response."""
+        start = time.perf_counter()
+        self._handled = "empty"  # intent label for the metrics, set once routed
+        try:
+            return self._process(command)
+        except Exception:
+            COMMAND_ERRORS.labels(self._handled).inc()
+            log.error("command failed", intent=self._handled, exc_info=True)
+            raise
+        finally:
+            COMMAND_SECONDS.labels(self._handled).observe(time.perf_counter() - start)
+
+    def _process(self, command):
+        self.last_jobs = []
+        self._current = None
         if not command:
             return ""
             
@@ -107,367 +279,571 @@ class CommandProcessor:
         if not cmd or cmd.isspace() or all(c in '.,/#!$%^&*;:{}=-_`~' for c in cmd):
             return ""
             
-        print(f"[DEBUG] Processing command: '{cmd}'")  # Debug log
-        
+        intent, match = self.router.route(cmd)
+        if intent is None:
+            intent, match, cmd = self._fuzzy_route(cmd)
+        elif intent.name in ("apps.open", "apps.close") and match.start() > 0:
+            # Words before the verb may be another command misheard, as in "wen did i last open chrome"
+            fixed_intent, fixed_match, fixed = self._fuzzy_route(cmd)
+            if fixed_intent is not None and fixed_intent is not intent:
+                intent, match, cmd = fixed_intent, fixed_match, fixed
+        self._handled = intent.name if intent else "unknown"
+        log.debug("command", command=cmd, intent=self._handled)
+
         # Add command to history (except for undo/close commands)
         if not any(word in cmd for word in ['undo', 'close']):
-            self.command_history.append({
-                'command': cmd,
-                'timestamp': datetime.datetime.now(),
-                'app_opened': None
-            })
-            # Trim history if too long
-            if len(self.command_history) > self.max_history:
-                self.command_history.pop(0)
-
-        # Notes/Reminders management
-        if "remind me to" in cmd:
-            note = cmd.replace("remind me to", "").strip()
-            if note:
-                self.notes.append(note)
-                return f"I'll remind you to {note}"
-            return "Please specify what you'd like me to remind you about."
-            
-        if "read notes" in cmd or "show notes" in cmd or "show reminders" in cmd:
-            if self.notes:
-                return "Your reminders:\n" + "\n".join(f"{i+1}. {note}" for i, note in enumerate(self.notes))
-            return "You don't have any reminders yet."
-            
-        if "clear notes" in cmd or "clear reminders" in cmd:
-            self.notes = []
-            return "All reminders have been cleared."
-            
-        # Task management
-        if "add task" in cmd:
-            task = cmd.replace("add task", "").strip()
-            if task:
-                self.tasks.append({"task": task, "completed": False})
-                return f"Task added: {task}"
-            return "Please specify the task."
-            
-        if "show tasks" in cmd or "list tasks" in cmd:
-            if self.tasks:
-                tasks_list = []
-                for i, task in enumerate(self.tasks):
-                    status = "✓" if task["completed"] else "○"
-                    tasks_list.append(f"{i+1}. [{status}] {task['task']}")
-                return "Your tasks:\n" + "\n".join(tasks_list)
-            return "You don't have any tasks yet."
-            
-        if "complete task" in cmd:
+            entry = self._current = self.command_history.append(
+                cmd, datetime.datetime.now(), intent.name if intent else None)
+            self._record("history_add", hseq=entry.seq, command=cmd, timestamp=entry.timestamp,
+                         intent=entry.intent)
+
+        # A handler already started on an interim transcript of this command
+        if self._speculator is not None:
+            speculated = self._speculator.take(intent, match)
+            if speculated is not None:
+                return speculated
+
+        if intent is None:
+            # Only return the "don't understand" message for non-empty, actual commands
+            if len(cmd.strip()) > 0 and not all(c in '.,/#!$%^&*;:{}=-_`~' for c in cmd):
+                return NOT_UNDERSTOOD
+            return ""
+        return getattr(self, intent.handler)(cmd, match)
+
+    def _fuzzy_route(self, cmd):
+        """Route a command no trigger matched through its closest exemplar, e.g. a
+        misheard "shoe tasks" as "show tasks". Returns (intent, match, command)."""
+        result = self.fuzzy.classify(cmd)
+        if result is None:
+            return None, None, cmd
+        intent, match = self.router.route(result.corrected)
+        if intent is None or intent.destructive:
+            return None, None, cmd
+        log.debug("fuzzy match", command=cmd, corrected=result.corrected, score=round(result.score, 2))
+        return intent, match, result.corrected
+
+    # Intent handlers. Declaration order is the routing priority: the first
+    # intent whose keyword or pattern matches the command handles it.
+
+    # Notes/Reminders management
+    @intent("notes.add", keywords=["remind me to"])
+    def _remind(self, cmd, match):
+        note = cmd.replace("remind me to", "").strip()
+        if note:
+            self.notes.append(note)
+            self._record("note_add", note=note)
+            self._remember(undo=("remove_note", len(self.notes) - 1))
+            return f"I'll remind you to {note}"
+        return NO_REMINDER_GIVEN
+
+    @intent("notes.show", keywords=["read notes", "show notes", "show reminders"], read_only=True)
+    def _show_notes(self, cmd, match):
+        if self.notes:
+            return "Your reminders:\n" + "\n".join(f"{i+1}. {note}" for i, note in enumerate(self.notes))
+        return NO_REMINDERS
+
+    @intent("notes.clear", keywords=["clear notes", "clear reminders"], destructive=True)
+    def _clear_notes(self, cmd, match):
+        if self.notes:
+            self._remember(undo=("restore_notes", list(self.notes)))
+        self.notes.clear()
+        self._record("notes_clear")
+        return REMINDERS_CLEARED
+
+    # Task management
+    @intent("tasks.add", keywords=["add task"])
+    def _add_task(self, cmd, match):
+        task = cmd.replace("add task", "").strip()
+        if task:
+            self.tasks.append({"task": task, "completed": False})
+            self._record("task_add", task=task)
+            self._remember(undo=("remove_task", len(self.tasks) - 1))
+            return f"Task added: {task}"
+        return NO_TASK_GIVEN
+
+    @intent("tasks.show", keywords=["show tasks", "list tasks"], read_only=True)
+    def _show_tasks(self, cmd, match):
+        if self.tasks:
+            tasks_list = []
+            for i, task in enumerate(self.tasks):
+                status = "✓" if task["completed"] else "○"
+                tasks_list.append(f"{i+1}. [{status}] {task['task']}")
+            return "Your tasks:\n" + "\n".join(tasks_list)
+        return NO_TASKS
+
+    @intent("tasks.complete", keywords=["complete task"])
+    def _complete_task(self, cmd, match):
+        try:
+            task_num = int(''.join(filter(str.isdigit, cmd))) - 1
+            if 0 <= task_num < len(self.tasks):
+                if not self.tasks[task_num]["completed"]:
+                    self._remember(undo=("uncomplete_task", task_num))
+                self.tasks[task_num]["completed"] = True
+                self._record("task_complete", index=task_num)
+                return f"Marked task {task_num + 1} as completed."
+            return INVALID_TASK_NUMBER
+        except ValueError:
+            return NO_TASK_NUMBER
+
+    @intent("tasks.clear", keywords=["clear tasks"], destructive=True)
+    def _clear_tasks(self, cmd, match):
+        if self.tasks:
+            self._remember(undo=("restore_tasks", [dict(task) for task in self.tasks]))
+        self.tasks.clear()
+        self._record("tasks_clear")
+        return TASKS_CLEARED
+
+    # Custom app management
+    @intent("apps.add_path", keywords=["add app path"])
+    def _add_app_path(self, cmd, match):
+        parts = cmd.replace("add app path", "").strip().split("as")
+        if len(parts) == 2:
+            path = parts[0].strip()
+            name = parts[1].strip()
+            self.custom_apps[name] = path
+            self._record("app_add", name=name, path=path)
+            self._fuzzy = None
+            return f"Added {name} with path: {path}"
+        return "Please specify both the path and name for the app."
+
+    # Casual Conversation
+    @intent("chat.how_are_you", patterns=[r'\b(how are you|how\'s it going|how do you feel)\b'],
+            examples=["how are you", "how's it going", "how do you feel"])
+    def _how_are_you(self, cmd, match):
+        return "I'm doing great, thanks for asking! I'm always happy to chat and help. How are you?"
+
+    # Handle user's mood responses
+    @intent("chat.mood_good", patterns=[r'i(?:\s+am|\'m)\s+(good|great|happy|amazing|excellent)'],
+            examples=["i'm good", "i'm happy", "i am great", "i am happy"])
+    def _mood_good(self, cmd, match):
+        return self.mood_responses["good"][int(datetime.datetime.now().timestamp()) % 3]
+
+    @intent("chat.mood_bad", patterns=[r'i(?:\s+am|\'m)\s+(bad|sad|depressed|unhappy|terrible)'],
+            examples=["i'm sad", "i'm bad", "i am sad", "i am unhappy"])
+    def _mood_bad(self, cmd, match):
+        return self.mood_responses["bad"][int(datetime.datetime.now().timestamp()) % 3]
+
+    @intent("chat.mood_okay", patterns=[r'i(?:\s+am|\'m)\s+(okay|fine|alright|not bad)'],
+            examples=["i'm okay", "i'm fine", "i am fine", "i am alright"])
+    def _mood_okay(self, cmd, match):
+        return self.mood_responses["okay"][int(datetime.datetime.now().timestamp()) % 3]
+
+    # Tell a joke
+    @intent("chat.joke", patterns=[r'\b(tell\s+(?:me\s+)?a\s+joke|make\s+me\s+laugh|joke)\b'],
+            examples=["tell me a joke", "make me laugh"])
+    def _joke(self, cmd, match):
+        return self.jokes[int(datetime.datetime.now().timestamp()) % len(self.jokes)]
+
+    # Share a fun fact
+    @intent("chat.fact", patterns=[r'\b(tell\s+(?:me\s+)?a\s+fact|fun\s+fact|interesting\s+fact)\b'],
+            examples=["tell me a fact", "fun fact", "interesting fact"])
+    def _fun_fact(self, cmd, match):
+        return self.fun_facts[int(datetime.datetime.now().timestamp()) % len(self.fun_facts)]
+
+    # Talk about hobbies/interests
+    @intent("chat.hobbies", patterns=[r'\b(what\s+do\s+you\s+like|your\s+hobbies|what\s+interests\s+you)\b'],
+            examples=["what do you like", "your hobbies", "what interests you"])
+    def _hobbies(self, cmd, match):
+        return self.hobbies_responses[int(datetime.datetime.now().timestamp()) % len(self.hobbies_responses)]
+
+    # Share capabilities and self-introduction
+    @intent("chat.capabilities", patterns=[r'\b(tell\s+me\s+about\s+yourself|what\s+do\s+you\s+think\s+about|what\s+can\s+you\s+do)\b'],
+            examples=["tell me about yourself", "what can you do"])
+    def _capabilities(self, cmd, match):
+        capabilities = [
+            "Hello! I'm AURA, your digital assistant. Here's what I can do for you:",
+            " App Control: I can open and close applications like Chrome, Comet browser, Notepad, Calculator, and more",
+            " Web Services: I can help you with YouTube, Google Maps, Gmail, LinkedIn, and other web services",
+            " Task Management: I can maintain your to-do list and set reminders",
+            " Web Search: I can search the web and find information on Wikipedia",
+            " Calculator: I can perform basic calculations",
+            " Browser Control: I can manage tabs (new, close, switch) in your browser",
+            " Conversation: I can chat, tell jokes, share fun facts, and respond to your mood",
+            " System Info: I can monitor your system's CPU, memory, and disk usage",
+            "Feel free to ask me to help with any of these tasks!"
+        ]
+        return "\n".join(capabilities)
+
+    # Favorite things
+    @intent("chat.favorite", patterns=[r'what\'s\s+your\s+favorite\b'], examples=["what's your favorite"])
+    def _favorite(self, cmd, match):
+        return "That's a tricky one for an AI! I appreciate all kinds of things but I especially enjoy our conversations and helping you out!"
+
+    # Casual thanks
+    @intent("chat.thanks", patterns=[r'\b(thank you|thanks)\b'], examples=["thank you", "thanks"])
+    def _thanks(self, cmd, match):
+        return "You're welcome! It's my pleasure to help!"
+
+    # Basic greetings with more variety
+    @intent("chat.greeting", patterns=[r'\b(hello|hi|hey)\b'], examples=["hello"])
+    def _greeting(self, cmd, match):
+        return self.greetings[int(datetime.datetime.now().timestamp()) % len(self.greetings)]
+
+    # History queries; declared before apps.open, whose pattern would also match
+    @intent("history.opened", patterns=[r'\b(?:what|which) (?:apps? )?(?:did|have) i (?:open|opened)\b'],
+            examples=["what did i open", "which apps did i open today"])
+    def _opened(self, cmd, match):
+        today = "today" in cmd
+        since = datetime.datetime.combine(datetime.date.today(), datetime.time()) if today else None
+        opened = [e for e in self.command_history.entries(intent="apps.open", since=since) if e.app]
+        when = "today" if today else "recently"
+        if not opened:
+            return f"You haven't opened any apps {when}."
+        items = ", ".join(f"{e.app} at {e.timestamp.strftime('%I:%M %p')}" for e in opened[:10])
+        return f"You opened {items} {when}." if today else f"Recently you opened {items}."
+
+    @intent("history.app_last_opened", patterns=[r'\bwhen did i (?:last )?open (\w+)'],
+            examples=["when did i last open"])
+    def _when_opened(self, cmd, match):
+        app = match.group(1)
+        entry = next(self.command_history.entries(app=app), None)
+        if entry is None:
+            return f"I don't remember you opening {app}."
+        return f"You last opened {app} on {entry.timestamp.strftime('%B %d at %I:%M %p')}."
+
+    # Open Applications with typing/searching capability
+    @intent("apps.open", patterns=[r'open (\w+)(?: and (?:type|search)(?: for)? (.+))?'])
+    def _open_app(self, cmd, match):
+        app = match.group(1)
+        text_to_type = match.group(2) if match.group(2) else None
+        path = self.custom_apps.get(app) or self.app_paths.get(app)
+
+        if path:
             try:
-                task_num = int(''.join(filter(str.isdigit, cmd))) - 1
-                if 0 <= task_num < len(self.tasks):
-                    self.tasks[task_num]["completed"] = True
-                    return f"Marked task {task_num + 1} as completed."
-                return "Invalid task number."
-            except ValueError:
-                return "Please specify the task number to complete."
-                
-        if "clear tasks" in cmd:
-            self.tasks = []
-            return "All tasks have been cleared."
-            
-        # Custom app management
-        if "add app path" in cmd:
-            parts = cmd.replace("add app path", "").strip().split("as")
-            if len(parts) == 2:
-                path = parts[0].strip()
-                name = parts[1].strip()
-                self.custom_apps[name] = path
-                return f"Added {name} with path: {path}"
-            return "Please specify both the path and name for the app."
-
-        # Casual Conversation
-        if re.search(r'\b(how are you|how\'s it going|how do you feel)\b', cmd):
-            return "I'm doing great, thanks for asking! I'm always happy to chat and help. How are you?"
-
-        # Handle user's mood responses
-        if re.search(r'i(?:\s+am|\'m)\s+(good|great|happy|amazing|excellent)', cmd):
-            return self.mood_responses["good"][int(datetime.datetime.now().timestamp()) % 3]
-        if re.search(r'i(?:\s+am|\'m)\s+(bad|sad|depressed|unhappy|terrible)', cmd):
-            return self.mood_responses["bad"][int(datetime.datetime.now().timestamp()) % 3]
-        if re.search(r'i(?:\s+am|\'m)\s+(okay|fine|alright|not bad)', cmd):
-            return self.mood_responses["okay"][int(datetime.datetime.now().timestamp()) % 3]
-
-        # Tell a joke
-        if re.search(r'\b(tell\s+(?:me\s+)?a\s+joke|make\s+me\s+laugh|joke)\b', cmd):
-            return self.jokes[int(datetime.datetime.now().timestamp()) % len(self.jokes)]
-
-        # Share a fun fact
-        if re.search(r'\b(tell\s+(?:me\s+)?a\s+fact|fun\s+fact|interesting\s+fact)\b', cmd):
-            return self.fun_facts[int(datetime.datetime.now().timestamp()) % len(self.fun_facts)]
-
-        # Talk about hobbies/interests
-        if re.search(r'\b(what\s+do\s+you\s+like|your\s+hobbies|what\s+interests\s+you)\b', cmd):
-            return self.hobbies_responses[int(datetime.datetime.now().timestamp()) % len(self.hobbies_responses)]
-
-        # Share capabilities and self-introduction
-        if re.search(r'\b(tell\s+me\s+about\s+yourself|what\s+do\s+you\s+think\s+about|what\s+can\s+you\s+do)\b', cmd):
-            capabilities = [
-                "Hello! I'm AURA, your digital assistant. Here's what I can do for you:",
-                " App Control: I can open and close applications like Chrome, Comet browser, Notepad, Calculator, and more",
-                " Web Services: I can help you with YouTube, Google Maps, Gmail, LinkedIn, and other web services",
-                " Task Management: I can maintain your to-do list and set reminders",
-                " Web Search: I can search the web and find information on Wikipedia",
-                " Calculator: I can perform basic calculations",
-                " Browser Control: I can manage tabs (new, close, switch) in your browser",
-                " Conversation: I can chat, tell jokes, share fun facts, and respond to your mood",
-                " System Info: I can monitor your system's CPU, memory, and disk usage",
-                "Feel free to ask me to help with any of these tasks!"
-            ]
-            return "\n".join(capabilities)
-
-        # Favorite things
-        if re.search(r'what\'s\s+your\s+favorite\b', cmd):
-            return "That's a tricky one for an AI! I appreciate all kinds of things but I especially enjoy our conversations and helping you out!"
-
-        # Casual thanks
-        if re.search(r'\b(thank you|thanks)\b', cmd):
-            return "You're welcome! It's my pleasure to help!"
-
-        # Basic greetings with more variety
-        if re.search(r'\b(hello|hi|hey)\b', cmd):
-            greetings = [
-                "Hello! How can I help you today?",
-                "Hi there! Always nice to chat with you!",
-                "Hey! What's on your mind?",
-                "Greetings! How can I assist you?",
-                "Hi! Ready to help whenever you need!"
-            ]
-            return greetings[int(datetime.datetime.now().timestamp()) % len(greetings)]
-
-        # Open Applications with typing/searching capability
-        elif match := re.search(r'open (\w+)(?: and (?:type|search)(?: for)? (.+))?', cmd):
-            app = match.group(1)
-            text_to_type = match.group(2) if match.group(2) else None
-            path = self.custom_apps.get(app) or self.app_paths.get(app)
-            
-            if path:
-                try:
-                    import pyautogui
-                    import time
-                    
-                    # Special handling for Comet browser
-                    if app.lower() == "comet":
-                        if text_to_type:
-                            webbrowser.get('comet').open_new_tab(f"https://www.google.com/search?q={quote_plus(text_to_type)}")
-                            return f"Opening Comet and searching for '{text_to_type}'"
-                        else:
-                            webbrowser.get('comet').open_new_tab('about:blank')
-                            return "Opening Comet browser."
-                    
-                    # Open other applications
-                    if path.startswith("http"):
-                        webbrowser.open(path)
-                    else:
-                        subprocess.Popen(path)
-                    
-                    self.last_opened_app = app
-                    
-                    # Update the last command's app_opened field
-                    if self.command_history:
-                        self.command_history[-1]['app_opened'] = app
-                    
-                    # If there's text to type, wait briefly for the app to open then type
+                # Special handling for Comet browser
+                if app.lower() == "comet":
                     if text_to_type:
-                        time.sleep(2)  # Wait for app to open
-                        pyautogui.write(text_to_type)
-                        pyautogui.press('enter')
-                        return f"Opening {app} and typing '{text_to_type}'"
-                    
-                    return f"Opening {app}."
-                except Exception as e:
-                    print(f"[DEBUG] Error opening {app}: {e}")
-                    return f"Failed to open {app}."
-            else:
+                        webbrowser.get('comet').open_new_tab(f"https://www.google.com/search?q={quote_plus(text_to_type)}")
+                        return f"Opening Comet and searching for '{text_to_type}'"
+                    else:
+                        webbrowser.get('comet').open_new_tab('about:blank')
+                        return "Opening Comet browser."
+
+                # Open other applications
+                if path.startswith("http"):
+                    webbrowser.open(path)
+                else:
+                    self.processes.register(app, subprocess.Popen(path))
+
+                self.last_opened_app = app
+
+                # Note the app on this command's history entry so undo can close it
+                self._remember(app=app, undo=("close_app", app))
+
+                # If there's text to type, wait for the app to open then type, off the request thread
+                if text_to_type:
+                    self._schedule(app, self._type_into, app, text_to_type)
+                    return f"Opening {app} and typing '{text_to_type}'"
+
+                return f"Opening {app}."
+            except Exception as e:
+                log.warning("open failed", app=app, error=str(e))
+                return f"Failed to open {app}."
+        else:
+            # "open note pad": try the closest known app name before giving up, but only
+            # a correction to an app name; "open tap" is not a reason to open anything
+            intent, match, fixed = self._fuzzy_route(cmd)
+            if intent is None:
                 return f"App {app} not found in my database."
+            if intent is self.router.by_name["apps.open"] and self._known_app(match.group(1)):
+                return self._open_app(fixed, match)
+            return NOT_UNDERSTOOD
 
-        # Undo command
-        elif re.search(r'\bundo\b', cmd):
-            if not self.command_history:
-                return "No previous commands to undo."
-            
-            last_cmd = self.command_history[-1]
-            if match := re.search(r'open (\w+)', last_cmd['command']):
-                app = match.group(1)
-                result = self.close_application(app)
-                self.command_history.pop()  # Remove the command we just undid
-                return f"Undoing last command: {result}"
-            return "Cannot undo the last command automatically."
-
-        # Close command
-        elif re.search(r'close', cmd):
-            if self.last_opened_app:
-                result = self.close_application(self.last_opened_app)
-                closed_name = self.last_opened_app
+    # Undo command: "undo" reverses the most recent reversible command, "undo 3" the last three
+    @intent("apps.undo", patterns=[r'\bundo\b'], examples=["undo"])
+    def _undo(self, cmd, match):
+        if not self.command_history:
+            return NOTHING_TO_UNDO
+        count = re.search(r'\bundo (?:the )?(?:last )?(\d+)', cmd)
+        count = int(count.group(1)) if count else 1
+        undone = []
+        for _ in range(count):
+            entry, action = self.command_history.pop_undo()
+            if entry is None:
+                break
+            undone.append(self._reverse(action))
+            self._record("history_undone", hseq=entry.seq)
+        if not undone:
+            return CANNOT_UNDO
+        if len(undone) == 1:
+            return f"Undoing last command: {undone[0]}."
+        return f"Undoing last {len(undone)} commands: " + "; ".join(undone) + "."
+
+    def _reverse(self, action):
+        """Apply the inverse of a command recorded in history; returns a short description."""
+        kind, arg = action
+        if kind == "close_app":
+            self._schedule(arg, self.close_application, arg)
+            if self.last_opened_app == arg:
                 self.last_opened_app = None
-                return f"Closing {closed_name}. {result}"
-            # Try close specific app if mentioned
-            match = re.search(r'close (\w+)', cmd)
-            if match:
-                return self.close_application(match.group(1))
-            return "No recent application to close."
-
-        # Time and Date queries
-        elif re.search(r'\b(what\s+time|current\s+time|time\s+now)\b', cmd):
-            return datetime.datetime.now().strftime("The time is %I:%M %p.")
-            
-        elif re.search(r'\b(what\s+date|today\'s\s+date|current\s+date)\b', cmd):
-            return datetime.datetime.now().strftime("Today is %A, %B %d, %Y.")
-
-        # YouTube playback
-        elif match := re.search(r'play (.+?)(?:\s+on\s+youtube|\s*$)', cmd):
-            query = quote_plus(match.group(1))
-            webbrowser.open(f"https://www.youtube.com/results?search_query={query}")
-            return f"Opening YouTube and searching for {match.group(1)}."
-            
-        # Tab management commands
-        elif cmd == "new tab":
-            try:
-                webbrowser.get('comet').open_new_tab('about:blank')
-            except:
-                webbrowser.open_new_tab('about:blank')
-            return "Opening new tab."
-            
-        elif cmd == "close tab":
-            import pyautogui
-            time.sleep(0.5)  # Small delay to ensure command is ready
-            pyautogui.hotkey('ctrl', 'w')
-            return "Closing current tab."
-            
-        elif cmd == "close all tabs":
-            import pyautogui
-            time.sleep(0.5)  # Small delay to ensure command is ready
-            pyautogui.hotkey('alt', 'f4')  # Close entire window
-            return "Closing all tabs."
-            
-        elif cmd == "next tab":
-            import pyautogui
-            time.sleep(0.5)  # Small delay to ensure command is ready
-            pyautogui.hotkey('ctrl', 'tab')
-            return "Switching to next tab."
-            
-        elif cmd == "previous tab":
-            import pyautogui
-            time.sleep(0.5)  # Small delay to ensure command is ready
-            pyautogui.hotkey('ctrl', 'shift', 'tab')
-            return "Switching to previous tab."
-            
-        # Web services
-        elif match := re.search(r'open\s+(?:web\s+)?(?:service\s+)?(\w+)(?:\s+and\s+(?:search|type)\s+(.+))?', cmd):
-            service = match.group(1).lower()
-            query = match.group(2)
-            
-            if service in self.web_services:
-                url = self.web_services[service]
-                if query:
-                    if service == "youtube":
-                        url += f"/results?search_query={quote_plus(query)}"
-                    elif service == "maps":
-                        url += f"/search/{quote_plus(query)}"
-                    elif service in ["github", "twitter", "amazon"]:
-                        url += f"/search?q={quote_plus(query)}"
-                    else:
-                        url += f"/search?q={quote_plus(query)}"
-                webbrowser.open(url)
-                return f"Opening {service}" + (f" and searching for {query}" if query else "")
-            
-        # Search Google (keep this after other search handlers)
-        elif match := re.search(r'search (.+)', cmd):
-            query = quote_plus(match.group(1))
-            webbrowser.open(f"https://www.google.com/search?q={query}")
-            return f"Searching for {match.group(1)}."
-
-        # Wikipedia
-        elif match := re.search(r'wikipedia (.+)', cmd):
-            topic = match.group(1)
-            try:
-                summary = wikipedia.summary(topic, sentences=2)
-                return summary
-            except Exception as e:
-                print(f"[DEBUG] Wikipedia error: {e}")
-                return f"I couldn't find information about {topic} on Wikipedia."
+            return f"closing {arg}"
+        if kind == "remove_task" and 0 <= arg < len(self.tasks):
+            task = self.tasks.pop(arg)
+            self._record("task_remove", index=arg)
+            return f"removed task '{task['task']}'"
+        if kind == "uncomplete_task" and 0 <= arg < len(self.tasks):
+            self.tasks[arg]["completed"] = False
+            self._record("task_uncomplete", index=arg)
+            return f"marked task {arg + 1} as not completed"
+        if kind == "restore_tasks":
+            self.tasks[:] = [dict(task) for task in arg]
+            self._record("tasks_restore", items=self.tasks)
+            return f"restored {len(arg)} tasks"
+        if kind == "remove_note" and 0 <= arg < len(self.notes):
+            note = self.notes.pop(arg)
+            self._record("note_remove", index=arg)
+            return f"removed reminder '{note}'"
+        if kind == "restore_notes":
+            self.notes[:] = arg
+            self._record("notes_restore", items=self.notes)
+            return f"restored {len(arg)} reminders"
+        return f"could not undo {kind.replace('_', ' ')}"
 
-        # Answer short factual questions (what/how/who/explain)
-        elif match := re.search(r'^(what|how|who|explain)\s+(.+)', cmd):
-            qtype = match.group(1)
-            query = match.group(2)
-            print(f"[DEBUG] Question detected ({qtype}): {query}")
+    # Close command
+    @intent("apps.close", patterns=[r'close'])
+    def _close(self, cmd, match):
+        if self.last_opened_app:
+            closed_name = self.last_opened_app
+            self._schedule(closed_name, self.close_application, closed_name)
+            self.last_opened_app = None
+            return f"Closing {closed_name}."
+        # Try close specific app if mentioned
+        match = re.search(r'close (\w+)', cmd)
+        if match:
+            app = match.group(1)
+            if not self._known_app(app):
+                # "close note pad": use the closest known app name, if any; a correction
+                # to anything else ("close tap" -> "close tab") closes nothing
+                intent, _, fixed = self._fuzzy_route(cmd)
+                if intent is not None:
+                    target = re.search(r'close (\w+)', fixed)
+                    if intent is not self.router.by_name["apps.close"] or target is None \
+                            or not self._known_app(target.group(1)):
+                        return NOT_UNDERSTOOD
+                    app = target.group(1)
+            self._schedule(app, self.close_application, app)
+            return f"Closing {app}."
+        return NOTHING_TO_CLOSE
 
-            # DuckDuckGo Instant Answer API first (no API key)
-            try:
-                ddg_q = quote_plus(query)
-                ddg_url = f"https://api.duckduckgo.com/?q={ddg_q}&format=json&no_redirect=1&no_html=1"
-                r = requests.get(ddg_url, timeout=5)
-                if r.ok:
-                    data = r.json()
-                    abstract = data.get('Abstract') or ''
-                    if abstract:
-                        return self._shorten(abstract, 2)
-
-                    # RelatedTopics as fallback
-                    related = data.get('RelatedTopics', [])
-                    for item in related:
-                        text = item.get('Text') if isinstance(item, dict) else ''
-                        if text:
-                            return self._shorten(text, 2)
-            except Exception as e:
-                print(f"[DEBUG] DuckDuckGo error: {e}")
+    def _known_app(self, name):
+        return name in self.custom_apps or name in self.app_paths
 
-            # Fallback to Wikipedia search
-            try:
-                summary = wikipedia.summary(query, sentences=2)
-                return summary
-            except Exception as e:
-                print(f"[DEBUG] Fallback Wikipedia error: {e}")
-                return f"I couldn't find a concise answer for {query}. I can search the web if you'd like."
+    # Time and Date queries
+    @intent("clock.time", patterns=[r'\b(what\s+time|current\s+time|time\s+now)\b'],
+            examples=["what time is it", "current time"])
+    def _time(self, cmd, match):
+        return datetime.datetime.now().strftime("The time is %I:%M %p.")
 
-        # Goodbye
-        elif re.search(r'\b(goodbye|exit)\b', cmd):
-            return "Goodbye! Have a great day!"
+    @intent("clock.date", patterns=[r'\b(what\s+date|today\'s\s+date|current\s+date)\b'],
+            examples=["what date is it", "today's date"])
+    def _date(self, cmd, match):
+        return datetime.datetime.now().strftime("Today is %A, %B %d, %Y.")
 
-        # Calculator
-        elif match := re.search(r'calculate\s+(.*)', cmd):
-            expr = match.group(1).replace('x', '*')
-            try:
-                # Safely evaluate basic math with limited functions
-                allowed = {k: v for k, v in math.__dict__.items() 
-                         if k in ('sin', 'cos', 'tan', 'sqrt', 'pi')}
-                result = eval(expr, {"__builtins__": {}}, allowed)
-                return f"The result is {result}"
-            except Exception:
-                return "Sorry, I couldn't calculate that. Try something like '2 + 2' or 'sqrt(16)'."
-
-        # System Info
-        elif re.search(r'system\s+info', cmd):
-            try:
-                cpu = psutil.cpu_percent(interval=1)
-                mem = psutil.virtual_memory().percent
-                disk = psutil.disk_usage('/').percent
-                return f"System Status: CPU usage: {cpu}%, Memory usage: {mem}%, Disk usage: {disk}%"
-            except Exception as e:
-                print(f"[DEBUG] System info error: {e}")
-                return "Sorry, I couldn't get the system information."
+    # YouTube playback
+    @intent("media.play", patterns=[r'play (.+?)(?:\s+on\s+youtube|\s*$)'])
+    def _play(self, cmd, match):
+        query = quote_plus(match.group(1))
+        webbrowser.open(f"https://www.youtube.com/results?search_query={query}")
+        return f"Opening YouTube and searching for {match.group(1)}."
 
-        else:
-            # Only return the "don't understand" message for non-empty, actual commands
-            if len(cmd.strip()) > 0 and not all(c in '.,/#!$%^&*;:{}=-_`~' for c in cmd):
-                return "Sorry, I don't understand that command."
-            return ""
+    # Tab management commands
+    @intent("tabs.new", exact=["new tab"])
+    def _new_tab(self, cmd, match):
+        try:
+            webbrowser.get('comet').open_new_tab('about:blank')
+        except:
+            webbrowser.open_new_tab('about:blank')
+        return OPENING_NEW_TAB
+
+    @intent("tabs.close", exact=["close tab"])
+    def _close_tab(self, cmd, match):
+        self._schedule("browser", self._hotkey, 'ctrl', 'w')
+        return CLOSING_TAB
+
+    @intent("tabs.close_all", exact=["close all tabs"], destructive=True)
+    def _close_all_tabs(self, cmd, match):
+        self._schedule("browser", self._hotkey, 'alt', 'f4')
+        return CLOSING_ALL_TABS
+
+    @intent("tabs.next", exact=["next tab"])
+    def _next_tab(self, cmd, match):
+        self._schedule("browser", self._hotkey, 'ctrl', 'tab')
+        return NEXT_TAB
+
+    @intent("tabs.previous", exact=["previous tab"])
+    def _previous_tab(self, cmd, match):
+        self._schedule("browser", self._hotkey, 'ctrl', 'shift', 'tab')
+        return PREVIOUS_TAB
+
+    # Web services
+    @intent("web.service", patterns=[r'open\s+(?:web\s+)?(?:service\s+)?(\w+)(?:\s+and\s+(?:search|type)\s+(.+))?'])
+    def _web_service(self, cmd, match):
+        service = match.group(1).lower()
+        query = match.group(2)
+
+        if service in self.web_services:
+            url = self.web_services[service]
+            if query:
+                if service == "youtube":
+                    url += f"/results?search_query={quote_plus(query)}"
+                elif service == "maps":
+                    url += f"/search/{quote_plus(query)}"
+                elif service in ["github", "twitter", "amazon"]:
+                    url += f"/search?q={quote_plus(query)}"
+                else:
+                    url += f"/search?q={quote_plus(query)}"
+            webbrowser.open(url)
+            return f"Opening {service}" + (f" and searching for {query}" if query else "")
+
+    # Search Google (keep this after other search handlers)
+    @intent("web.search", patterns=[r'search (.+)'])
+    def _search(self, cmd, match):
+        query = quote_plus(match.group(1))
+        webbrowser.open(f"https://www.google.com/search?q={query}")
+        return f"Searching for {match.group(1)}."
+
+    # Wikipedia
+    @intent("knowledge.wikipedia", patterns=[r'wikipedia (.+)'], read_only=True)
+    def _wikipedia(self, cmd, match):
+        topic = match.group(1)
+        source, summary = self.knowledge.lookup(topic, sources=["wikipedia"])
+        if summary:
+            return summary
+        return f"I couldn't find information about {topic} on Wikipedia."
+
+    # Answer short factual questions (what/how/who/explain)
+    @intent("knowledge.question", patterns=[r'^(what|how|who|explain)\s+(.+)'], read_only=True)
+    def _question(self, cmd, match):
+        qtype = match.group(1)
+        query = match.group(2)
+        log.debug("question", type=qtype, query=query)
+
+        # The local index answers offline in a few milliseconds; the web is the fallback
+        if self.text_index is not None:
+            hit = self.text_index.search(query)
+            if hit:
+                log.debug("local answer", query=query, title=hit[0])
+                return self._shorten(hit[1], 2)
+
+        # DuckDuckGo Instant Answer API and Wikipedia in parallel, DuckDuckGo preferred
+        source, answer = self.knowledge.lookup(query)
+        if source == "duckduckgo":
+            return self._shorten(answer, 2)
+        if answer:
+            return answer
+        return f"I couldn't find a concise answer for {query}. I can search the web if you'd like."
+
+    # Goodbye
+    @intent("chat.goodbye", patterns=[r'\b(goodbye|exit)\b'], examples=["goodbye"])
+    def _goodbye(self, cmd, match):
+        return "Goodbye! Have a great day!"
+
+    # Calculator
+    @intent("calc.evaluate", patterns=[r'calculate\s+(.*)'])
+    def _calculate(self, cmd, match):
+        expr = match.group(1)
+        try:
+            # "calculate x squared for 1 to 1000" evaluates over the whole range at once
+            if rng := re.search(r'^(.+?)\s+for\s+(?:x\s+)?(?:from\s+|in\s+)?(-?\d+)\s+(?:to|through)\s+(-?\d+)$', expr):
+                start, stop = int(rng.group(2)), int(rng.group(3))
+                values = self.calculator.evaluate_range(rng.group(1), start, stop)
+                preview = ", ".join(format_number(v) for v in values[:5])
+                if len(values) > 5:
+                    preview += ", ..."
+                return (f"For x from {start} to {stop}: {preview} "
+                        f"(sum {format_number(values.sum())}, max {format_number(values.max())})")
+            result = self.calculator.evaluate(expr)
+            return f"The result is {result}"
+        except LimitExceeded:
+            return "Sorry, that calculation is too large for me."
+        except CalculatorError:
+            return "Sorry, I couldn't calculate that. Try something like '2 + 2' or 'sqrt(16)'."
+        except ValueError:
+            # More digits than Python will print (sys.set_int_max_str_digits)
+            return "Sorry, that calculation is too large for me."
+
+    # System Info
+    @intent("system.info", patterns=[r'system\s+info'], examples=["system info"], read_only=True)
+    def _system_info(self, cmd, match):
+        try:
+            sample = self.sampler.latest()
+            cpu, mem, disk = sample["cpu"], sample["memory"], sample["disk"]
+            status = f"System Status: CPU usage: {cpu}%, Memory usage: {mem}%, Disk usage: {disk}%"
+            averages = [f"{avg}% over {window // 60} min"
+                        for window, avg in self.sampler.averages("cpu").items() if avg is not None]
+            if averages:
+                status += ". Average CPU: " + ", ".join(averages)
+            return status
+        except Exception as e:
+            log.warning("system info failed", error=str(e))
+            return "Sorry, I couldn't get the system information."
 
     def _shorten(self, text, max_sentences=2):
         # Return up to max_sentences sentences from text
         if not text:
             return ''
-        # Split sentences on terminal punctuation
-        parts = re.split(r'(?<=[\.\?\!])\s+', text.strip())
+        # Split sentences on terminal punctuation (the same splitter streaming TTS uses)
+        parts = split_sentences(text)
         if len(parts) <= max_sentences:
             return ' '.join(parts).strip()
         return ' '.join(parts[:max_sentences]).strip()
 
+    def _state(self):
+        return {
+            "notes": self.notes,
+            "tasks": self.tasks,
+            "custom_apps": self.custom_apps,
+            "command_history": self.command_history.to_list(),
+        }
+
+    def list_items(self, name):
+        """The live tasks or reminders list behind the /api/tasks and /api/reminders endpoints."""
+        return self.tasks if name == "tasks" else self.notes
+
+    def _remember(self, app=None, undo=None):
+        """Attach the opened app and/or an undo action to the current command's history entry."""
+        entry = self._current
+        if entry is None:
+            return
+        if app is not None:
+            self.command_history.set_app(entry, app)
+        if undo is not None:
+            self.command_history.set_undo(entry, undo)
+        self._record("history_update", hseq=entry.seq, app=app, undo=undo)
+
+    def _record(self, op, **fields):
+        """Log a state change to the durable store, if there is one, and publish list deltas."""
+        if self.store is not None:
+            self.store.record(op, **fields)
+        self.feed.record(op, fields)
+
+    def close(self):
+        """Flush and close the durable store and end live list subscriptions."""
+        if self.store is not None:
+            self.store.close()
+        self.feed.close()
+
+    def _schedule(self, key, func, *args):
+        """Run a side effect on the action executor; its job ID is reported in last_jobs."""
+        job_id = self.actions.submit(key, func, *args, description=" ".join([func.__name__.strip('_')] + [str(a) for a in args]))
+        self.last_jobs.append(job_id)
+        return job_id
+
+    def _type_into(self, app, text):
+        import pyautogui
+        time.sleep(2)  # Wait for app to open
+        pyautogui.write(text)
+        pyautogui.press('enter')
+        return f"Typed '{text}' into {app}."
+
+    def _hotkey(self, *keys):
+        import pyautogui
+        time.sleep(0.5)  # Small delay to ensure command is ready
+        pyautogui.hotkey(*keys)
+        return "Sent " + "+".join(keys) + "."
+
     def close_application(self, app):
-        """Close a running application by process name."""
+        """Close a running application, by PID if AURA launched it, else by process name."""
         exe_name = None
         
         # Map app names to executable names
@@ -487,28 +863,23 @@ class CommandProcessor:
         # Handle browser-specific cases
         if app.lower() in ["comet", "chrome"]:
             import pyautogui
-            import time
             try:
                 time.sleep(0.5)
                 pyautogui.hotkey('alt', 'f4')
                 return f"Closing {app} browser."
             except Exception as e:
-                print(f"[DEBUG] Keyboard shortcut failed: {e}")
+                log.warning("keyboard shortcut failed", app=app, error=str(e))
         
         exe_name = exe_map.get(app.lower())
         
+        # Processes AURA launched are closed by PID; others via the name index
+        if self.processes.close(app, exe_name):
+            return f"Closed {app}."
         if exe_name:
-            found = False
-            for proc in psutil.process_iter(['name']):
-                try:
-                    if proc.info['name'] and proc.info['name'].lower() == exe_name.lower():
-                        proc.terminate()
-                        found = True
-                except Exception:
-                    pass
-            if found:
-                return f"Closed {app}."
-            else:
-                return f"No running process found for {app}."
+            return f"No running process found for {app}."
         else:
             return f"Cannot close {app} automatically."
+
+
+# Compile every @intent trigger once, in declaration order.
+CommandProcessor.router = IntentRouter.from_class(CommandProcessor)
@@ -0,0 +1,252 @@
+"""
+pipeline.py - Concurrent listen -> recognise -> process -> speak loop.
+Each stage runs on its own thread and hands Turns to the next through a bounded
+queue, so the microphone keeps capturing while earlier utterances are being
+recognised and answered. Every Turn carries start/end timestamps per stage;
+LatencyStats keeps p50/p95 per stage and end to end (speech captured -> first
+audio of the reply). Sources are plain iterables of audio, so the loop can be
+driven from a microphone or from recorded WAV fixtures (wav_source).
+Each Turn gets a request ID that the process stage sets for the logs.
+The loop runs for as long as the microphone does, so a Turn drops its audio once
+recognised and only the last keep_turns finished Turns are kept.
+"""
+import queue
+import threading
+import time
+import wave
+from collections import deque
+
+from logs import get_logger, new_request_id, request_context
+
+log = get_logger("pipeline")
+
+STAGES = ("capture", "recognise", "process", "speak")
+KEEP_TURNS = 100
+
+
+class AudioClip:
+    """Raw PCM audio; same fields as speech_recognition.AudioData."""
+    __slots__ = ("frame_data", "sample_rate", "sample_width", "path")
+
+    def __init__(self, frame_data, sample_rate, sample_width, path=None):
+        self.frame_data = frame_data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.path = path
+
+    @property
+    def duration(self):
+        return len(self.frame_data) / (self.sample_rate * self.sample_width)
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as f:
+        if f.getnchannels() != 1:
+            raise ValueError(f"{path}: expected mono audio")
+        return AudioClip(f.readframes(f.getnframes()), f.getframerate(), f.getsampwidth(), path)
+
+
+def wav_source(paths, realtime=False):
+    """Yield WAV fixtures as AudioClips; realtime=True waits each clip's duration, like a live microphone."""
+    for path in paths:
+        clip = read_wav(path)
+        if realtime:
+            time.sleep(clip.duration)
+        yield clip
+
+
+class Turn:
+    """One utterance on its way through the pipeline."""
+    __slots__ = ("id", "request_id", "audio", "text", "response", "error", "reply", "stamps")
+
+    def __init__(self, turn_id):
+        self.id = turn_id
+        self.request_id = new_request_id()
+        self.audio = None
+        self.text = None
+        self.response = None
+        self.error = None
+        self.reply = None  # what speak() returned, e.g. a speak.Utterance
+        self.stamps = {}  # stage -> (start, end), time.perf_counter() values
+
+    def duration(self, stage):
+        start, end = self.stamps[stage]
+        return end - start
+
+    @property
+    def end_to_end(self):
+        if "capture" not in self.stamps or "speak" not in self.stamps:
+            return None
+        return self.stamps["speak"][1] - self.stamps["capture"][1]
+
+
+class LatencyStats:
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.max_samples)).append(seconds)
+
+    def add_turn(self, turn):
+        for stage in turn.stamps:
+            self.add(stage, turn.duration(stage))
+        if turn.end_to_end is not None:
+            self.add("end_to_end", turn.end_to_end)
+
+    def percentile(self, name, p):
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return None
+        # Nearest-rank percentile
+        return samples[min(len(samples) - 1, max(0, int(round(p / 100 * len(samples))) - 1))]
+
+    def summary(self):
+        with self._lock:
+            names = list(self._samples)
+        return {name: {"count": len(self._samples[name]),
+                       "p50": self.percentile(name, 50),
+                       "p95": self.percentile(name, 95)} for name in names}
+
+    def report(self):
+        lines = [f"{'stage':<12}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}"]
+        for name, row in self.summary().items():
+            lines.append(f"{name:<12}{row['count']:>6}{row['p50'] * 1e3:>10.1f}{row['p95'] * 1e3:>10.1f}")
+        return "\n".join(lines)
+
+
+class VoicePipeline:
+    def __init__(self, source, recognize, process, speak, on_error=None, on_command=None,
+                 is_exit=None, queue_size=4, stats=None, wait_for_audio=5.0, keep_turns=KEEP_TURNS):
+        """
+        source:      iterable of audio (e.g. microphone captures or wav_source())
+        recognize:   audio -> text; may raise
+        process:     text -> reply text
+        speak:       reply text -> object with a `started` Event (speak.Utterance) or None
+        on_error:    (stage, exception) -> reply text to speak, or None
+        on_command:  called with the text as soon as a command is recognised (barge-in)
+        is_exit:     text -> True to stop after answering this command
+        keep_turns:  finished Turns kept in self.turns, most recent last
+        """
+        self.source = source
+        self.recognize = recognize
+        self.process = process
+        self.speak = speak
+        self.on_error = on_error
+        self.on_command = on_command
+        self.is_exit = is_exit or (lambda text: False)
+        self.stats = stats if stats is not None else LatencyStats()
+        self.wait_for_audio = wait_for_audio
+        self.turns = deque(maxlen=keep_turns)
+        self._queues = {stage: queue.Queue(queue_size) for stage in STAGES[1:]}
+        self._stop = threading.Event()
+        self._done = threading.Event()
+
+    def run(self):
+        """Run every stage until the source is exhausted or an exit command is answered."""
+        targets = (self._capture, self._recognise_stage, self._process_stage, self._speak_stage)
+        for stage, target in zip(STAGES, targets):
+            threading.Thread(target=target, name=f"aura-{stage}", daemon=True).start()
+        self._done.wait()
+        return self.stats
+
+    def stop(self):
+        self._stop.set()
+
+    def _put(self, stage, turn):
+        # Bounded queues: a stage that falls behind holds up the one before it
+        while not self._stop.is_set():
+            try:
+                self._queues[stage].put(turn, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, stage):
+        while True:
+            try:
+                return self._queues[stage].get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+
+    def _capture(self):
+        turn_id = 0
+        iterator = iter(self.source)
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            try:
+                audio = next(iterator)
+            except StopIteration:
+                break
+            except Exception as e:
+                log.warning("listening failed", error=str(e))
+                continue
+            turn_id += 1
+            turn = Turn(turn_id)
+            turn.audio = audio
+            turn.stamps["capture"] = (start, time.perf_counter())
+            self._put("recognise", turn)
+        self._put("recognise", None)
+
+    def _recognise_stage(self):
+        while True:
+            turn = self._get("recognise")
+            if turn is None:
+                break
+            start = time.perf_counter()
+            try:
+                turn.text = self.recognize(turn.audio)
+            except Exception as e:
+                turn.error = e
+            turn.audio = None  # raw PCM, not needed past this stage
+            turn.stamps["recognise"] = (start, time.perf_counter())
+            if turn.text and self.on_command is not None:
+                self.on_command(turn.text)
+            self._put("process", turn)
+        self._put("process", None)
+
+    def _process_stage(self):
+        while True:
+            turn = self._get("process")
+            if turn is None:
+                break
+            start = time.perf_counter()
+            if turn.error is not None:
+                turn.response = self.on_error("recognise", turn.error) if self.on_error else None
+            elif turn.text:
+                with request_context(turn.request_id):
+                    try:
+                        turn.response = self.process(turn.text)
+                    except Exception as e:
+                        turn.error = e
+                        turn.response = self.on_error("process", e) if self.on_error else None
+            turn.stamps["process"] = (start, time.perf_counter())
+            self._put("speak", turn)
+        self._put("speak", None)
+
+    def _speak_stage(self):
+        while True:
+            turn = self._get("speak")
+            if turn is None:
+                break
+            start = time.perf_counter()
+            if turn.response:
+                turn.reply = self.speak(turn.response)
+                started = getattr(turn.reply, "started", None)
+                if started is not None:
+                    started.wait(self.wait_for_audio)
+            first_audio = getattr(turn.reply, "first_audio", None)
+            turn.stamps["speak"] = (start, first_audio or time.perf_counter())
+            self.turns.append(turn)
+            self.stats.add_turn(turn)
+            with request_context(turn.request_id):
+                log.debug("turn", turn=turn.id, end_to_end_ms=round(turn.end_to_end * 1e3),
+                         **{f"{stage}_ms": round(turn.duration(stage) * 1e3) for stage in STAGES})
+            if turn.text and self.is_exit(turn.text):
+                self._stop.set()
+                break
+        self._done.set()
@@ -0,0 +1,184 @@
+"""
+processes.py - Registry of processes AURA launched plus an incremental name index.
+Closing an app AURA started is a dict lookup on its recorded PIDs. For other
+apps, ProcessIndex keeps name -> PIDs current by diffing psutil.pids() on a
+timer, so only processes that appeared since the last diff are inspected.
+"""
+import threading
+import time
+
+from lazy import LazyModule
+from logs import get_logger
+from metrics import EXTERNAL_SECONDS, EXTERNAL_ERRORS
+
+psutil = LazyModule("psutil")
+
+log = get_logger("processes")
+
+
+class ProcessIndex:
+    def __init__(self, max_age=2.0):
+        self.max_age = max_age
+        self._names = {}  # pid -> lowercase process name
+        self._by_name = {}  # lowercase process name -> set of pids
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Diff the live PID table against the index; look up names of new PIDs only."""
+        start = time.perf_counter()
+        try:
+            pids = set(psutil.pids())
+            with self._lock:
+                for pid in set(self._names) - pids:
+                    self._drop(pid)
+                for pid in pids - set(self._names):
+                    try:
+                        name = psutil.Process(pid).name().lower()
+                    except psutil.Error:
+                        continue
+                    self._names[pid] = name
+                    self._by_name.setdefault(name, set()).add(pid)
+                self._refreshed = time.monotonic()
+        except Exception:
+            EXTERNAL_ERRORS.labels("psutil_process_index").inc()
+            raise
+        finally:
+            EXTERNAL_SECONDS.labels("psutil_process_index").observe(time.perf_counter() - start)
+
+    def find(self, name):
+        """Running processes called `name`, refreshing first if the index is stale."""
+        if time.monotonic() - self._refreshed > self.max_age:
+            self.refresh()
+        name = name.lower()
+        with self._lock:
+            pids = list(self._by_name.get(name, ()))
+        procs = []
+        for pid in pids:
+            try:
+                proc = psutil.Process(pid)
+                # Guard against the PID having been reused since the last diff
+                if proc.name().lower() == name:
+                    procs.append(proc)
+            except psutil.Error:
+                with self._lock:
+                    self._drop(pid)
+        return procs
+
+    def start(self, interval=None):
+        """Refresh on a background thread every `interval` seconds (default max_age)."""
+        if self._thread is None:
+            interval = interval or self.max_age
+            self._thread = threading.Thread(target=self._run, args=(interval,),
+                                            name="aura-process-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                log.warning("process index refresh failed", error=str(e))
+            self._stop.wait(interval)
+
+    def _drop(self, pid):
+        name = self._names.pop(pid, None)
+        if name is not None:
+            pids = self._by_name.get(name)
+            if pids is not None:
+                pids.discard(pid)
+                if not pids:
+                    del self._by_name[name]
+
+
+class LaunchedProcess:
+    __slots__ = ("pid", "app", "started", "handle")
+
+    def __init__(self, pid, app, started, handle=None):
+        self.pid = pid
+        self.app = app
+        self.started = started
+        self.handle = handle
+
+    def alive(self):
+        if self.handle is not None:
+            return self.handle.poll() is None
+        return psutil.pid_exists(self.pid)
+
+    def terminate(self):
+        if self.handle is not None:
+            self.handle.terminate()
+        else:
+            psutil.Process(self.pid).terminate()
+
+
+class ProcessRegistry:
+    def __init__(self, index=None):
+        self.index = index if index is not None else ProcessIndex()
+        self._launched = {}  # app -> [LaunchedProcess]
+        self._lock = threading.Lock()
+
+    def register(self, app, handle):
+        """Record a process AURA started (a subprocess.Popen handle)."""
+        entry = LaunchedProcess(handle.pid, app, time.time(), handle)
+        with self._lock:
+            self._launched.setdefault(app, []).append(entry)
+        return entry
+
+    def launched(self, app):
+        """Still-running processes AURA started for app."""
+        with self._lock:
+            entries = [e for e in self._launched.get(app, ()) if e.alive()]
+            if entries:
+                self._launched[app] = entries
+            else:
+                self._launched.pop(app, None)
+            return entries
+
+    def close(self, app, exe_name=None):
+        """Terminate app's processes; returns how many were signalled.
+
+        Processes AURA launched are closed by PID without any scan; otherwise
+        the name index is consulted for exe_name.
+        """
+        entries = self.launched(app)
+        if entries:
+            closed = 0
+            for entry in entries:
+                try:
+                    entry.terminate()
+                    closed += 1
+                except Exception:
+                    pass
+            with self._lock:
+                self._launched.pop(app, None)
+            return closed
+        if not exe_name:
+            return 0
+        closed = 0
+        for proc in self.index.find(exe_name):
+            try:
+                proc.terminate()
+                closed += 1
+            except psutil.Error:
+                pass
+        return closed
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_registry():
+    """Process-wide registry whose name index refreshes in the background."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ProcessRegistry(ProcessIndex().start())
+        return _default
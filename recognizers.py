@@ -0,0 +1,211 @@
+"""
+recognizers.py - Speech-to-text backends for the voice loop.
+"google" (the default) sends each utterance to Google's web API through
+speech_recognition. "vosk" and "whisper" (whisper.cpp via pywhispercpp) run on
+the CPU with a local model that is loaded once per process and kept warm, so
+there is no network round trip and recognition keeps working offline.
+Backends accept speech_recognition AudioData or pipeline.AudioClip; stream()
+yields ("partial", text) while audio is fed and ends with ("final", text).
+Choose the backend with AURA_ASR (google, vosk, whisper) and the model with
+AURA_ASR_MODEL (a Vosk model directory or a whisper model name/path).
+"""
+import json
+import os
+import threading
+
+from lazy import LazyModule
+
+np = LazyModule("numpy")
+sr = LazyModule("speech_recognition")
+vosk = LazyModule("vosk")
+whispercpp = LazyModule("pywhispercpp.model")
+
+CHUNK_BYTES = 8000  # 0.25 s of 16 kHz 16-bit audio per streamed chunk
+
+
+class NotUnderstood(Exception):
+    """No speech could be recognised in the audio."""
+
+
+class RecognitionError(Exception):
+    """The recogniser itself failed (service unreachable, model missing)."""
+
+
+def pcm16(audio, rate):
+    """16-bit mono PCM bytes at `rate` from AudioData or an AudioClip."""
+    if hasattr(audio, "get_raw_data"):
+        return audio.get_raw_data(convert_rate=rate, convert_width=2)
+    width = audio.sample_width
+    if width == 1:
+        samples = (np.frombuffer(audio.frame_data, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif width == 2:
+        samples = np.frombuffer(audio.frame_data, dtype="<i2")
+    elif width == 4:
+        samples = (np.frombuffer(audio.frame_data, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"unsupported sample width: {width} bytes")
+    if audio.sample_rate != rate:
+        count = int(len(samples) * rate / audio.sample_rate)
+        positions = np.arange(count) * (audio.sample_rate / rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    return samples.astype("<i2").tobytes()
+
+
+def chunks(pcm, size=CHUNK_BYTES):
+    for start in range(0, len(pcm), size):
+        yield pcm[start:start + size]
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _load_model(key, load):
+    # One model per process: loading takes seconds, recognising reuses it
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            try:
+                model = _models[key] = load()
+            except Exception as e:
+                raise RecognitionError(f"could not load {key[0]} model: {e}") from e
+        return model
+
+
+class SpeechBackend:
+    name = None
+    sample_rate = 16000
+
+    def warm_up(self):
+        """Load the model now rather than on the first utterance."""
+
+    def recognize(self, audio, on_partial=None):
+        """Transcribe one utterance; on_partial(text) sees interim results."""
+        final = ""
+        for kind, text in self.stream(chunks(pcm16(audio, self.sample_rate))):
+            if kind == "partial":
+                if on_partial is not None:
+                    on_partial(text)
+            else:
+                final = text
+        if not final:
+            raise NotUnderstood("no speech recognised")
+        return final
+
+    def stream(self, pcm_chunks):
+        raise NotImplementedError
+
+
+class GoogleBackend(SpeechBackend):
+    name = "google"
+
+    def __init__(self, language="en-US"):
+        self.language = language
+        self._recognizer = None
+
+    def warm_up(self):
+        if self._recognizer is None:
+            self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio, on_partial=None):
+        self.warm_up()
+        if not hasattr(audio, "get_raw_data"):
+            audio = sr.AudioData(audio.frame_data, audio.sample_rate, audio.sample_width)
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError as e:
+            raise NotUnderstood("no speech recognised") from e
+        except sr.RequestError as e:
+            raise RecognitionError(str(e)) from e
+
+    def stream(self, pcm_chunks):
+        # The web API only returns a final transcript
+        audio = sr.AudioData(b"".join(pcm_chunks), self.sample_rate, 2)
+        try:
+            yield ("final", self.recognize(audio))
+        except NotUnderstood:
+            yield ("final", "")
+
+
+class VoskBackend(SpeechBackend):
+    name = "vosk"
+
+    def __init__(self, model_path=None, sample_rate=16000):
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+
+    @property
+    def model(self):
+        return _load_model(("vosk", self.model_path), self._load)
+
+    def _load(self):
+        vosk.SetLogLevel(-1)
+        # Without a path, vosk fetches and caches its small English model
+        return vosk.Model(self.model_path) if self.model_path else vosk.Model(lang="en-us")
+
+    def warm_up(self):
+        self.model
+
+    def stream(self, pcm_chunks):
+        recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
+        texts = []
+        last = ""
+        for chunk in pcm_chunks:
+            if recognizer.AcceptWaveform(chunk):
+                text = json.loads(recognizer.Result()).get("text", "")
+                if text:
+                    texts.append(text)
+                continue
+            partial = json.loads(recognizer.PartialResult()).get("partial", "")
+            current = " ".join(texts + [partial]).strip()
+            if partial and current != last:
+                last = current
+                yield ("partial", current)
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if text:
+            texts.append(text)
+        yield ("final", " ".join(texts))
+
+
+class WhisperBackend(SpeechBackend):
+    name = "whisper"
+
+    def __init__(self, model="base.en", threads=None):
+        self.model_name = model
+        self.threads = threads or os.cpu_count()
+        self._lock = threading.Lock()  # a whisper.cpp context runs one transcription at a time
+
+    @property
+    def model(self):
+        return _load_model(("whisper", self.model_name), lambda: whispercpp.Model(
+            self.model_name, n_threads=self.threads, print_progress=False, print_realtime=False))
+
+    def warm_up(self):
+        self.model
+
+    def stream(self, pcm_chunks):
+        # whisper decodes whole utterances; partials arrive per decoded segment
+        samples = np.frombuffer(b"".join(pcm_chunks), dtype="<i2").astype(np.float32) / 32768.0
+        texts = []
+        with self._lock:
+            segments = self.model.transcribe(samples)
+        for segment in segments:
+            text = segment.text.strip()
+            if text and not (text.startswith("[") and text.endswith("]")):  # e.g. [BLANK_AUDIO]
+                texts.append(text)
+                yield ("partial", " ".join(texts))
+        yield ("final", " ".join(texts))
+
+
+BACKENDS = {"google": GoogleBackend, "vosk": VoskBackend, "whisper": WhisperBackend}
+
+
+def make_backend(name=None, model=None):
+    """Build the backend named by `name` or AURA_ASR (default google)."""
+    name = (name or os.environ.get("AURA_ASR") or "google").lower()
+    model = model or os.environ.get("AURA_ASR_MODEL")
+    if name not in BACKENDS:
+        raise ValueError(f"unknown speech backend {name!r}; choose from {', '.join(BACKENDS)}")
+    if model and name != "google":
+        return BACKENDS[name](model)
+    return BACKENDS[name]()
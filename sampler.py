@@ -0,0 +1,133 @@
+"""
+sampler.py - Background system-metrics sampler.
+A daemon thread polls CPU, memory, disk and AURA's own process stats at a fixed
+rate into a bounded ring buffer, so "system info" answers from the latest sample
+instead of blocking on psutil.cpu_percent(interval=1).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from lazy import LazyModule
+from logs import get_logger
+from metrics import EXTERNAL_SECONDS, EXTERNAL_ERRORS
+
+psutil = LazyModule("psutil")
+
+log = get_logger("sampler")
+
+AVERAGE_WINDOWS = (60, 300, 900)  # 1, 5 and 15 minutes
+MIN_CPU_WINDOW = 0.1  # CPU is measured over this long when there is no sample yet
+
+
+class SystemSampler:
+    def __init__(self, interval=1.0, history_seconds=900, disk_path='/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.samples = deque(maxlen=int(history_seconds / interval) + 1)
+        self._process = psutil.Process(os.getpid())
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="aura-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        # An interval-less cpu_percent() measures since the previous call, which
+        # psutil tracks per thread, and the first call returns a meaningless 0.0.
+        # Prime the counters on this thread and sample one interval later.
+        try:
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+        except Exception as e:
+            log.warning("system sample failed", error=str(e))
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                log.warning("system sample failed", error=str(e))
+
+    def sample(self, cpu_interval=None):
+        """Take one sample now and append it to the ring buffer; cpu_interval
+        blocks to measure CPU over that many seconds instead of since the last sample."""
+        start = time.perf_counter()
+        try:
+            cpu = psutil.cpu_percent(interval=cpu_interval)
+            with self._process.oneshot():
+                proc = {
+                    "cpu": self._process.cpu_percent(interval=None),
+                    "rss": self._process.memory_info().rss,
+                    "threads": self._process.num_threads(),
+                }
+            entry = {
+                "ts": time.time(),
+                "cpu": cpu,
+                "memory": psutil.virtual_memory().percent,
+                "disk": psutil.disk_usage(self.disk_path).percent,
+                "process": proc,
+            }
+        except Exception:
+            EXTERNAL_ERRORS.labels("psutil").inc()
+            raise
+        finally:
+            EXTERNAL_SECONDS.labels("psutil").observe(time.perf_counter() - start)
+        with self._lock:
+            self.samples.append(entry)
+        return entry
+
+    def latest(self):
+        """Most recent sample, taking one synchronously if none exist yet."""
+        with self._lock:
+            if self.samples:
+                return self.samples[-1]
+        # Before the first background sample: prime the process counter, then
+        # measure both over MIN_CPU_WINDOW rather than report the unprimed 0.0
+        self._process.cpu_percent(interval=None)
+        return self.sample(cpu_interval=MIN_CPU_WINDOW)
+
+    def series(self, seconds=None):
+        """Samples from the last `seconds` (all buffered samples if None)."""
+        with self._lock:
+            samples = list(self.samples)
+        if seconds is None:
+            return samples
+        cutoff = time.time() - seconds
+        return [s for s in samples if s["ts"] >= cutoff]
+
+    def averages(self, key="cpu", windows=AVERAGE_WINDOWS):
+        """Mean of `key` over each window in seconds; None for windows the
+        buffered history does not cover yet."""
+        samples = self.series()
+        now = time.time()
+        result = {}
+        for window in windows:
+            if not samples or samples[0]["ts"] > now - window + self.interval:
+                result[window] = None
+                continue
+            values = [s[key] for s in samples if s["ts"] >= now - window]
+            result[window] = round(sum(values) / len(values), 1)
+        return result
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_sampler():
+    """Process-wide sampler, started on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SystemSampler().start()
+        return _default
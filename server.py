@@ -1,16 +1,136 @@
 """
 server.py - Simple Flask server to expose the local CommandProcessor to the UI.
 Serves files from the UI/ folder at root and exposes POST /api/command to accept a JSON {command: string}.
+POST /api/commands runs a batch (JSON array or NDJSON body) and streams one NDJSON result line per command.
+POST /api/interim takes an interim speech transcript {text: string} and starts read-only work for it early.
+Each client session (X-AURA-Session header or aura_session cookie) gets its own CommandProcessor;
+a client that sends neither is given a new session in an aura_session cookie, whose data is
+deleted when it is evicted unless a later request sends that id back.
+GET /api/tasks and /api/reminders return the lists as JSON with an ETag (304 when unchanged);
+GET /api/events streams list changes as Server-Sent Events.
+GET /metrics exposes request, command and external-call metrics in the Prometheus text format.
+Every request gets an ID (X-Request-ID if the client sent a valid one) that is echoed back and
+tagged on its log records.
 """
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from model import CommandProcessor
+from cache import AnswerCache
+from lookup import KnowledgeLookup
+from actions import default_executor
+from sampler import default_sampler
+from sessions import SessionManager, InvalidSessionId, SESSION_ID_RE, new_session_id
+from store import OpLogStore, DEFAULT_DATA_DIR
+from feeds import LISTS
+from logs import get_logger, new_request_id, request_context, request_id
+import metrics
+import json
 import os
+import re
+import shutil
+import socket
+import threading
+import time
 
 app = Flask(__name__, static_folder='UI', static_url_path='')
-CORS(app)
+app.config['MAX_BATCH_SIZE'] = int(os.environ.get('AURA_MAX_BATCH_SIZE', 500))
+CORS(app, expose_headers=['ETag', 'X-Request-ID'])
 
-processor = CommandProcessor()
+log = get_logger("server")
+HTTP_REQUESTS = metrics.counter("aura_http_requests_total", "HTTP requests by endpoint, method and status",
+                                ["endpoint", "method", "status"])
+HTTP_SECONDS = metrics.histogram("aura_http_request_duration_seconds",
+                                 "Time to produce each HTTP response (streams: until headers)", ["endpoint"])
+HTTP_IN_FLIGHT = metrics.gauge("aura_http_requests_in_flight", "HTTP requests being handled", ["endpoint"])
+SSE_STREAMS = metrics.gauge("aura_sse_streams_open", "Open /api/events streams")
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+SESSION_COOKIE = 'aura_session'
+SESSION_COOKIE_MAX_AGE = 365 * 24 * 3600
+
+# The answer cache and lookup pool are shared; notes, tasks and history are per
+# session and persisted under data/sessions/<id>/
+answer_cache = AnswerCache()
+knowledge = KnowledgeLookup(cache=answer_cache)
+
+def make_processor(session_id):
+    store = OpLogStore(os.path.join(DEFAULT_DATA_DIR, 'sessions', session_id),
+                       fsync_interval=float(os.environ.get('AURA_FSYNC_INTERVAL', 1.0)))
+    return CommandProcessor(answer_cache=answer_cache, knowledge=knowledge, store=store)
+
+def close_session(session):
+    session.processor.close()
+    if not session.named:
+        # No client ever sent this id back, so nobody can reach its data again
+        shutil.rmtree(session.processor.store.directory, ignore_errors=True)
+
+sessions = SessionManager(
+    make_processor,
+    max_sessions=int(os.environ.get('AURA_MAX_SESSIONS', 256)),
+    idle_timeout=float(os.environ.get('AURA_SESSION_IDLE_TIMEOUT', 30 * 60)),
+    on_evict=close_session,
+)
+
+def current_session_id():
+    # EventSource cannot set headers, so the session may also come as ?session=
+    session_id = (request.headers.get('X-AURA-Session')
+                  or request.cookies.get(SESSION_COOKIE)
+                  or request.args.get('session'))
+    if not session_id:
+        # Never fall back to a shared session: one client's tasks and notes
+        # would be every client's. finish_request sets the cookie.
+        if 'new_session' not in g:
+            g.new_session = new_session_id()
+        return g.new_session
+    if not SESSION_ID_RE.match(session_id):
+        raise InvalidSessionId("invalid session id")
+    return session_id
+
+def session_named():
+    """False if current_session_id() made the id up for this request."""
+    return 'new_session' not in g
+
+def current_session():
+    session_id = current_session_id()
+    return sessions.get(session_id, session_named())
+
+def endpoint_label():
+    # The route pattern, not the raw path, keeps label values bounded
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_request():
+    rid = request.headers.get('X-Request-ID', '')
+    g.request_id = rid if REQUEST_ID_RE.match(rid) else new_request_id()
+    g.request_id_token = request_id.set(g.request_id)
+    g.started = time.perf_counter()
+    g.endpoint = endpoint_label()
+    HTTP_IN_FLIGHT.labels(g.endpoint).inc()
+
+@app.after_request
+def finish_request(response):
+    elapsed = time.perf_counter() - g.started
+    endpoint = g.endpoint
+    response.headers['X-Request-ID'] = g.request_id
+    if 'new_session' in g:
+        response.set_cookie(SESSION_COOKIE, g.new_session, max_age=SESSION_COOKIE_MAX_AGE,
+                            httponly=True, samesite='Lax')
+    HTTP_REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    HTTP_SECONDS.labels(endpoint).observe(elapsed)
+    if endpoint != '/metrics':
+        log.debug("request", method=request.method, path=request.path, status=response.status_code,
+                  ms=round(elapsed * 1e3, 1))
+    return response
+
+@app.teardown_request
+def end_request(exc):
+    if 'request_id_token' in g:
+        HTTP_IN_FLIGHT.labels(g.endpoint).dec()
+        request_id.reset(g.request_id_token)
+        del g.request_id_token
+
+@app.errorhandler(InvalidSessionId)
+def bad_request(e):
+    return jsonify({'error': str(e)}), 400
 
 @app.route('/api/command', methods=['POST'])
 def api_command():
@@ -18,12 +138,161 @@ def api_command():
     cmd = data.get('command', '')
     if not cmd:
         return jsonify({'error': 'no command provided'}), 400
+    session_id = current_session_id()
     try:
-        response = processor.process(cmd)
-        return jsonify({'response': response})
+        response, jobs = sessions.run(session_id, cmd, session_named())
+        result = {'response': response}
+        if jobs:
+            result['jobs'] = jobs
+        return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/interim', methods=['POST'])
+def api_interim():
+    data = request.get_json(silent=True) or {}
+    text = data.get('text', '')
+    if not isinstance(text, str) or not text:
+        return jsonify({'error': 'no text provided'}), 400
+    # No session lock: routing reads no session state and only read-only handlers start
+    return jsonify({'speculating': current_session().processor.speculator.interim(text)}), 202
+
+def parse_batch(body, content_type):
+    """Return a list of commands (or ValueError instances for unparseable lines)."""
+    text = body.decode('utf-8')
+    if 'ndjson' not in content_type and text.lstrip().startswith(('[', '{')):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            data = data.get('commands')
+        if isinstance(data, list):
+            return [item.get('command', '') if isinstance(item, dict) else item for item in data]
+        if 'json' in content_type:
+            raise ValueError('expected a JSON array of commands')
+    # NDJSON: one JSON string or {"command": ...} object per line
+    commands = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            commands.append(item.get('command', '') if isinstance(item, dict) else item)
+        except (ValueError, AttributeError) as e:
+            commands.append(ValueError(f'invalid line: {e}'))
+    return commands
+
+@app.route('/api/commands', methods=['POST'])
+def api_commands():
+    try:
+        commands = parse_batch(request.get_data(), request.content_type or '')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not commands:
+        return jsonify({'error': 'no commands provided'}), 400
+    limit = app.config['MAX_BATCH_SIZE']
+    if len(commands) > limit:
+        return jsonify({'error': f'batch of {len(commands)} exceeds the limit of {limit} commands'}), 413
+    session_id = current_session_id()
+    named = session_named()
+    rid = g.request_id
+
+    def generate():
+        # Commands run in order; each result line is flushed as soon as it is ready
+        with request_context(rid):
+            for index, cmd in enumerate(commands):
+                result = {'index': index}
+                if isinstance(cmd, ValueError):
+                    result['error'] = str(cmd)
+                elif not isinstance(cmd, str) or not cmd:
+                    result['error'] = 'no command provided'
+                else:
+                    result['command'] = cmd
+                    try:
+                        result['response'], jobs = sessions.run(session_id, cmd, named)
+                        if jobs:
+                            result['jobs'] = jobs
+                    except Exception as e:
+                        result['error'] = str(e)
+                yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/<any(tasks, reminders):name>', methods=['GET'])
+def api_list(name):
+    with sessions.locked(current_session_id(), session_named()) as session:
+        feed = session.processor.feed
+        etag = feed.etag(name)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = jsonify({'version': feed.versions[name],
+                                'items': list(session.processor.list_items(name))})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def sse_event(data):
+    return f"data: {json.dumps(data)}\n\n"
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    names = [n for n in request.args.get('lists', ','.join(LISTS)).split(',') if n in LISTS]
+    if not names:
+        return jsonify({'error': f'lists must be some of {", ".join(LISTS)}'}), 400
+    # Subscribe and snapshot under the session lock so no delta is missed or repeated
+    with sessions.locked(current_session_id(), session_named()) as session:
+        feed = session.processor.feed
+        subscription = feed.subscribe(names)
+        snapshots = [{'list': n, 'op': 'snapshot', 'version': feed.versions[n],
+                      'items': list(session.processor.list_items(n))} for n in names]
+
+    def generate():
+        SSE_STREAMS.inc()
+        try:
+            for snapshot in snapshots:
+                yield sse_event(snapshot)
+            while not subscription.closed:
+                event = subscription.get(timeout=15)
+                if event is None:
+                    if not subscription.closed:
+                        yield ': keep-alive\n\n'
+                    continue
+                yield sse_event(event)
+        finally:
+            SSE_STREAMS.dec()
+            feed.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job(job_id):
+    job = default_executor().get(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    return jsonify(answer_cache.stats())
+
+@app.route('/api/metrics/system', methods=['GET'])
+def api_metrics_system():
+    sampler = default_sampler()
+    seconds = request.args.get('seconds', type=float)
+    return jsonify({
+        'interval': sampler.interval,
+        'latest': sampler.latest(),
+        'averages': sampler.averages('cpu'),
+        'samples': sampler.series(seconds),
+    })
+
+@app.route('/metrics', methods=['GET'])
+def api_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 # Serve UI static files
 @app.route('/', defaults={'path': 'index.html'})
 @app.route('/<path:path>')
@@ -34,6 +303,24 @@ def serve_ui(path):
     else:
         return send_from_directory(ui_dir, 'index.html')
 
+def warm_up_when_listening(port, timeout=30.0):
+    """Once the server accepts connections, preload heavy dependencies in the background
+    (on a throwaway processor, so no session or store is created for it)."""
+    def wait_then_warm():
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        CommandProcessor(answer_cache=answer_cache, knowledge=knowledge).warm_up(background=False)
+    threading.Thread(target=wait_then_warm, name="aura-warm-up", daemon=True).start()
+
 if __name__ == '__main__':
     # Run on localhost:5000. Open http://localhost:5000 in your browser.
+    # With debug=True this module also runs in the reloader's parent process,
+    # which never serves requests; only the child it starts warms up
+    if os.environ.get('AURA_WARM_UP', '1') != '0' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up_when_listening(5000)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,147 @@
+"""
+sessions.py - Per-session CommandProcessor instances for the server.
+Each client session gets its own processor (notes, tasks, history) guarded by
+its own lock, so separate sessions run in parallel while commands within a
+session are serialised. Sessions live in a bounded LRU and are evicted after an
+idle timeout. An evicted session is marked closed under its lock, so a request
+that fetched it just before the eviction fetches it again instead of writing
+to a closed store. A session is named once a client has sent its id; one the
+server made up for a client that sent none stays unnamed until then, so its
+on_evict can discard the data nobody can ask for again.
+"""
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_SESSION = "default"
+SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class InvalidSessionId(ValueError):
+    pass
+
+
+class SessionClosed(RuntimeError):
+    """The session was evicted; get it again from the manager."""
+
+
+def new_session_id():
+    """Random id for a client that did not send one."""
+    return secrets.token_urlsafe(16)
+
+
+class Session:
+    __slots__ = ("id", "processor", "lock", "created", "last_used", "closed", "named")
+
+    def __init__(self, session_id, processor, named=True):
+        self.id = session_id
+        self.processor = processor
+        self.lock = threading.Lock()
+        self.created = self.last_used = time.monotonic()
+        self.closed = False  # set under the lock on eviction
+        self.named = named  # a client has sent this id
+
+    def run(self, command):
+        """Process one command under the session lock; return (response, job IDs)."""
+        with self.lock:
+            if self.closed:
+                raise SessionClosed(self.id)
+            response = self.processor.process(command)
+            return response, list(self.processor.last_jobs)
+
+
+class SessionManager:
+    def __init__(self, factory, max_sessions=256, idle_timeout=30 * 60, on_evict=None):
+        # factory(session_id) -> CommandProcessor; on_evict(session) runs after removal
+        self.factory = factory
+        self.on_evict = on_evict
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._creating = {}  # session_id -> lock held while its processor is built
+
+    def get(self, session_id=DEFAULT_SESSION, named=True):
+        """Return the session for session_id, creating it if needed. named=False
+        when the server made the id up because the client sent none."""
+        if not SESSION_ID_RE.match(session_id):
+            raise InvalidSessionId("invalid session id")
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._evict_idle(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_used = now
+                session.named |= named
+        self._evicted(evicted)
+        if session is not None:
+            return session
+        # Build the processor outside the manager lock so other sessions are not
+        # held up, but only once per id so two stores never share a directory
+        with self._lock:
+            creating = self._creating.setdefault(session_id, threading.Lock())
+        with creating:
+            with self._lock:
+                existing = self._sessions.get(session_id)
+                if existing is not None:
+                    existing.named |= named
+                    return existing
+            session = Session(session_id, self.factory(session_id), named)
+            evicted = []
+            with self._lock:
+                self._sessions[session_id] = session
+                self._creating.pop(session_id, None)
+                while len(self._sessions) > self.max_sessions:
+                    evicted.append(self._sessions.popitem(last=False)[1])
+        self._evicted(evicted)
+        return session
+
+    def run(self, session_id, command, named=True):
+        """Session.run on the live session for session_id."""
+        while True:
+            try:
+                return self.get(session_id, named).run(command)
+            except SessionClosed:
+                continue  # evicted between get() and its lock; the next get() recreates it
+
+    @contextmanager
+    def locked(self, session_id=DEFAULT_SESSION, named=True):
+        """The live session for session_id, with its lock held."""
+        while True:
+            session = self.get(session_id, named)
+            with session.lock:
+                if not session.closed:
+                    yield session
+                    return
+
+    def evict_idle(self):
+        with self._lock:
+            evicted = self._evict_idle(time.monotonic())
+        self._evicted(evicted)
+        return len(evicted)
+
+    def _evict_idle(self, now):
+        # The OrderedDict is in least-recently-used order, so stop at the first fresh one
+        evicted = []
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self.idle_timeout:
+                break
+            evicted.append(self._sessions.popitem(last=False)[1])
+        return evicted
+
+    def _evicted(self, sessions):
+        for session in sessions:
+            # Wait for any in-flight command in that session before tearing it down
+            with session.lock:
+                session.closed = True
+                if self.on_evict is not None:
+                    self.on_evict(session)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
@@ -1,22 +1,137 @@
 """
 speak.py – Text-to-Speech Module
 Speaks responses using pyttsx3.
+In streaming mode replies are split into sentences and queued to a dedicated
+TTS thread, so the first sentence starts playing immediately and the caller
+does not wait for the whole reply; interrupt() cancels the rest (barge-in).
+The engine is only ever driven from that thread: interrupt() sets a stop flag,
+and the engine's word callbacks, which run on the TTS thread, call stop().
+With an AudioCache (ttscache.py), sentences already rendered to disk are played
+from there instead of being synthesised again; prewarm() renders known replies
+while the speaker is idle, and a sentence is also cached the second time it is said.
+FakeEngine and FakePlayer stand in for pyttsx3 and PyAudio where there is no audio device.
 """
 
-import pyttsx3
+import collections
 import logging
+import queue
+import re
+import threading
+import time
+import wave
+
+from lazy import LazyModule
+from ttscache import WavPlayer, cache_key, wav_duration
+
+pyttsx3 = LazyModule("pyttsx3")
+
+MISS_MEMORY = 256  # uncached sentences remembered, to cache those said twice
+_PREWARM = object()  # queue item that wakes the worker to render prewarm() texts
+
+
+def split_sentences(text):
+    """Split text after sentence-ending punctuation."""
+    text = text.strip()
+    return re.split(r'(?<=[\.\?\!])\s+', text) if text else []
+
+
+def speech_chunks(text):
+    """Sentences to speak one at a time; list lines count as separate sentences."""
+    return [s for line in text.splitlines() for s in split_sentences(line) if s]
+
+
+class Utterance:
+    """One queued reply; timestamps are time.perf_counter() values."""
+    __slots__ = ("text", "chunks", "generation", "queued", "first_audio", "finished",
+                 "cancelled", "started", "done")
+
+    def __init__(self, text, chunks, generation):
+        self.text = text
+        self.chunks = chunks
+        self.generation = generation
+        self.queued = time.perf_counter()
+        self.first_audio = None
+        self.finished = None
+        self.cancelled = False
+        self.started = threading.Event()  # set once the first sentence is handed to the engine
+        self.done = threading.Event()
+
+    @property
+    def time_to_first_audio(self):
+        return None if self.first_audio is None else self.first_audio - self.queued
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _finish(self, cancelled=False):
+        if not self.done.is_set():
+            self.cancelled = cancelled
+            self.finished = time.perf_counter()
+            self.started.set()
+            self.done.set()
+
 
 class VoiceSpeaker:
-    def __init__(self, rate=160, volume=1.0, voice_gender="female"):
+    def __init__(self, rate=160, volume=1.0, voice_gender="female", streaming=False,
+                 engine_factory=None, settle=0.15, cache=None, player_factory=None):
+        self.rate = rate
+        self.volume = volume
+        self.voice_gender = voice_gender
+        self.streaming = streaming
+        self.engine_factory = engine_factory
+        self.settle = settle  # pause after each reply; avoids a pyttsx3 buffer bug
+        self.engine = None
+        self.cache = cache  # AudioCache, used in streaming mode
+        self.player_factory = player_factory
+        self.player = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        if not streaming:
+            self._init_engine()
+            return
+        # The engine is created and used only on the worker thread, as pyttsx3 drivers expect
+        self._queue = queue.Queue()
+        self._stop = threading.Event()  # set by interrupt(); acted on by the worker
+        self._speaking = False
+        self._renders = collections.deque()  # sentences to render to the cache when idle
+        self._missed = collections.OrderedDict()  # cache keys of sentences said once
+        self._worker = threading.Thread(target=self._run, name="aura-tts", daemon=True)
+        self._worker.start()
+
+    def _init_engine(self):
         try:
-            self.engine = pyttsx3.init()
-            self.engine.setProperty('rate', rate)
-            self.engine.setProperty('volume', volume)
-            self.set_voice(voice_gender)
+            self.engine = (self.engine_factory or pyttsx3.init)()
+            self.engine.setProperty('rate', self.rate)
+            self.engine.setProperty('volume', self.volume)
+            self.set_voice(self.voice_gender)
         except Exception as e:
             logging.error(f"Failed to initialize speech engine: {e}")
             self.engine = None
 
+    @property
+    def audible(self):
+        """True while a sentence is playing; the microphone may be hearing it."""
+        return self.streaming and self._speaking
+
+    def _connect_stop(self):
+        # pyttsx3 runs these callbacks on the thread inside runAndWait(), where stop() is safe
+        try:
+            for topic in ('started-utterance', 'started-word'):
+                self.engine.connect(topic, self._check_stop)
+        except Exception as e:
+            logging.error(f"Speech engine callbacks unavailable, barge-in waits for the sentence: {e}")
+
+    def _check_stop(self, **kwargs):
+        if self._speaking and self._stop.is_set():
+            self.engine.stop()
+
+    def _init_player(self):
+        try:
+            self.player = (self.player_factory or WavPlayer)()
+        except Exception as e:
+            logging.error(f"Failed to initialize audio player, not caching speech: {e}")
+            self.player = None
+
     def set_voice(self, gender):
         try:
             voices = self.engine.getProperty('voices')
@@ -26,12 +141,12 @@ class VoiceSpeaker:
                     if any(name in v.name.lower() for name in ["female", "zira", "hazel"]):
                         self.engine.setProperty('voice', v.id)
                         return True
-            else:
+            elif gender:
                 for v in voices:
                     if any(name in v.name.lower() for name in ["male", "david", "james"]):
                         self.engine.setProperty('voice', v.id)
                         return True
-            
+
             # If no matching voice found, use first available
             if voices:
                 self.engine.setProperty('voice', voices[0].id)
@@ -42,10 +157,12 @@ class VoiceSpeaker:
             return False
 
     def speak(self, text):
-        """Speak the given text using text-to-speech."""
+        """Speak the given text using text-to-speech (queued, in streaming mode)."""
+        if self.streaming:
+            return self.say(text) is not None
         if not text or not self.engine:
             return False
-        
+
         try:
             self.engine.stop()  # Stop any ongoing speech
             self.engine.say(text)
@@ -55,12 +172,161 @@ class VoiceSpeaker:
             logging.error(f"Speech error: {e}")
             return False
 
+    def say(self, text):
+        """Queue text sentence by sentence and return its Utterance without waiting
+        (without a worker thread, speak it first and return it finished)."""
+        chunks = speech_chunks(text or "")
+        if not chunks:
+            return None
+        if not self.streaming:
+            utterance = Utterance(text, chunks, self._generation)
+            utterance.first_audio = time.perf_counter()
+            spoken = self.speak(text)
+            utterance._finish(cancelled=not spoken)
+            return utterance
+        with self._lock:
+            utterance = Utterance(text, chunks, self._generation)
+            for index, chunk in enumerate(chunks):
+                self._queue.put((utterance, index, chunk))
+        return utterance
+
+    def prewarm(self, texts):
+        """Render these replies to the audio cache in the background, between
+        replies, so they start without synthesis delay; returns the sentence count."""
+        if not self.streaming or self.cache is None:
+            return 0
+        chunks = list(dict.fromkeys(chunk for text in texts for chunk in speech_chunks(text)))
+        self._renders.extend(chunks)
+        self._queue.put(_PREWARM)
+        return len(chunks)
+
+    def interrupt(self):
+        """Barge-in: drop every queued sentence and cut off the one being spoken."""
+        if not self.streaming:
+            return 0
+        with self._lock:
+            self._generation += 1
+            self._stop.set()
+            dropped = []
+            while True:
+                try:
+                    dropped.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Pending renders survive a barge-in; only the wake-up is put back
+            markers = [item for item in dropped if item is _PREWARM]
+            if markers:
+                dropped = [item for item in dropped if item is not _PREWARM]
+                self._queue.put(_PREWARM)
+            for _ in markers:
+                self._queue.task_done()
+        for utterance, _, _ in dropped:
+            utterance._finish(cancelled=True)
+            self._queue.task_done()
+        return len(dropped)
+
+    def wait(self):
+        """Block until everything queued has been spoken or cancelled."""
+        if self.streaming:
+            self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+    def _run(self):
+        self._init_engine()
+        if self.engine is not None:
+            self._connect_stop()
+            if self.cache is not None:
+                self._init_player()
+        while True:
+            # Rendering waits for a gap in speech, and speech waits at most one render
+            if self._renders and self._queue.empty():
+                self._render(self._renders.popleft())
+                continue
+            item = self._queue.get()
+            if item is _PREWARM:
+                self._queue.task_done()
+                continue
+            if item is None:
+                self._queue.task_done()
+                break
+            utterance, index, chunk = item
+            try:
+                with self._lock:
+                    current = utterance.generation == self._generation
+                    self._speaking = current and self.engine is not None
+                    if self._speaking:
+                        self._stop.clear()  # any later interrupt() is for this sentence
+                if not self._speaking:
+                    utterance._finish(cancelled=True)
+                    continue
+                if utterance.first_audio is None:
+                    utterance.first_audio = time.perf_counter()
+                    utterance.started.set()
+                try:
+                    self._speak_chunk(utterance, chunk)
+                except Exception as e:
+                    logging.error(f"Speech error: {e}")
+                with self._lock:
+                    self._speaking = False
+                    cancelled = utterance.generation != self._generation
+                if cancelled or index == len(utterance.chunks) - 1:
+                    utterance._finish(cancelled)
+                    if self.settle:
+                        time.sleep(self.settle)
+            finally:
+                self._queue.task_done()
+        if self.player is not None:
+            self.player.close()
+
+    def _speak_chunk(self, utterance, chunk):
+        key = self._cache_key(chunk)
+        path = self.cache.get(key) if key is not None else None
+        if path is not None:
+            if utterance.generation != self._generation:
+                return
+            try:
+                self.player.play(path, self._stop)
+                return
+            except Exception as e:
+                logging.error(f"Cached speech error, synthesising instead: {e}")
+                self.cache.discard(key)
+        self.engine.say(chunk)
+        if utterance.generation == self._generation:
+            self.engine.runAndWait()
+        else:
+            self.engine.stop()  # interrupted before it started; clear the engine's queue
+        if key is not None:
+            # Cache a sentence the second time it is said; once-off replies are not worth the render
+            if self._missed.pop(key, None) is not None:
+                self._renders.append(chunk)
+            else:
+                self._missed[key] = True
+                if len(self._missed) > MISS_MEMORY:
+                    self._missed.popitem(last=False)
+
+    def _cache_key(self, text):
+        if self.player is None:
+            return None
+        return cache_key(text, self.engine.getProperty('voice'), self.rate, self.volume)
+
+    def _render(self, text):
+        key = self._cache_key(text)
+        if key is None or key in self.cache:
+            return
+        try:
+            self.cache.render(self.engine, text, key)
+        except Exception as e:
+            logging.error(f"Failed to cache speech for {text!r}: {e}")
+
     def test_voices(self):
         """Test available voices."""
         if not self.engine:
             logging.error("Speech engine not initialized")
             return
-            
+
         voices = self.engine.getProperty('voices')
         for voice in voices:
             try:
@@ -70,10 +336,99 @@ class VoiceSpeaker:
             except Exception as e:
                 print(f"Error testing voice {voice.name}: {e}")
 
+
+class FakeEngine:
+    """pyttsx3-compatible engine that "speaks" by sleeping in proportion to the
+    word count and records what it said; for benchmarks and headless runs.
+    synth_per_word models the synthesis delay before each text starts playing;
+    save_to_file() takes as long and writes silence as long as the speech."""
+
+    def __init__(self, words_per_second=3.0, synth_per_word=0.0, sample_rate=8000):
+        self.words_per_second = words_per_second
+        self.synth_per_word = synth_per_word
+        self.sample_rate = sample_rate  # of the silent WAVs written by save_to_file()
+        self.properties = {'rate': 200, 'volume': 1.0, 'voices': [], 'voice': None}
+        self.spoken = []  # (text, started, ended, completed)
+        self.saved = []  # (text, path)
+        self._callbacks = {}  # topic -> callbacks, as pyttsx3's connect()
+        self._pending = []
+        self._stopped = threading.Event()
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def connect(self, topic, callback):
+        self._callbacks.setdefault(topic, []).append(callback)
+
+    def _notify(self, topic, **kwargs):
+        for callback in self._callbacks.get(topic, ()):
+            callback(**kwargs)
+
+    def say(self, text):
+        self._stopped.clear()
+        self._pending.append(text)
+
+    def save_to_file(self, text, path):
+        self._stopped.clear()
+        self._pending.append((text, path))
+
+    def runAndWait(self):
+        pending, self._pending = self._pending, []
+        for text in pending:
+            path = None
+            if isinstance(text, tuple):
+                text, path = text
+            words = len(text.split())
+            if self._stopped.wait(words * self.synth_per_word):
+                break
+            if path is not None:
+                with wave.open(path, "wb") as wav:
+                    wav.setnchannels(1)
+                    wav.setsampwidth(2)
+                    wav.setframerate(self.sample_rate)
+                    wav.writeframes(bytes(2 * int(self.sample_rate * words / self.words_per_second)))
+                self.saved.append((text, path))
+                continue
+            started = time.perf_counter()
+            self._notify('started-utterance', name=None)
+            completed = not self._stopped.is_set()
+            for location in range(words):
+                self._notify('started-word', name=None, location=location, length=0)
+                if self._stopped.wait(1.0 / self.words_per_second):
+                    completed = False
+                    break
+            self.spoken.append((text, started, time.perf_counter(), completed))
+            if not completed:
+                break
+
+    def stop(self):
+        self._pending = []
+        self._stopped.set()
+
+
+class FakePlayer:
+    """WavPlayer stand-in that sleeps for the file's duration and records what it played."""
+
+    def __init__(self):
+        self.played = []  # (path, started, ended, completed)
+
+    def play(self, path, stop):
+        duration = wav_duration(path)
+        started = time.perf_counter()
+        completed = not stop.wait(duration)
+        self.played.append((path, started, time.perf_counter(), completed))
+        return completed
+
+    def close(self):
+        pass
+
 if __name__ == "__main__":
     # Set up logging
     logging.basicConfig(level=logging.INFO)
-    
+
     # Test the speaker
     speaker = VoiceSpeaker()
     if speaker.engine:
@@ -0,0 +1,149 @@
+"""
+speculate.py - Start read-only commands on interim speech transcripts.
+While the user is still speaking, the UI streams interim transcripts. Each is
+routed like a command, and if it resolves to a read-only intent (knowledge
+lookups, list reads, system info) its handler is started on a worker thread.
+When the final transcript arrives, CommandProcessor.process takes that result
+if the final command routes to the same intent with the same arguments and no
+list has changed since; otherwise the speculative result is discarded. Interims
+change every few hundred milliseconds while words are still coming, so a
+handler only starts once its interim has been the newest for SETTLE_SECONDS:
+"what is" and "what is the" are never looked up, while the complete question
+gets the pause before the recogniser's final result as a head start.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import get_logger, request_context
+from metrics import counter, histogram
+
+SETTLE_SECONDS = 0.25
+MAX_AGE_SECONDS = 5.0  # a final result comes within a second or so of the last interim
+
+log = get_logger("speculate")
+SPECULATIONS = counter("aura_speculations_total",
+                       "Interim transcripts routed to a read-only intent, by outcome", ["outcome"])
+HEAD_START = histogram("aura_speculation_head_start_seconds",
+                       "How long before the final command a committed speculative handler started")
+
+
+def speculation_key(intent, match):
+    """What a final command must route to for a speculative result to stand for it."""
+    groups = match.groups() if hasattr(match, "groups") else ()
+    return intent.name, groups
+
+
+class Speculation:
+    __slots__ = ("key", "intent", "cmd", "match", "versions", "heard", "timer", "future", "started")
+
+    def __init__(self, key, intent, cmd, match, versions):
+        self.key = key
+        self.intent = intent
+        self.cmd = cmd
+        self.match = match
+        self.versions = versions
+        self.heard = time.monotonic()  # when an interim last routed here
+        self.timer = None
+        self.future = None
+        self.started = None
+
+
+class Speculator:
+    def __init__(self, processor, pool=None, settle=SETTLE_SECONDS):
+        self.processor = processor
+        self.settle = settle
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._current = None  # newest Speculation, not yet taken by process()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = default_pool()
+        return self._pool
+
+    def interim(self, text):
+        """Route an interim transcript; returns the read-only intent it will speculate on, or None."""
+        cmd = text.lower().strip()
+        if not cmd:
+            return None
+        intent, match = self.processor.router.route(cmd)
+        if intent is None or not intent.read_only:
+            self._replace(None)
+            return None
+        key = speculation_key(intent, match)
+        with self._lock:
+            if self._current is not None and self._current.key == key:
+                self._current.heard = time.monotonic()
+                return intent.name  # a longer interim with the same meaning
+        spec = Speculation(key, intent, cmd, match, self._versions())
+        spec.timer = threading.Timer(self.settle, self._start, (spec,))
+        spec.timer.daemon = True
+        self._replace(spec)
+        spec.timer.start()
+        return intent.name
+
+    def take(self, intent, match):
+        """The speculative response for a final command routed to (intent, match), or None."""
+        with self._lock:
+            spec, self._current = self._current, None
+        if spec is None:
+            return None
+        if (intent is None or spec.future is None or spec.key != speculation_key(intent, match)
+                or time.monotonic() - spec.heard > MAX_AGE_SECONDS):
+            self._discard(spec)
+            return None
+        try:
+            response = spec.future.result()
+        except Exception as e:
+            log.warning("speculative handler failed", intent=intent.name, error=str(e))
+            SPECULATIONS.labels("discarded").inc()
+            return None
+        # Anything the handler read may have changed while it ran
+        if spec.versions != self._versions():
+            SPECULATIONS.labels("discarded").inc()
+            return None
+        SPECULATIONS.labels("committed").inc()
+        HEAD_START.observe(time.perf_counter() - spec.started)
+        log.debug("speculation committed", intent=intent.name, command=spec.cmd)
+        return response
+
+    def _versions(self):
+        return tuple(self.processor.feed.versions.values())
+
+    def _replace(self, spec):
+        with self._lock:
+            old, self._current = self._current, spec
+        if old is not None:
+            self._discard(old)
+
+    def _discard(self, spec):
+        if spec.timer is not None:
+            spec.timer.cancel()
+        SPECULATIONS.labels("discarded" if spec.future is not None else "skipped").inc()
+
+    def _start(self, spec):
+        with self._lock:
+            if self._current is not spec:
+                return
+            spec.started = time.perf_counter()
+            spec.future = self.pool.submit(self._run, spec)
+
+    def _run(self, spec):
+        with request_context():
+            log.debug("speculating", intent=spec.intent.name, command=spec.cmd)
+            return getattr(self.processor, spec.intent.handler)(spec.cmd, spec.match)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_pool():
+    """Process-wide workers for speculative handlers, shared by every session."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ThreadPoolExecutor(4, thread_name_prefix="aura-speculate")
+        return _default
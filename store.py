@@ -0,0 +1,250 @@
+"""
+store.py - Durable append-only storage for notes, tasks, custom apps and history.
+Every state change is appended as one JSON line to an operation log (O(1) per
+write). Writes are buffered and fsynced in batches by a shared background
+flusher instead of once per command. Once enough operations accumulate, the
+current state is written as a snapshot and the log is truncated; startup loads
+the snapshot and replays only the operations logged after it.
+A closed store refuses further writes (StoreClosed) rather than reopening a log
+that the flusher no longer fsyncs. The directory is only created by the first
+write, so a store that is opened and read but never changed leaves nothing behind.
+"""
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+import weakref
+
+from logs import get_logger
+
+DEFAULT_DATA_DIR = os.environ.get(
+    'AURA_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+LOG_NAME = "ops.log"
+SNAPSHOT_NAME = "snapshot.json"
+
+log = get_logger("store")
+
+
+class StoreClosed(RuntimeError):
+    """The store was closed; its writes would no longer be made durable."""
+
+
+def empty_state():
+    return {"notes": [], "tasks": [], "custom_apps": {}, "command_history": []}
+
+
+def apply_op(state, op, history_limit=100):
+    """Apply one logged operation to a state dict (used when replaying)."""
+    kind = op["op"]
+    if kind == "note_add":
+        state["notes"].append(op["note"])
+    elif kind == "notes_clear":
+        state["notes"].clear()
+    elif kind == "task_add":
+        state["tasks"].append({"task": op["task"], "completed": False})
+    elif kind == "task_complete":
+        state["tasks"][op["index"]]["completed"] = True
+    elif kind == "tasks_clear":
+        state["tasks"].clear()
+    elif kind == "app_add":
+        state["custom_apps"][op["name"]] = op["path"]
+    elif kind == "task_remove":
+        del state["tasks"][op["index"]]
+    elif kind == "task_uncomplete":
+        state["tasks"][op["index"]]["completed"] = False
+    elif kind == "tasks_restore":
+        state["tasks"][:] = op["items"]
+    elif kind == "note_remove":
+        del state["notes"][op["index"]]
+    elif kind == "notes_restore":
+        state["notes"][:] = op["items"]
+    elif kind == "history_add":
+        history = state["command_history"]
+        history.append({"seq": op["hseq"], "command": op["command"], "timestamp": op["timestamp"],
+                        "intent": op.get("intent"), "app": None, "undo": None})
+        if len(history) > history_limit:
+            del history[:len(history) - history_limit]
+    elif kind in ("history_update", "history_undone"):
+        for entry in reversed(state["command_history"]):
+            if entry["seq"] == op["hseq"]:
+                if kind == "history_undone":
+                    entry["undo"] = None
+                else:
+                    entry.update((k, op[k]) for k in ("app", "undo") if op.get(k) is not None)
+                break
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"cannot serialise {type(value).__name__}")
+
+
+class OpLogStore:
+    def __init__(self, directory, fsync_interval=1.0, compact_every=10000, history_limit=100):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.history_limit = history_limit
+        self.seq = 0
+        self._since_snapshot = 0
+        self._dirty = False
+        self._synced_at = 0.0
+        self._state_fn = None
+        self._lock = threading.Lock()
+        self._log_path = os.path.join(directory, LOG_NAME)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self._log = None  # opened on the first write
+        self._closed = False
+        _flusher.register(self)
+
+    def load(self):
+        """Return the stored state: the snapshot plus every operation logged after it."""
+        state = empty_state()
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            state.update(snapshot["state"])
+            self.seq = snapshot["seq"]
+        replayed = 0
+        if os.path.exists(self._log_path):
+            good = 0
+            with open(self._log_path, "rb") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        op = None
+                    if op is None:
+                        break  # torn final write from a crash; everything before it is intact
+                    good += len(line)
+                    if op["seq"] <= self.seq:
+                        continue
+                    apply_op(state, op, self.history_limit)
+                    self.seq = op["seq"]
+                    replayed += 1
+            if good < os.path.getsize(self._log_path):
+                # Drop the torn tail so new appends do not follow a broken line
+                with open(self._log_path, "r+b") as f:
+                    f.truncate(good)
+        for entry in state["command_history"]:
+            if isinstance(entry["timestamp"], str):
+                entry["timestamp"] = datetime.datetime.fromisoformat(entry["timestamp"])
+        self._since_snapshot = replayed
+        return state
+
+    def attach(self, state_fn):
+        """Register a callable returning the live state, used for snapshots."""
+        self._state_fn = state_fn
+
+    def record(self, op, **fields):
+        """Append one operation to the log (buffered; fsynced by the flusher)."""
+        with self._lock:
+            if self._closed:
+                raise StoreClosed(f"store {self.directory} is closed")
+            self.seq += 1
+            fields["op"] = op
+            fields["seq"] = self.seq
+            if self._log is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._log = open(self._log_path, "a", encoding="utf-8")
+            self._log.write(json.dumps(fields, default=_encode) + "\n")
+            self._dirty = True
+            self._since_snapshot += 1
+            if self._state_fn is not None and self._since_snapshot >= self.compact_every:
+                self._compact()
+
+    def sync(self):
+        """Flush buffered operations and fsync the log."""
+        with self._lock:
+            self._sync()
+
+    def compact(self):
+        with self._lock:
+            if self._closed:
+                raise StoreClosed(f"store {self.directory} is closed")
+            self._compact()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._sync()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+        _flusher.unregister(self)
+
+    def _sync(self):
+        if self._dirty and self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        self._dirty = False
+        self._synced_at = time.monotonic()
+
+    def _compact(self):
+        # Snapshot first (atomically), then truncate the log. If we crash in
+        # between, replay skips the logged ops the snapshot already covers.
+        self._sync()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._snapshot_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": self.seq, "state": self._state_fn()}, f, default=_encode)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._snapshot_path)
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self._log_path, "w", encoding="utf-8")
+        self._since_snapshot = 0
+
+
+class _Flusher:
+    """One daemon thread that fsyncs every dirty store on its interval."""
+
+    def __init__(self):
+        self._stores = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, store):
+        with self._lock:
+            self._stores.add(store)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="aura-store-flusher", daemon=True)
+                self._thread.start()
+
+    def unregister(self, store):
+        with self._lock:
+            self._stores.discard(store)
+
+    def flush_all(self):
+        with self._lock:
+            stores = list(self._stores)
+        for store in stores:
+            try:
+                store.sync()
+            except Exception as e:
+                log.warning("store flush failed", directory=store.directory, error=str(e))
+
+    def _run(self):
+        while True:
+            time.sleep(0.1)
+            now = time.monotonic()
+            with self._lock:
+                stores = list(self._stores)
+            for store in stores:
+                if store._dirty and now - store._synced_at >= store.fsync_interval:
+                    try:
+                        store.sync()
+                    except Exception as e:
+                        log.warning("store flush failed", directory=store.directory, error=str(e))
+
+
+_flusher = _Flusher()
+atexit.register(_flusher.flush_all)
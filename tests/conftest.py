@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Run from anywhere: the modules under test live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Sessions and stores created while importing server.py must not touch ./data
+os.environ.setdefault("AURA_DATA_DIR", tempfile.mkdtemp(prefix="aura-tests-"))
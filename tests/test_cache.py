@@ -0,0 +1,150 @@
+"""AnswerCache TTLs, LRU bound and SQLite persistence, alone and behind
+KnowledgeLookup against a local stub of the DuckDuckGo and Wikipedia APIs."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import cache
+import lookup
+from cache import AnswerCache
+
+ANSWERS = {
+    "duckduckgo": {"python": "Python is a programming language."},
+    "wikipedia": {"python": "Python is a high-level language.", "zebra": "Zebras are striped equines."},
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/ddg/":
+            self.server.calls.append(("duckduckgo", params["q"]))
+            answer = ANSWERS["duckduckgo"].get(params["q"])
+            body = {"Abstract": answer or "", "RelatedTopics": []}
+        else:
+            self.server.calls.append(("wikipedia", params["gsrsearch"]))
+            answer = ANSWERS["wikipedia"].get(params["gsrsearch"])
+            body = {"query": {"pages": {"1": {"extract": answer}}}} if answer else {}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.calls = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(lookup, "DDG_API_URL", base + "/ddg/")
+    monkeypatch.setattr(lookup, "WIKIPEDIA_API_URL", base + "/w/api.php")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def ddg_calls(stub):
+    # The Wikipedia request loses to a DuckDuckGo answer and may be cancelled before it is cached
+    return [call for call in stub.calls if call[0] == "duckduckgo"]
+
+
+def make_lookup(path):
+    session = lookup.make_session()
+    session.trust_env = False  # never route the stub through a proxy
+    return lookup.KnowledgeLookup(cache=AnswerCache(path), deadline=5.0, session=session)
+
+
+def test_lookup_hit_after_miss(stub, tmp_path):
+    knowledge = make_lookup(str(tmp_path / "answers.db"))
+    assert knowledge.lookup("python") == ("duckduckgo", ANSWERS["duckduckgo"]["python"])
+    assert ddg_calls(stub) == [("duckduckgo", "python")]
+    assert knowledge.lookup("Python?") == ("duckduckgo", ANSWERS["duckduckgo"]["python"])
+    assert ddg_calls(stub) == [("duckduckgo", "python")]
+    assert knowledge.cache.stats()["hits"] >= 1
+
+
+def test_lookup_falls_back_and_caches_failures(stub, tmp_path):
+    knowledge = make_lookup(str(tmp_path / "answers.db"))
+    assert knowledge.lookup("zebra") == ("wikipedia", ANSWERS["wikipedia"]["zebra"])
+    assert knowledge.lookup("nothing at all") == (None, None)
+    calls = len(stub.calls)
+    assert knowledge.lookup("nothing at all") == (None, None)
+    assert knowledge.lookup("zebra") == ("wikipedia", ANSWERS["wikipedia"]["zebra"])
+    assert len(stub.calls) == calls
+    assert knowledge.cache.get("duckduckgo", "nothing at all") == (True, None)
+    assert knowledge.cache.stats()["negative_hits"] >= 2
+
+
+def test_answers_survive_reopen(stub, tmp_path):
+    path = str(tmp_path / "answers.db")
+    make_lookup(path).lookup("python")
+    make_lookup(path).lookup("nothing at all")
+    calls = len(stub.calls)
+    knowledge = make_lookup(path)
+    assert knowledge.lookup("nothing at all") == (None, None)
+    assert len(stub.calls) == calls
+    assert knowledge.lookup("python") == ("duckduckgo", ANSWERS["duckduckgo"]["python"])
+    assert len(ddg_calls(stub)) == 2  # one per source and query, none after the reopen
+
+
+def test_ttl_and_negative_ttl(clock):
+    answers = AnswerCache(None, ttls={"wikipedia": 100}, negative_ttl=10)
+    answers.put("wikipedia", "zebra", "Zebras are striped.")
+    answers.put("wikipedia", "nothing", None)
+    clock[0] += 9
+    assert answers.get("wikipedia", "zebra") == (True, "Zebras are striped.")
+    assert answers.get("wikipedia", "nothing") == (True, None)
+    clock[0] += 2
+    assert answers.get("wikipedia", "nothing") == (False, None)
+    assert answers.get("wikipedia", "zebra") == (True, "Zebras are striped.")
+    clock[0] += 90
+    assert answers.get("wikipedia", "zebra") == (False, None)
+    assert answers.stats() == {"hits": 3, "misses": 2, "negative_hits": 1, "entries": 0}
+
+
+def test_expired_entries_dropped_on_reopen(tmp_path, clock):
+    path = str(tmp_path / "answers.db")
+    AnswerCache(path, ttls={"wikipedia": 100}).put("wikipedia", "zebra", "Zebras are striped.")
+    assert AnswerCache(path).get("wikipedia", "zebra") == (True, "Zebras are striped.")
+    clock[0] += 101
+    reopened = AnswerCache(path)
+    assert reopened._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0] == 0
+    assert reopened.get("wikipedia", "zebra") == (False, None)
+
+
+def test_lru_bound(tmp_path):
+    memory_only = AnswerCache(None, max_entries=2)
+    for query in ("a", "b", "c"):
+        memory_only.put("wikipedia", query, query.upper())
+    memory_only.get("wikipedia", "b")
+    memory_only.put("wikipedia", "d", "D")
+    assert memory_only.stats()["entries"] == 2
+    assert memory_only.get("wikipedia", "a") == (False, None)
+    assert memory_only.get("wikipedia", "c") == (False, None)
+    assert memory_only.get("wikipedia", "b") == (True, "B")
+
+    # Written through to disk, an entry evicted from memory is still found
+    on_disk = AnswerCache(str(tmp_path / "answers.db"), max_entries=2)
+    for query in ("a", "b", "c"):
+        on_disk.put("wikipedia", query, query.upper())
+    assert on_disk.stats()["entries"] == 2
+    assert on_disk.get("wikipedia", "a") == (True, "A")
+    assert on_disk.stats()["entries"] == 2
@@ -0,0 +1,57 @@
+"""The fuzzy fallback corrects misheard commands but never into a destructive
+intent, and only ever replaces an unknown app name with a known one."""
+from unittest import mock
+
+import pytest
+
+import model
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setattr(model.subprocess, "Popen", mock.MagicMock())
+    processor = model.CommandProcessor(processes=mock.MagicMock())
+    processor.closed = []
+
+    def schedule(key, func, *args):
+        if func == processor.close_application:
+            processor.closed.append(args[0])
+    processor._schedule = schedule
+    return processor
+
+
+@pytest.mark.parametrize("command", ["clean tasks", "clear tax", "clear task"])
+def test_no_fuzzy_route_to_clearing_tasks(processor, command):
+    processor.tasks.append({"task": "buy milk", "completed": False})
+    assert processor.process(command) == model.NOT_UNDERSTOOD
+    assert processor.tasks == [{"task": "buy milk", "completed": False}]
+    assert processor.process("clear tasks") == model.TASKS_CLEARED
+    assert processor.tasks == []
+
+
+@pytest.mark.parametrize("command", ["clear note", "clear reminder"])
+def test_no_fuzzy_route_to_clearing_notes(processor, command):
+    processor.notes.append("call mom")
+    assert processor.process(command) == model.NOT_UNDERSTOOD
+    assert processor.notes == ["call mom"]
+
+
+def test_fuzzy_corrects_app_names(processor):
+    assert processor.process("open note pad") == "Opening notepad."
+    processor.last_opened_app = None
+    assert processor.process("close note pad") == "Closing notepad."
+    assert processor.closed == ["notepad"]
+
+
+@pytest.mark.parametrize("command, reply", [("close tap", model.NOT_UNDERSTOOD),
+                                            ("open tap", "App tap not found in my database.")])
+def test_no_correction_to_something_that_is_not_an_app(processor, command, reply):
+    assert processor.process(command) == reply
+    assert processor.closed == []
+    assert processor.last_opened_app is None
+
+
+def test_garbled_words_before_open_are_not_an_app_launch(processor):
+    assert processor.process("wen did i last open chrome") == "I don't remember you opening chrome."
+    assert processor._handled == "history.app_last_opened"
+    assert processor.last_opened_app is None
@@ -0,0 +1,13 @@
+"""VoicePipeline keeps a bounded history and no audio once it is recognised."""
+from pipeline import AudioClip, VoicePipeline
+
+
+def test_turns_bounded_and_audio_released():
+    clips = [AudioClip(bytes(3200), 16000, 2, f"clip{i}") for i in range(10)]
+    pipeline = VoicePipeline(clips, recognize=lambda clip: clip.path, process=str.upper,
+                             speak=lambda text: None, keep_turns=3)
+    stats = pipeline.run()
+    assert [turn.text for turn in pipeline.turns] == ["clip7", "clip8", "clip9"]
+    assert [turn.response for turn in pipeline.turns] == ["CLIP7", "CLIP8", "CLIP9"]
+    assert all(turn.audio is None for turn in pipeline.turns)
+    assert stats.summary()["end_to_end"]["count"] == 10
@@ -0,0 +1,105 @@
+"""VoiceSpeaker on FakeEngine: sentence order, time to first audio and barge-in."""
+import threading
+import time
+
+from speak import VoiceSpeaker, FakeEngine, speech_chunks
+
+LONG_REPLY = ("A galaxy is a system of stars, stellar remnants, interstellar gas and dust. "
+              "The word is derived from the Greek galaxias, literally milky. "
+              "Galaxies range in size from dwarfs to the largest known supergiants. "
+              "Most of them are held together by dark matter.")
+LIST_REPLY = "\n".join(["I can help you with many things!",
+                        " System Control: I can open and close applications",
+                        " Information: I can tell you the time. And the date.",
+                        "Feel free to ask!"])
+
+
+class ThreadCheckingEngine(FakeEngine):
+    """Records the thread every stop() comes from."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop_threads = []
+
+    def stop(self):
+        self.stop_threads.append(threading.current_thread().name)
+        super().stop()
+
+
+def make_speaker(words_per_second=200.0, synth_per_word=0.0, engine_class=FakeEngine):
+    engine = engine_class(words_per_second, synth_per_word)
+    speaker = VoiceSpeaker(streaming=True, engine_factory=lambda: engine, settle=0)
+    return speaker, engine
+
+
+def test_sentences_spoken_in_order():
+    speaker, engine = make_speaker()
+    try:
+        first, second = speaker.say(LONG_REPLY), speaker.say(LIST_REPLY)
+        assert second.wait(5)
+        assert not first.cancelled and not second.cancelled
+        assert [text for text, _, _, completed in engine.spoken if completed] == \
+            speech_chunks(LONG_REPLY) + speech_chunks(LIST_REPLY)
+    finally:
+        speaker.close()
+
+
+def test_first_audio_before_the_reply_is_synthesised():
+    # 10 ms of synthesis per word: the whole reply would take about 0.4 s before any audio
+    speaker, engine = make_speaker(words_per_second=50.0, synth_per_word=0.01)
+    try:
+        speaker.say("warm up").wait(5)
+        start = time.perf_counter()
+        utterance = speaker.say(LONG_REPLY)
+        assert time.perf_counter() - start < 0.05  # say() does not wait for speech
+        assert utterance.wait(10)
+        first_sentence = len(speech_chunks(LONG_REPLY)[0].split())
+        assert utterance.time_to_first_audio < first_sentence * 0.01 + 0.1
+        assert utterance.finished - utterance.queued > 3 * utterance.time_to_first_audio
+    finally:
+        speaker.close()
+
+
+def test_interrupt_cuts_off_speech_from_the_tts_thread():
+    speaker, engine = make_speaker(words_per_second=10.0, engine_class=ThreadCheckingEngine)
+    try:
+        utterance = speaker.say(LONG_REPLY)
+        assert utterance.started.wait(2)
+        time.sleep(0.15)
+        stop = time.perf_counter()
+        assert speaker.interrupt() == len(speech_chunks(LONG_REPLY)) - 1
+        assert utterance.wait(1)
+        assert utterance.cancelled
+        speaker.wait()  # the sentence being spoken ends on the TTS thread
+        text, _, ended, completed = engine.spoken[-1]
+        assert (text, completed) == (speech_chunks(LONG_REPLY)[0], False)
+        assert ended - stop < 0.25  # within a word or so
+        assert len(engine.spoken) == 1
+        assert engine.stop_threads and set(engine.stop_threads) == {"aura-tts"}
+
+        # The next reply is not affected by the earlier barge-in
+        after = speaker.say("Still here.")
+        assert after.wait(2) and not after.cancelled
+        assert engine.spoken[-1][0::3] == ("Still here.", True)
+    finally:
+        speaker.close()
+
+
+def test_interrupt_when_idle_is_harmless():
+    speaker, engine = make_speaker()
+    try:
+        assert speaker.interrupt() == 0
+        assert speaker.say("Hello there.").wait(2)
+        assert engine.spoken[-1][0::3] == ("Hello there.", True)
+    finally:
+        speaker.close()
+
+
+def test_say_without_streaming_speaks_before_returning():
+    engine = FakeEngine(200.0)
+    speaker = VoiceSpeaker(engine_factory=lambda: engine)
+    utterance = speaker.say(LONG_REPLY)
+    assert utterance.done.is_set() and not utterance.cancelled
+    assert [text for text, _, _, _ in engine.spoken] == [LONG_REPLY]
+    assert speaker.interrupt() == 0
+    speaker.wait()
@@ -0,0 +1,118 @@
+"""Fixed replies prewarmed into AudioCache play without the TTS engine."""
+import time
+
+import pytest
+
+from model import FIXED_REPLIES, TASKS_CLEARED, NOT_UNDERSTOOD
+from speak import VoiceSpeaker, FakeEngine, FakePlayer, speech_chunks
+from ttscache import AudioCache
+
+WORDS_PER_SECOND = 300.0  # fast playback keeps the run short
+SYNTH_PER_WORD = 0.01
+
+
+def make_speaker(cache=None, synth_per_word=SYNTH_PER_WORD, words_per_second=WORDS_PER_SECOND):
+    engine = FakeEngine(words_per_second, synth_per_word)
+    player = FakePlayer()
+    speaker = VoiceSpeaker(streaming=True, engine_factory=lambda: engine, settle=0,
+                           cache=cache, player_factory=lambda: player)
+    return speaker, engine, player
+
+
+def prewarm(speaker, cache, replies):
+    count = speaker.prewarm(replies)
+    deadline = time.monotonic() + 10
+    while speaker._renders or len(cache) < count:
+        assert time.monotonic() < deadline, "prewarm did not finish"
+        time.sleep(0.005)
+    return count
+
+
+def first_audio(speaker, engine, player, text):
+    engine.spoken.clear()
+    player.played.clear()
+    utterance = speaker.say(text)
+    assert utterance.wait(5)
+    return min([s[1] for s in engine.spoken] + [p[1] for p in player.played]) - utterance.queued
+
+
+@pytest.fixture
+def warm(tmp_path):
+    cache = AudioCache(str(tmp_path / "tts"))
+    speaker, engine, player = make_speaker(cache)
+    count = prewarm(speaker, cache, FIXED_REPLIES)
+    yield speaker, engine, player, cache, count
+    speaker.close()
+
+
+def test_prewarmed_reply_served_from_cache(warm):
+    speaker, engine, player, cache, count = warm
+    assert count == sum(len(speech_chunks(reply)) for reply in FIXED_REPLIES)
+    rendered = [text for text, _ in engine.saved]
+    for reply in (TASKS_CLEARED, NOT_UNDERSTOOD):
+        assert reply in rendered
+        engine.spoken.clear()
+        player.played.clear()
+        assert speaker.say(reply).wait(5)
+        assert engine.spoken == []  # the engine never ran
+        assert len(player.played) == len(speech_chunks(reply))
+        assert all(completed for _, _, _, completed in player.played)
+    assert len(engine.saved) == count  # nothing rendered again
+
+
+def test_cached_first_audio_faster(warm):
+    speaker, engine, player, _, _ = warm
+    plain = make_speaker()
+    try:
+        uncached = [first_audio(*plain, reply) for reply in FIXED_REPLIES]
+        cached = [first_audio(speaker, engine, player, reply) for reply in FIXED_REPLIES]
+    finally:
+        plain[0].close()
+    assert engine.spoken == []
+    assert sorted(cached)[len(cached) // 2] < sorted(uncached)[len(uncached) // 2]
+
+
+def test_uncached_reply_synthesised(warm):
+    speaker, engine, player, _, _ = warm
+    engine.spoken.clear()
+    player.played.clear()
+    assert speaker.say("Opening spotify.").wait(5)
+    assert [text for text, *_ in engine.spoken] == ["Opening spotify."]
+    assert player.played == []
+
+
+def test_barge_in_on_cached_audio(tmp_path):
+    cache = AudioCache(str(tmp_path / "tts"))
+    speaker, engine, player = make_speaker(cache, words_per_second=10.0)  # long enough to cut off
+    reply = max(FIXED_REPLIES, key=len)
+    try:
+        prewarm(speaker, cache, [reply])
+        utterance = speaker.say(reply)
+        assert utterance.started.wait(5)
+        time.sleep(0.05)
+        stop = time.perf_counter()
+        speaker.interrupt()
+        speaker.wait()
+    finally:
+        speaker.close()
+    assert engine.spoken == []
+    assert player.played and not player.played[-1][3]
+    assert player.played[-1][2] - stop < 0.25
+
+
+def test_lru_bound_survives_restart(tmp_path):
+    full = AudioCache(str(tmp_path / "full"))
+    speaker, _, _ = make_speaker(full, synth_per_word=0.0)
+    prewarm(speaker, full, FIXED_REPLIES)
+    speaker.close()
+    limit = full.size // 2
+    small = AudioCache(str(tmp_path / "small"), max_bytes=limit)
+    speaker, _, player = make_speaker(small, synth_per_word=0.0)
+    speaker.prewarm(FIXED_REPLIES)
+    while speaker._renders:
+        time.sleep(0.005)
+    assert speaker.say(FIXED_REPLIES[-1]).wait(5)
+    speaker.close()
+    assert 0 < len(small) < len(full) and small.size <= limit
+    assert len(player.played) == len(speech_chunks(FIXED_REPLIES[-1]))  # the most recent was kept
+    assert len(AudioCache(small.directory, max_bytes=limit)) == len(small)
@@ -0,0 +1,161 @@
+"""Endpointer and EchoGate on the synthetic clips from benchmarks/bench_vad.py."""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_vad
+import vad
+from bench_vad import CHUNK, RATE
+
+MAX_DELAY = (vad.HANGOVER_MS + 100) / 1000  # end of speech to end declared
+CLIPS = bench_vad.synthetic_fixtures(24, 23)  # every noise at 20, 10 and 5 dB, twice
+
+
+def saved_profile(samples, start, offset_db=3.0):
+    energy, zcr = vad.frame_features(samples[:int(start * RATE)], CHUNK)
+    return vad.NoiseProfile.calibrate(energy + offset_db, zcr)
+
+
+def profiles(samples, start):
+    return {"saved": saved_profile(samples, start), "20 dB low": saved_profile(samples, start, -20.0),
+            "cold": None}
+
+
+def score(samples, start, end, profile):
+    segments, _ = bench_vad.run_vad(samples, profile)
+    result = bench_vad.Result()
+    result.add(segments, start, end, end)
+    return result
+
+
+@pytest.mark.parametrize("name, kind, samples, start, end", CLIPS, ids=[clip[0] for clip in CLIPS])
+def test_endpointing(name, kind, samples, start, end):
+    for label, profile in profiles(samples, start).items():
+        result = score(samples, start, end, profile)
+        assert (result.missed, result.extra) == (0, 0), label
+        assert result.delays[0] <= MAX_DELAY, label
+        if "_5db_" not in name:  # the odd long pause in white noise at 5 dB may split an utterance
+            assert (result.cut, result.split) == (0, 0), label
+
+
+def test_faster_than_listen():
+    vad_delays, listen_delays = [], []
+    for _, _, samples, start, end in CLIPS:
+        vad_delays += score(samples, start, end, saved_profile(samples, start)).delays
+        result = bench_vad.Result()
+        result.add(bench_vad.run_listen(samples), start, end, end)
+        listen_delays += result.delays
+    assert np.median(vad_delays) < np.median(listen_delays) / 2
+
+
+@pytest.mark.parametrize("kind", bench_vad.NOISES)
+def test_noise_alone_is_not_speech(kind):
+    rng = random.Random(kind)
+    background = bench_vad.noise(rng, kind, 10 * RATE)
+    for level_db in (-50, -35):
+        scaled = background * 10 ** (level_db / 20) * 32768 / bench_vad.rms(background)
+        samples = np.clip(scaled, -32768, 32767).astype("<i2")
+        assert bench_vad.run_vad(samples, None)[0] == [], level_db
+        assert bench_vad.run_vad(samples, saved_profile(samples, 1.0))[0] == [], level_db
+
+
+# --- EchoGate ---------------------------------------------------------------------------
+
+class Speaker:
+    audible = False
+
+
+def speech(rng, seconds, level_db):
+    samples = bench_vad.utterance(rng, seconds)
+    return samples * 10 ** (level_db / 20) * 32768 / bench_vad.rms(samples)
+
+
+def echo_speech(rng, samples, level_db):
+    """The assistant's reply: sentences about a second long with 350 ms pauses between."""
+    sentences = []
+    while sum(len(s) for s in sentences) < samples:
+        sentences += [speech(rng, rng.uniform(0.8, 1.2), level_db), np.zeros(int(0.35 * RATE))]
+    return np.concatenate(sentences)[:samples]
+
+
+def stream(parts, seed=5):
+    """parts: (seconds or speech samples, audible, echo level dB or None); white noise
+    at -60 dB throughout, with the assistant's voice at that level while audible."""
+    rng = random.Random(seed)
+    speaker = Speaker()
+    endpointer = vad.Endpointer(RATE)
+    gate = vad.EchoGate(speaker, RATE)
+    chunks = []
+    for audio, audible, echo_db in parts:
+        if not isinstance(audio, np.ndarray):
+            audio = np.zeros(int(audio * RATE))
+        if echo_db is not None:
+            audio = audio + echo_speech(rng, len(audio), echo_db)
+        audio = audio + bench_vad.rng_normal(rng, len(audio)) * 10 ** (-60 / 20) * 32768
+        samples = np.clip(audio, -32768, 32767).astype("<i2")
+        chunks += [(samples[i:i + CHUNK].tobytes(), audible) for i in range(0, len(samples), CHUNK)]
+    admitted = []
+    for pcm, audible in chunks + [(bytes(2 * CHUNK), False)] * 50:
+        speaker.audible = audible
+        gate.listen(pcm)
+        for segment in endpointer.feed(pcm):
+            admitted.append((segment, gate.admit(segment, segment.clip)))
+    return gate, admitted
+
+
+def test_echo_dropped():
+    gate, admitted = stream([(1.0, False, None), (3.0, True, -25), (1.0, False, None)])
+    assert admitted and all(clip is None for _, clip in admitted)
+    assert gate.dropped == len(admitted)
+
+
+def test_loud_barge_in_trimmed_to_the_user():
+    rng = random.Random(7)
+    user = speech(rng, 1.5, -13)
+    gate, admitted = stream([(1.0, False, None), (1.5, True, -25), (user, True, -25), (1.0, False, None)])
+    (segment, clip), = admitted
+    assert clip is not None and gate.dropped == 0
+    kept = clip.duration
+    assert kept < segment.clip.duration - 1.0  # most of the echo before the user is cut
+    assert kept >= len(user) / RATE  # ... and none of the user
+
+
+def test_quiet_barge_in_dropped():
+    rng = random.Random(7)
+    user = speech(rng, 1.5, -26)
+    gate, admitted = stream([(1.0, False, None), (1.5, True, -25), (user, True, -25), (1.0, False, None)])
+    assert all(clip is None for _, clip in admitted)
+
+
+def test_barge_in_after_wake_word_kept():
+    rng = random.Random(3)
+    speaker = Speaker()
+    endpointer = vad.Endpointer(RATE)
+    gate = vad.EchoGate(speaker, RATE)
+    audio = np.concatenate([np.zeros(RATE), speech(rng, 2.0, -25), np.zeros(RATE)])
+    audio += bench_vad.rng_normal(rng, len(audio)) * 10 ** (-60 / 20) * 32768
+    samples = np.clip(audio, -32768, 32767).astype("<i2")
+    speaker.audible = True
+    segments = []
+    for i in range(0, len(samples), CHUNK):
+        pcm = samples[i:i + CHUNK].tobytes()
+        gate.listen(pcm)
+        segments += endpointer.feed(pcm)
+    segment, = segments
+    assert gate.admit(segment, segment.clip, wake=True) is segment.clip
+
+
+def test_user_speaking_first_kept():
+    rng = random.Random(11)
+    user = speech(rng, 1.2, -25)
+    # The assistant starts talking over the end of the user's utterance
+    split = int(0.8 * RATE)
+    _, admitted = stream([(1.0, False, None), (user[:split], False, None), (user[split:], True, -30),
+                             (1.0, False, None)])
+    segment, clip = admitted[0]
+    assert segment.onset < 1.8 and clip is segment.clip  # whatever follows is the echo alone
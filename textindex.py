@@ -0,0 +1,282 @@
+"""
+textindex.py - Offline full-text index for factual questions.
+Abstracts from a Wikipedia abstracts dump (enwiki-*-abstract.xml, optionally
+.gz/.bz2) or any JSONL corpus ({"title": ..., "text": ...} per line) are
+streamed into a SQLite FTS5 index on disk, so "what/who/explain" questions can
+be answered without the network. A question is looked up by exact title first
+(one B-tree probe), then by a BM25-ranked match on a separate title-only
+index, then on whole abstracts. SQLite's bm25() scans every match of every
+term to weigh it, so words found in more than COMMON_DF abstracts (counted
+once at build time) are dropped like stopwords, and only the first RANK_LIMIT matches in dump order are
+scored: a question costs the same few milliseconds at a million documents as
+at a thousand. Reads go through memory-mapped per-thread connections.
+Build one with: python textindex.py DUMP [DUMP ...] [--index PATH]
+AURA_KNOWLEDGE_INDEX overrides the location (default data/knowledge.db).
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from logs import get_logger
+from metrics import counter, histogram
+from store import DEFAULT_DATA_DIR
+
+DEFAULT_INDEX_PATH = os.environ.get('AURA_KNOWLEDGE_INDEX', os.path.join(DEFAULT_DATA_DIR, 'knowledge.db'))
+
+log = get_logger("textindex")
+QUERY_SECONDS = histogram("aura_text_index_query_duration_seconds", "Time to answer a question from the local index")
+QUERIES = counter("aura_text_index_queries_total", "Questions looked up in the local index, by result", ["result"])
+
+# Question words and fillers that say nothing about the topic
+STOPWORDS = frozenset("""
+    a an the is are was were be been do does did of in on at to for from by with about and or
+    what who whom whose which where when why how explain tell me please meaning mean means
+    it its this that these those there their his her
+""".split())
+LEADING_FILLER = re.compile(r'^(?:(?:is|are|was|were|does|do|did|a|an|the|me|about)\s+)+')
+WORD = re.compile(r'[a-z0-9]+')
+BATCH_SIZE = 10000
+RANK_LIMIT = 500  # matches scored per question; BM25 costs a few us a row
+COMMON_DF = 50000  # abstracts a word may appear in and still be ranked on (~2 ms to weigh)
+MIN_ABSTRACT = 40  # shorter abstracts are stubs and infobox leftovers
+
+
+def title_key(title):
+    """Normalised title for exact lookups: "Alan Turing" and "alan turing?" share a key."""
+    return " ".join(WORD.findall(title.lower()))
+
+
+def _open(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def read_jsonl(path):
+    with _open(path) as f:
+        for line in f:
+            if line.strip():
+                doc = json.loads(line)
+                yield doc.get("title", ""), doc.get("text") or doc.get("abstract") or ""
+
+
+def read_wikipedia_abstracts(path):
+    """(title, abstract) pairs from an abstracts dump, parsed incrementally."""
+    with _open(path) as f:
+        events = ET.iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        for event, elem in events:
+            if event == "end" and elem.tag == "doc":
+                title = elem.findtext("title") or ""
+                if title.startswith("Wikipedia: "):
+                    title = title[len("Wikipedia: "):]
+                yield title, elem.findtext("abstract") or ""
+                root.clear()  # drop parsed docs so memory stays flat
+
+
+def read_documents(path):
+    """Pick the reader by file name: JSONL (.jsonl/.json) or an XML abstracts dump."""
+    name = re.sub(r'\.(gz|bz2)$', '', path)
+    if name.endswith((".jsonl", ".json", ".ndjson")):
+        return read_jsonl(path)
+    return read_wikipedia_abstracts(path)
+
+
+def usable(title, text):
+    text = text.strip()
+    return (title and len(text) >= MIN_ABSTRACT and not text.startswith(("|", "{{", "}}"))
+            and "may refer to" not in text[:200])
+
+
+class TextIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, mmap_size=256 * 2 ** 20):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # --- Building -----------------------------------------------------------------
+
+    def build(self, documents, progress=None):
+        """Stream (title, text) pairs into the index in batches; returns how many were added."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5("
+                       "title, body, tokenize='porter unicode61 remove_diacritics 2')")
+            # Titles get their own small index: a column filter on docs would still
+            # read every position of a common word across all abstracts
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS title_words USING fts5("
+                       "title, content='', tokenize='porter unicode61 remove_diacritics 2')")
+            db.execute("CREATE TABLE IF NOT EXISTS titles (key TEXT PRIMARY KEY, doc INTEGER) WITHOUT ROWID")
+            next_id = db.execute("SELECT coalesce(max(rowid), 0) + 1 FROM docs").fetchone()[0]
+            added = 0
+            batch = []
+            for title, text in documents:
+                if not usable(title, text):
+                    continue
+                batch.append((next_id + added, title.strip(), text.strip()))
+                added += 1
+                if len(batch) >= BATCH_SIZE:
+                    self._insert(db, batch)
+                    batch = []
+                    if progress:
+                        progress(added)
+            if batch:
+                self._insert(db, batch)
+            # Merge the FTS segments written batch by batch into one b-tree for faster queries
+            db.execute("INSERT INTO docs(docs) VALUES ('optimize')")
+            db.execute("INSERT INTO title_words(title_words) VALUES ('optimize')")
+            self._count_common_terms(db)
+            db.commit()
+            # Back to a single file, so read-only connections need no -wal/-shm files
+            db.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            db.close()
+        self.close()
+        return added
+
+    def _insert(self, db, batch):
+        with db:
+            db.executemany("INSERT INTO docs (rowid, title, body) VALUES (?, ?, ?)", batch)
+            db.executemany("INSERT INTO title_words (rowid, title) VALUES (?, ?)", (row[:2] for row in batch))
+            # The first document with a title keeps it; dumps list the main article first
+            db.executemany("INSERT OR IGNORE INTO titles (key, doc) VALUES (?, ?)",
+                           ((title_key(title), doc) for doc, title, _ in batch))
+
+    def _count_common_terms(self, db):
+        # fts5vocab reads a word's whole doclist to count it, as slow as bm25() itself,
+        # so the few very common stems are counted once here
+        db.execute("CREATE VIRTUAL TABLE temp.doc_terms USING fts5vocab(main, docs, 'row')")
+        db.execute("DROP TABLE IF EXISTS common_terms")
+        db.execute("CREATE TABLE common_terms (term TEXT PRIMARY KEY, docs INTEGER) WITHOUT ROWID")
+        db.execute("INSERT INTO common_terms SELECT term, doc FROM temp.doc_terms WHERE doc > ?", (COMMON_DF,))
+        db.execute("DROP TABLE temp.doc_terms")
+
+    # --- Querying -------------------------------------------------------------------
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            db.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            # A scratch table that stems a question with the index's own tokenizer
+            db.execute("CREATE VIRTUAL TABLE temp.question USING fts5("
+                       "text, tokenize='porter unicode61 remove_diacritics 2')")
+            db.execute("CREATE VIRTUAL TABLE temp.question_terms USING fts5vocab(temp, question, 'instance')")
+            self._local.db = db
+        return db
+
+    def search(self, question):
+        """Best (title, abstract) for a question such as "is alan turing", or None."""
+        start = time.perf_counter()
+        try:
+            hit = self._search(question)
+        except sqlite3.Error as e:
+            log.warning("text index query failed", error=str(e))
+            hit = None
+        QUERY_SECONDS.observe(time.perf_counter() - start)
+        QUERIES.labels("hit" if hit else "miss").inc()
+        return hit
+
+    def _search(self, question):
+        topic = LEADING_FILLER.sub("", question.lower().strip().rstrip("?.! "))
+        db = self._db()
+        row = db.execute("SELECT d.title, d.body FROM titles t JOIN docs d ON d.rowid = t.doc WHERE t.key = ?",
+                         (title_key(topic),)).fetchone()
+        if row:
+            return row
+        terms = list(dict.fromkeys(t for t in WORD.findall(topic) if t not in STOPWORDS))
+        if not terms:
+            return None
+        # Documents whose title has every term are few and usually the right article
+        doc = self._best(db, "title_words", terms)
+        if doc is None:
+            ranked = [t for t, common in zip(terms, self._common(db, terms)) if not common]
+            if not ranked:
+                return None  # nothing but very common words: too vague to answer from the index
+            doc = self._best(db, "docs", ranked, ", 10.0, 1.0")
+        if doc is None:
+            return None
+        return db.execute("SELECT title, body FROM docs WHERE rowid = ?", (doc,)).fetchone()
+
+    def _common(self, db, terms):
+        """Whether each of terms, once stemmed, is in more than COMMON_DF abstracts."""
+        with db:
+            db.execute("DELETE FROM temp.question")
+            db.execute("INSERT INTO temp.question (text) VALUES (?)", (" ".join(terms),))
+        stems = [row[0] for row in db.execute("SELECT term FROM temp.question_terms ORDER BY offset")]
+        return [db.execute("SELECT 1 FROM common_terms WHERE term = ?", (stem,)).fetchone() is not None
+                for stem in stems]
+
+    def _best(self, db, table, terms, weights=""):
+        """Rowid of the top BM25 match for all of terms among the first RANK_LIMIT matches, or None."""
+        match = " ".join(f'"{t}"' for t in terms)
+        # Matches come in rowid (dump) order and dumps list the major articles first
+        bound = db.execute(f"SELECT max(rowid) FROM (SELECT rowid FROM {table} WHERE {table} MATCH ? LIMIT ?)",
+                           (match, RANK_LIMIT)).fetchone()[0]
+        if bound is None:
+            return None
+        row = db.execute(f"SELECT rowid FROM {table} WHERE {table} MATCH ? AND rowid <= ? "
+                         f"ORDER BY bm25({table}{weights}) LIMIT 1", (match, bound)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+_default = None
+_default_lock = threading.Lock()
+_missing_since = None
+RECHECK_SECONDS = 30.0  # how long "no index built" is trusted before looking again
+
+
+def default_index():
+    """Process-wide index at DEFAULT_INDEX_PATH, or None if none has been built."""
+    global _default, _missing_since
+    with _default_lock:
+        if _default is None:
+            _default = TextIndex()
+        # Every question asks, so a missing index is remembered instead of stat'ed each time
+        if _missing_since is not None and time.monotonic() - _missing_since < RECHECK_SECONDS:
+            return None
+        if _default.exists():
+            _missing_since = None
+            return _default
+        _missing_since = time.monotonic()
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline knowledge index from abstracts dumps or JSONL.")
+    parser.add_argument("dumps", nargs="+", help="enwiki-*-abstract.xml[.gz|.bz2] or .jsonl[.gz] files")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help=f"index file (default {DEFAULT_INDEX_PATH})")
+    args = parser.parse_args(argv)
+    index = TextIndex(args.index)
+    start = time.perf_counter()
+    total = 0
+    for path in args.dumps:
+        total += index.build(read_documents(path),
+                             progress=lambda n: print(f"\r{path}: {n} documents", end="", flush=True))
+        print()
+    print(f"indexed {total} documents into {args.index} in {time.perf_counter() - start:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+ttscache.py - Disk cache of synthesised speech for VoiceSpeaker.
+Much of what AURA says is fixed text: greetings, "I didn't catch that", jokes,
+fun facts, mood replies and acknowledgements. Each sentence is rendered once to
+a WAV file with the engine's save_to_file() and afterwards played straight from
+disk, so it starts without waiting for synthesis. Files are named by a hash of
+(text, voice id, rate, volume), so a different voice or rate never plays stale
+audio. Beyond AURA_TTS_CACHE_MB the least recently played files are deleted;
+playing a file touches its modification time, so that order survives restarts.
+WavPlayer plays a cached file through PyAudio (which the microphone already
+needs), checking the speaker's stop flag between blocks.
+"""
+import collections
+import hashlib
+import os
+import threading
+import wave
+
+from lazy import LazyModule
+from logs import get_logger
+from metrics import counter
+from store import DEFAULT_DATA_DIR
+
+pyaudio = LazyModule("pyaudio")
+
+DEFAULT_CACHE_DIR = os.path.join(DEFAULT_DATA_DIR, "tts_cache")
+DEFAULT_MAX_BYTES = int(float(os.environ.get("AURA_TTS_CACHE_MB", "64")) * 1024 * 1024)
+BLOCK_SECONDS = 0.05  # playback granularity, and so how quickly a stop takes effect
+
+log = get_logger("ttscache")
+LOOKUPS = counter("aura_tts_cache_lookups_total", "Sentences looked up in the speech cache", ["result"])
+
+
+def cache_key(text, voice, rate, volume):
+    return hashlib.sha1(repr((text, voice, rate, volume)).encode("utf-8")).hexdigest()
+
+
+def wav_duration(path):
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+class AudioCache:
+    """WAV files keyed by cache_key(), least recently used evicted past max_bytes."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = collections.OrderedDict()  # key -> file size, least recent first
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        found = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)  # a render cut short by a crash
+            elif name.endswith(".wav"):
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".wav")
+
+    def get(self, key):
+        """Path of the cached audio, marked as just used, or None."""
+        with self._lock:
+            if key not in self._entries:
+                LOOKUPS.labels("miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        LOOKUPS.labels("hit").inc()
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            self.discard(key)
+            return None
+        return path
+
+    def render(self, engine, text, key):
+        """Synthesise text to the cache with engine.save_to_file(); returns its path."""
+        path = self.path(key)
+        tmp = path + ".tmp"
+        engine.save_to_file(text, tmp)
+        engine.runAndWait()
+        size = os.path.getsize(tmp)  # raises if the driver wrote nothing
+        if not size:
+            os.remove(tmp)
+            raise OSError(f"no audio rendered for {text!r}")
+        os.replace(tmp, path)
+        with self._lock:
+            self.size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return path
+
+    def discard(self, key):
+        with self._lock:
+            self.size -= self._entries.pop(key, 0)
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        evicted = 0
+        while self.size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            evicted += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+        if evicted:
+            log.debug("speech cache evicted", files=evicted, bytes=self.size)
+
+
+class WavPlayer:
+    """Plays WAV files on the default output device."""
+
+    def __init__(self):
+        self._audio = None
+
+    def play(self, path, stop):
+        """Play the file to the end, or until the stop Event is set (then False)."""
+        with wave.open(path, "rb") as wav:
+            if self._audio is None:
+                self._audio = pyaudio.PyAudio()
+            stream = self._audio.open(format=self._audio.get_format_from_width(wav.getsampwidth()),
+                                      channels=wav.getnchannels(), rate=wav.getframerate(), output=True)
+            try:
+                block = max(1, int(wav.getframerate() * BLOCK_SECONDS))
+                data = wav.readframes(block)
+                while data and not stop.is_set():
+                    stream.write(data)
+                    data = wav.readframes(block)
+            finally:
+                stream.stop_stream()
+                stream.close()
+        return not stop.is_set()
+
+    def close(self):
+        if self._audio is not None:
+            self._audio.terminate()
+            self._audio = None
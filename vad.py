@@ -0,0 +1,341 @@
+"""
+vad.py - Voice-activity detection and end-of-utterance detection for the voice loop.
+Microphone audio is cut into 20 ms frames and each block of frames is scored at
+once with NumPy: log energy and zero-crossing rate (ZCR). A frame is speech if
+it is clearly louder than the noise floor, or somewhat louder with a ZCR above
+the noise's, which catches quiet fricatives ("s", "f"). The thresholds follow a
+NoiseProfile (floor, spread and ZCR of the background) that adapts on every
+silent frame between utterances, and is raised when the room gets louder
+(the "speech" never dips back to the floor). Endpointer turns the frame decisions into
+utterances: speech starts after START_MS of consecutive speech frames (with
+PREROLL_MS of audio kept from before) and ends after HANGOVER_MS of silence;
+a click too short to be speech does not restart the hangover.
+Only that segment goes to the recogniser, so a long command is not cut off and
+a short one is not held back waiting for a fixed pause.
+The profile is saved under the data directory and loaded at startup, so there is
+no blocking calibration; without one (or if the room is now much louder), the
+first CALIBRATE_MS of audio sets it.
+EchoGate keeps the assistant's own voice, picked up from the speakers, from
+being taken as a command: an utterance that starts while it is speaking must
+follow the wake word or become clearly louder than the echo.
+"""
+import collections
+import json
+import os
+
+from lazy import LazyModule
+from logs import get_logger
+from pipeline import AudioClip
+from store import DEFAULT_DATA_DIR
+
+np = LazyModule("numpy")
+
+DEFAULT_PROFILE_PATH = os.path.join(DEFAULT_DATA_DIR, "noise_profile.json")
+
+FRAME_MS = 20
+START_MS = 60  # consecutive speech needed to start an utterance (clicks are shorter)
+HANGOVER_MS = 200  # silence that ends an utterance
+RESUME_MS = 40  # speech that cancels the hangover
+PREROLL_MS = 200  # audio kept from before the start, for soft onsets
+MIN_SPEECH_MS = 120  # utterances with less speech than this are dropped as noise
+MAX_UTTERANCE_MS = 15000
+NOISE_CHECK_MS = 2000  # speech always dips to the floor within this; if it does not, the floor is wrong
+CALIBRATE_MS = 300
+MARGIN_DB = 4.0  # how far above the noise floor a frame must be to count as speech
+ZCR_MARGIN = 0.15  # how far above the noise's ZCR a quieter frame must be
+ADAPT_RATE = 0.02  # per silent frame, so the floor follows the room over about a second
+ECHO_TAIL_MS = 300  # the assistant's voice still arriving after it stops (output latency, reverb)
+ECHO_HISTORY_MS = 3000  # how much of its speech before an utterance sets the echo level
+MIN_ECHO_MS = 300  # with less than this, the echo level is unknown and only the wake word barges in
+BARGE_IN_MARGIN_DB = 6.0  # how much louder than the echo an utterance must be to barge in
+BARGE_IN_MS = 200  # for at least this long
+
+log = get_logger("vad")
+
+
+def frame_features(samples, frame_length):
+    """Log energy (dBFS) and zero-crossing rate of each whole frame of int16 samples."""
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32)
+    frames -= frames.mean(axis=1, keepdims=True)  # DC offset would hide zero crossings
+    energy = 10.0 * np.log10((frames * frames).mean(axis=1) / (32768.0 * 32768.0) + 1e-12)
+    signs = np.signbit(frames)
+    zcr = (signs[:, 1:] != signs[:, :-1]).mean(axis=1)
+    return energy, zcr
+
+
+class NoiseProfile:
+    """Background noise statistics that set the speech thresholds."""
+    __slots__ = ("energy_db", "spread_db", "zcr")
+
+    def __init__(self, energy_db=-60.0, spread_db=2.0, zcr=0.1):
+        self.energy_db = energy_db
+        self.spread_db = spread_db
+        self.zcr = zcr
+
+    @classmethod
+    def calibrate(cls, energy, zcr):
+        # The quieter frames, in case speech starts during calibration
+        floor = float(np.percentile(energy, 20))
+        quiet = energy <= np.percentile(energy, 50)
+        return cls(floor, max(1.0, float(np.abs(energy[quiet] - floor).mean())), float(zcr[quiet].mean()))
+
+    def speech(self, energy, zcr):
+        """Boolean speech decision per frame."""
+        loud = energy > self.energy_db + max(MARGIN_DB, 3.0 * self.spread_db)
+        fricative = (energy > self.energy_db + MARGIN_DB / 2) & (zcr > self.zcr + ZCR_MARGIN)
+        return loud | fricative
+
+    def adapt(self, energy, zcr):
+        """Move towards the statistics of silent frames, ADAPT_RATE per frame."""
+        if not len(energy):
+            return
+        rate = 1.0 - (1.0 - ADAPT_RATE) ** len(energy)
+        self.spread_db += rate * (float(np.abs(energy - self.energy_db).mean()) - self.spread_db)
+        self.energy_db += rate * (float(energy.mean()) - self.energy_db)
+        self.zcr += rate * (float(zcr.mean()) - self.zcr)
+
+    def to_dict(self):
+        return {"energy_db": round(self.energy_db, 2), "spread_db": round(self.spread_db, 2),
+                "zcr": round(self.zcr, 4)}
+
+    @classmethod
+    def load(cls, path=DEFAULT_PROFILE_PATH):
+        """The saved profile, or None if there is none (or it is unreadable)."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(float(data["energy_db"]), float(data["spread_db"]), float(data["zcr"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path=DEFAULT_PROFILE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+
+class Segment:
+    """One detected utterance; times are seconds from the start of the stream."""
+    __slots__ = ("clip", "start", "speech_end", "decided", "truncated", "onset")
+
+    def __init__(self, clip, start, speech_end, decided, truncated=False, onset=None):
+        self.clip = clip
+        self.start = start
+        self.onset = start if onset is None else onset  # first speech frame; start includes the preroll
+        self.speech_end = speech_end  # end of the last speech frame
+        self.decided = decided  # when the end was declared: speech_end + the hangover
+        self.truncated = truncated  # cut at MAX_UTTERANCE_MS rather than ended by silence
+
+
+class Endpointer:
+    """Streaming utterance detector over 16-bit mono PCM; feed() returns finished Segments."""
+
+    def __init__(self, sample_rate=16000, profile=None, hangover_ms=HANGOVER_MS):
+        self.sample_rate = sample_rate
+        self.profile = profile
+        self.frame_length = sample_rate * FRAME_MS // 1000
+        self.hangover = max(1, hangover_ms // FRAME_MS)
+        self._pending = b""  # bytes short of a whole frame
+        self._calibration = []  # (energy, zcr) blocks of the first CALIBRATE_MS, then None
+        self._frame_index = 0  # frames consumed so far
+        self._preroll = []  # recent frames while idle
+        self._audio = None  # frames of the utterance in progress, or None while idle
+        self._levels = []  # their energies
+        self._run = 0  # consecutive speech frames while idle
+        self._silence = 0  # consecutive silent frames inside an utterance
+        self._resume = 0  # consecutive speech frames since then
+        self._speech_frames = 0
+        self._start = 0
+        self._onset = 0
+        self._last_speech = 0
+
+    def feed(self, pcm):
+        data = self._pending + pcm
+        usable = len(data) - len(data) % (2 * self.frame_length)
+        self._pending = data[usable:]
+        if not usable:
+            return []
+        samples = np.frombuffer(data[:usable], dtype="<i2")
+        energy, zcr = frame_features(samples, self.frame_length)
+        if self._calibration is not None:
+            self._calibrate(energy, zcr)
+            if self.profile is None:
+                self._frame_index += len(energy)
+                self._preroll = (self._preroll + self._split(samples))[-(PREROLL_MS // FRAME_MS):]
+                return []
+        speech = self.profile.speech(energy, zcr)
+        frames = self._split(samples)
+        segments = []
+        silent_idle = []
+        for i, frame in enumerate(frames):
+            index = self._frame_index + i
+            if self._audio is None:
+                self._idle_frame(index, frame, speech[i], silent_idle, i)
+            else:
+                segment = self._speech_frame(index, frame, speech[i], energy[i])
+                if segment is not None:
+                    segments.append(segment)
+        if silent_idle:
+            self.profile.adapt(energy[silent_idle], zcr[silent_idle])
+        self._frame_index += len(frames)
+        return segments
+
+    def _split(self, samples):
+        return [samples[i:i + self.frame_length] for i in range(0, len(samples), self.frame_length)]
+
+    def _calibrate(self, energy, zcr):
+        # With a saved profile this only checks it: a room that got louder since
+        # would otherwise be taken for speech until NOISE_CHECK_MS had passed
+        self._calibration.append((energy, zcr))
+        if sum(len(e) for e, _ in self._calibration) * FRAME_MS < CALIBRATE_MS:
+            return
+        measured = NoiseProfile.calibrate(np.concatenate([e for e, _ in self._calibration]),
+                                          np.concatenate([z for _, z in self._calibration]))
+        self._calibration = None
+        if self.profile is None or measured.energy_db > self.profile.energy_db + MARGIN_DB:
+            self.profile = measured
+            self._audio = None
+            self._run = 0
+            log.info("noise calibrated", **measured.to_dict())
+        elif measured.energy_db < self.profile.energy_db:
+            self.profile = measured  # quieter than saved: a lower threshold only adds speech frames
+
+    def _idle_frame(self, index, frame, is_speech, silent_idle, offset):
+        self._preroll.append(frame)
+        start_frames = START_MS // FRAME_MS
+        keep = PREROLL_MS // FRAME_MS + start_frames
+        if len(self._preroll) > keep:
+            del self._preroll[0]
+        if not is_speech:
+            self._run = 0
+            silent_idle.append(offset)
+            return
+        self._run += 1
+        if self._run >= start_frames:
+            self._audio = list(self._preroll)
+            self._levels = []
+            self._preroll = []
+            self._start = index + 1 - len(self._audio)
+            self._onset = index + 1 - self._run
+            self._speech_frames = self._run
+            self._last_speech = index + 1
+            self._silence = 0
+            self._resume = 0
+            self._run = 0
+
+    def _speech_frame(self, index, frame, is_speech, level):
+        self._audio.append(frame)
+        self._levels.append(level)
+        check = NOISE_CHECK_MS // FRAME_MS
+        if len(self._levels) >= check and len(self._levels) % (check // 4) == 0 and self._floor_rose(check):
+            return None
+        # After a pause a lone speech frame (a key click) only holds the
+        # hangover; it takes RESUME_MS of speech to continue the utterance
+        if not is_speech:
+            self._resume = 0
+            self._silence += 1
+        else:
+            self._resume += 1
+            if self._silence == 0 or self._resume * FRAME_MS >= RESUME_MS:
+                self._silence = 0
+                self._speech_frames += 1
+                self._last_speech = index + 1
+        too_long = len(self._audio) * FRAME_MS >= MAX_UTTERANCE_MS
+        if self._silence < self.hangover and not too_long:
+            return None
+        audio, self._audio = self._audio, None
+        truncated = self._silence < self.hangover
+        if truncated:
+            log.warning("utterance cut at the length limit", seconds=MAX_UTTERANCE_MS / 1000)
+        if self._speech_frames * FRAME_MS < MIN_SPEECH_MS:
+            return None
+        frame_seconds = FRAME_MS / 1000
+        clip = AudioClip(np.concatenate(audio).tobytes(), self.sample_rate, 2)
+        return Segment(clip, self._start * frame_seconds, self._last_speech * frame_seconds,
+                       (index + 1) * frame_seconds, truncated, self._onset * frame_seconds)
+
+    def _floor_rose(self, frames):
+        """True (and the utterance dropped) if the last frames never came near the noise floor."""
+        quiet = float(np.percentile(self._levels[-frames:], 5))
+        if quiet <= self.profile.energy_db + MARGIN_DB:
+            return False
+        log.info("noise floor rose", energy_db=round(quiet, 2), was=round(self.profile.energy_db, 2))
+        self.profile.energy_db = quiet
+        self._audio = None
+        return True
+
+
+class EchoGate:
+    """Drops utterances that are the assistant's own voice coming back through
+    the microphone, which would otherwise cut its reply off and run as a command.
+    Frames are marked while the speaker is audible and for ECHO_TAIL_MS after.
+    An utterance that starts in a marked frame is a barge-in, admitted only
+    after the wake word or from the point where it is BARGE_IN_MARGIN_DB louder
+    than the echo (the assistant's speech just before) for BARGE_IN_MS.
+    Utterances that began before the assistant started speaking are the user's
+    and always admitted."""
+
+    def __init__(self, speaker, sample_rate=16000, tail_ms=ECHO_TAIL_MS):
+        self.speaker = speaker  # VoiceSpeaker, or anything with an audible attribute
+        self.frame_length = sample_rate * FRAME_MS // 1000
+        self.tail = tail_ms // FRAME_MS
+        history = (ECHO_HISTORY_MS + MAX_UTTERANCE_MS + PREROLL_MS) // FRAME_MS
+        self._energy = collections.deque(maxlen=history)
+        self._echo = collections.deque(maxlen=history)  # per frame: may hold the assistant's voice
+        self._frames = 0  # frames seen, as the endpointer counts them
+        self._pending = b""
+        self._since_audible = self.tail + 1
+        self.dropped = 0  # utterances not sent for recognition
+
+    def listen(self, pcm):
+        """Feed the same audio as the endpointer, before admitting its segments."""
+        data = self._pending + pcm
+        usable = len(data) - len(data) % (2 * self.frame_length)
+        self._pending = data[usable:]
+        if not usable:
+            return
+        energy, _ = frame_features(np.frombuffer(data[:usable], dtype="<i2"), self.frame_length)
+        audible = self.speaker.audible
+        for level in energy.tolist():
+            self._since_audible = 0 if audible else self._since_audible + 1
+            self._energy.append(level)
+            self._echo.append(self._since_audible <= self.tail)
+        self._frames += len(energy)
+
+    def admit(self, segment, clip, wake=False):
+        """The audio to recognise for a vad.Segment, given what earlier gates kept of
+        it (clip), or None if it is the assistant's voice; wake: it followed the wake word."""
+        first = self._frames - len(self._echo)  # stream index of the oldest frame kept
+        onset = int(round(segment.onset * 1000 / FRAME_MS)) - first
+        if not 0 <= onset < len(self._echo) or not self._echo[onset] or wake:
+            return clip
+        # Speech over the echo merges with it into one utterance, so look for the
+        # first stretch that is clearly louder than the assistant's voice before it
+        end = int(round(segment.speech_end * 1000 / FRAME_MS)) - first
+        energy = np.array(self._energy)
+        echo = np.array(self._echo, dtype=bool)
+        run = BARGE_IN_MS // FRAME_MS
+        history = ECHO_HISTORY_MS // FRAME_MS
+        percentile, median = np.percentile, np.median
+        for i in range(onset, max(onset + 1, end - run + 1)):
+            start = max(0, i - history)
+            before = energy[start:i][echo[start:i]]
+            if len(before) * FRAME_MS < MIN_ECHO_MS:
+                continue
+            level = float(median(energy[i:i + run]))
+            echo_level = float(percentile(before, 90))
+            if level >= echo_level + BARGE_IN_MARGIN_DB:
+                log.info("barge-in over the assistant's voice", energy_db=round(level, 2),
+                         echo_db=round(echo_level, 2))
+                # Keep a little audio from before, as the endpointer's preroll does
+                offset = (first + i - START_MS // FRAME_MS) * FRAME_MS / 1000 - segment.start
+                if offset <= 0:
+                    return clip
+                cut = int(offset * clip.sample_rate) * clip.sample_width
+                return AudioClip(clip.frame_data[cut:], clip.sample_rate, clip.sample_width)
+        self.dropped += 1
+        log.debug("dropped the assistant's own voice", seconds=round(segment.clip.duration, 2))
+        return None
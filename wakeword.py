@@ -0,0 +1,266 @@
+"""
+wakeword.py - On-device "aura" wake-word spotter for the Python voice loop.
+Microphone audio is turned into MFCCs (25 ms windows every 10 ms, 26 mel bands,
+cepstra 1-12) as it streams in and matched against a few recordings of the
+user saying the wake word. Matching is subsequence DTW computed one frame at a
+time: for every template frame it keeps the cheapest alignment of some recent
+stretch of audio ending there, so a wake word is found wherever it starts,
+spoken up to twice as fast or as slowly as the template, with no window search.
+WakeGate sits between the endpointer (vad.py) and the recogniser: an utterance
+that contains the wake word goes on without it, "aura" on its own lets the
+next utterance within AURA_WAKE_WINDOW seconds through, and everything else is
+dropped without a recogniser call.
+Record templates once with: python wakeword.py --enrol [clip.wav ...]
+(without WAVs, say the wake word ENROL_COUNT times into the microphone).
+"""
+import argparse
+import os
+import sys
+
+from lazy import LazyModule
+from logs import get_logger
+from pipeline import AudioClip, read_wav
+from store import DEFAULT_DATA_DIR
+
+np = LazyModule("numpy")
+
+DEFAULT_TEMPLATE_PATH = os.path.join(DEFAULT_DATA_DIR, "wakeword.npz")
+DEFAULT_THRESHOLD = float(os.environ.get('AURA_WAKE_THRESHOLD', 5.0))
+DEFAULT_WINDOW = float(os.environ.get('AURA_WAKE_WINDOW', 5.0))
+
+WINDOW_MS = 25
+HOP_MS = 10
+MEL_BANDS = 26
+CEPSTRA = 12
+FFT_SIZE = 512
+REFRACTORY_SECONDS = 1.0  # one "aura" fires once
+MIN_COMMAND_SECONDS = 0.3  # speech after the wake word needed to count as a command
+ENROL_COUNT = 3
+
+log = get_logger("wakeword")
+
+
+def mel_filterbank(sample_rate, bands=MEL_BANDS, fft_size=FFT_SIZE, low=60.0, high=None):
+    high = high or sample_rate / 2
+    mel = lambda hz: 2595.0 * np.log10(1.0 + hz / 700.0)
+    edges = 700.0 * (10 ** (np.linspace(mel(low), mel(high), bands + 2) / 2595.0) - 1.0)
+    bins = np.fft.rfftfreq(fft_size, 1.0 / sample_rate)
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (centre - lower)
+    falling = (upper - bins) / (upper - centre)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+class MfccFrontEnd:
+    """Streaming MFCCs: feed() takes int16 samples and returns the frames they complete."""
+
+    def __init__(self, sample_rate=16000):
+        self.window = sample_rate * WINDOW_MS // 1000
+        self.hop = sample_rate * HOP_MS // 1000
+        self._hamming = np.hamming(self.window).astype(np.float32)
+        self._mel = mel_filterbank(sample_rate)
+        n = np.arange(MEL_BANDS)
+        self._dct = np.cos(np.pi / MEL_BANDS * (n[None, :] + 0.5) * np.arange(1, CEPSTRA + 1)[:, None]).T
+        self._lifter = 1 + (22 / 2) * np.sin(np.pi * np.arange(1, CEPSTRA + 1) / 22)
+        self._tail = np.zeros(0, dtype=np.float32)  # samples not yet in a whole hop
+        self._last = 0.0  # for pre-emphasis across calls
+
+    def feed(self, samples):
+        """(cepstra, log energy in dB) for each new frame."""
+        x = samples.astype(np.float32)
+        emphasised = np.empty_like(x)
+        if len(x):
+            emphasised[0] = x[0] - 0.97 * self._last
+            emphasised[1:] = x[1:] - 0.97 * x[:-1]
+            self._last = float(x[-1])
+        data = np.concatenate([self._tail, emphasised])
+        if len(data) < self.window:
+            self._tail = data
+            return np.zeros((0, CEPSTRA), np.float32), np.zeros(0, np.float32)
+        count = (len(data) - self.window) // self.hop + 1
+        frames = np.lib.stride_tricks.sliding_window_view(data, self.window)[::self.hop][:count]
+        self._tail = data[count * self.hop:]
+        power = np.abs(np.fft.rfft(frames * self._hamming, FFT_SIZE)) ** 2
+        energy = 10.0 * np.log10(power.sum(axis=1) / (32768.0 ** 2 * self.window) + 1e-12)
+        cepstra = (np.log(power @ self._mel.T + 1e-3) @ self._dct) * self._lifter
+        return cepstra.astype(np.float32), energy.astype(np.float32)
+
+
+def template_from(samples, sample_rate=16000):
+    """MFCCs of a wake-word recording, trimmed to the frames well above its background."""
+    cepstra, energy = MfccFrontEnd(sample_rate).feed(samples)
+    floor = float(np.percentile(energy, 10))
+    loud = np.flatnonzero(energy > max(energy.max() - 30.0, floor + 0.4 * (energy.max() - floor)))
+    if not len(loud):
+        raise ValueError("no speech in the recording")
+    return cepstra[loud[0]:loud[-1] + 1]
+
+
+class WakeWordSpotter:
+    """feed() int16 PCM bytes; returns the end times (seconds from the start) of wake words found."""
+
+    def __init__(self, templates, threshold=DEFAULT_THRESHOLD, sample_rate=16000):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.front = MfccFrontEnd(sample_rate)
+        # All templates side by side, so each frame is one vectorised step for all of them
+        self._templates = np.concatenate(templates).astype(np.float32)
+        starts = np.cumsum([0] + [len(t) for t in templates[:-1]])
+        self._ends = starts + np.array([len(t) for t in templates]) - 1
+        self._first = np.zeros(len(self._templates), bool)
+        self._first[starts] = True
+        self._no_skip = self._first.copy()  # nothing to skip from at a template's first two frames
+        self._no_skip[starts + 1] = True
+        self._cost = np.full(len(self._templates), np.inf, np.float32)
+        self._frames = np.zeros(len(self._templates), np.float32)
+        self._stayed = np.zeros(len(self._templates), bool)
+        self._index = 0  # MFCC frames so far
+        self._quiet_until = -1  # no detections before this frame
+
+    def feed(self, pcm):
+        found = []
+        for score in self.scores(pcm):
+            self._index += 1
+            if score < self.threshold and self._index > self._quiet_until:
+                self._quiet_until = self._index + int(REFRACTORY_SECONDS * 1000 / HOP_MS)
+                found.append(((self._index - 1) * self.front.hop + self.front.window) / self.sample_rate)
+                log.info("wake word", score=round(float(score), 3), at=round(found[-1], 2))
+        return found
+
+    def scores(self, pcm):
+        """Match cost of the best wake word ending at each new frame (lower is closer)."""
+        cepstra, _ = self.front.feed(np.frombuffer(pcm, dtype="<i2"))
+        distances = np.sqrt(((cepstra[:, None, :] - self._templates[None, :, :]) ** 2).sum(axis=2)) / CEPSTRA
+        scores = np.empty(len(distances), np.float32)
+        for i, row in enumerate(distances):
+            self._step(row)
+            scores[i] = (self._cost[self._ends] / self._frames[self._ends]).min()
+        return scores
+
+    def _step(self, distance):
+        # Each audio frame moves along a template by 0, 1 or 2 frames, but never
+        # by 0 twice in a row (so a match spans half to twice the template's
+        # length); a path can start at any audio frame on a template's first frame
+        where, empty_like = np.where, np.empty_like  # once per frame, not per use
+        cost, frames = self._cost, self._frames
+        stay = where(self._stayed, np.inf, cost)
+        one, two = empty_like(cost), empty_like(cost)
+        one[1:], two[2:] = cost[:-1], cost[:-2]
+        one[self._first] = 0.0
+        two[self._no_skip] = np.inf
+        one_frames, two_frames = empty_like(frames), empty_like(frames)
+        one_frames[1:], two_frames[2:] = frames[:-1], frames[:-2]
+        one_frames[self._first] = 0.0
+        step_one = one <= two
+        moved = where(step_one, one, two)
+        stayed = stay < moved
+        self._cost = where(stayed, stay, moved) + distance
+        self._frames = where(stayed, frames, where(step_one, one_frames, two_frames)) + 1.0
+        self._stayed = stayed
+
+
+def load_templates(path=DEFAULT_TEMPLATE_PATH):
+    """The enrolled templates, or None if there are none yet."""
+    try:
+        with np.load(path) as data:
+            return [data[name] for name in sorted(data.files)]
+    except (OSError, ValueError):
+        return None
+
+
+def save_templates(templates, path=DEFAULT_TEMPLATE_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **{f"t{i}": t for i, t in enumerate(templates)})
+    os.replace(tmp, path)
+
+
+def default_spotter():
+    """A spotter for the enrolled templates, or None if the wake word is off or not enrolled."""
+    if os.environ.get('AURA_WAKE_WORD', '1') == '0':
+        return None
+    templates = load_templates()
+    return WakeWordSpotter(templates) if templates else None
+
+
+class WakeGate:
+    """Lets through only utterances addressed to the assistant."""
+
+    def __init__(self, spotter, window=DEFAULT_WINDOW):
+        self.spotter = spotter
+        self.window = window
+        self._detections = []
+        self._armed_until = -1.0
+        self.dropped = 0  # utterances not sent for recognition
+
+    def listen(self, pcm):
+        """Feed the same audio as the endpointer, before admitting its segments."""
+        self._detections.extend(self.spotter.feed(pcm))
+
+    def admit(self, segment):
+        """The audio to recognise for a vad.Segment, or None."""
+        wake = [t for t in self._detections if t <= segment.decided]
+        self._detections = self._detections[len(wake):]
+        wake = [t for t in wake if t >= segment.start]
+        if wake:
+            command = trim_clip(segment.clip, wake[-1] - segment.start)
+            if command.duration - (segment.decided - segment.speech_end) >= MIN_COMMAND_SECONDS:
+                return command
+            self._armed_until = segment.decided + self.window
+            log.info("wake word alone, waiting for the command", seconds=self.window)
+            return None
+        if segment.start <= self._armed_until:
+            self._armed_until = -1.0
+            return segment.clip
+        self.dropped += 1
+        log.debug("not addressed to the assistant", seconds=round(segment.clip.duration, 2))
+        return None
+
+
+def trim_clip(clip, seconds):
+    """The clip without its first seconds."""
+    offset = int(seconds * clip.sample_rate) * clip.sample_width
+    return AudioClip(clip.frame_data[offset:], clip.sample_rate, clip.sample_width)
+
+
+def enrol_from_microphone(count):
+    import speech_recognition as sr
+    from vad import Endpointer, NoiseProfile, FRAME_MS
+
+    endpointer = Endpointer(16000, profile=NoiseProfile.load())
+    clips = []
+    with sr.Microphone(sample_rate=16000, chunk_size=16000 * FRAME_MS // 1000) as source:
+        while len(clips) < count:
+            print(f"Say \"aura\" ({len(clips) + 1}/{count})...")
+            segments = []
+            while not segments:
+                segments = endpointer.feed(source.stream.read(source.CHUNK))
+            clips.append(segments[0].clip)
+    return clips
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record wake-word templates for the voice loop.")
+    parser.add_argument("--enrol", nargs="*", metavar="WAV", required=True,
+                        help="mono 16-bit WAVs of the wake word; none to record from the microphone")
+    parser.add_argument("--count", type=int, default=ENROL_COUNT, help="recordings to take from the microphone")
+    args = parser.parse_args(argv)
+    clips = [read_wav(path) for path in args.enrol] if args.enrol else enrol_from_microphone(args.count)
+    templates = []
+    for clip in clips:
+        if clip.sample_width != 2 or clip.sample_rate != 16000:
+            sys.exit(f"{clip.path}: expected 16-bit 16 kHz audio")
+        templates.append(template_from(np.frombuffer(clip.frame_data, dtype="<i2")))
+    save_templates(templates)
+    print(f"Saved {len(templates)} templates to {DEFAULT_TEMPLATE_PATH}")
+    # Each recording against the others: if they are this far apart, so will be the live wake word
+    for i, clip in enumerate(clips):
+        others = [t for j, t in enumerate(templates) if j != i]
+        if others:
+            score = WakeWordSpotter(others).scores(clip.frame_data).min()
+            note = "" if score < DEFAULT_THRESHOLD else " - above the threshold, consider recording it again"
+            print(f"  recording {i + 1}: {score:.2f} from the others (threshold {DEFAULT_THRESHOLD}){note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+wsserver.py - Async server mode: the Flask API plus a WebSocket command channel.
+Clients keep one WebSocket open at ws://host:5001/ws and send JSON messages
+{"id": ..., "command": ..., "session": optional}; each gets back
+{"id": ..., "response": ..., "jobs": [...]} or {"id": ..., "error": ..., "status": ...}
+with the same id, so many commands can be in flight on one connection; a
+malformed message (bad session, missing command) gets a status 400 error too.
+{"interim": ...} messages carry interim speech transcripts for speculative
+routing (speculate.py); they are answered only if they have an id. The
+event loop only parses and routes messages: CommandProcessor calls block
+(Wikipedia lookups, app launches), so they run on a thread pool and a slow one
+holds up only its own session. Commands for one session run in the order they
+arrived. The session is the ?session= query parameter or aura_session cookie,
+as for HTTP (a connection with neither gets a session of its own, unnamed as
+in server.py: no client can send its id back), and uses the same SessionManager
+as server.py.
+Backpressure: a connection stops reading once AURA_WS_MAX_IN_FLIGHT of its
+commands are unanswered (TCP pushes back on the client), and once
+AURA_WS_MAX_QUEUE commands are waiting server-wide new ones are refused with
+status 503 instead of queueing without bound. AURA_WS_WORKERS sizes the pool
+and AURA_WS_MAX_MESSAGE caps a message in bytes.
+The HTTP API runs alongside on werkzeug's threaded server (no debugger/reloader).
+Run with: python wsserver.py [--host HOST] [--port 5000] [--ws-port 5001]
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlsplit
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from werkzeug.serving import make_server
+
+import metrics
+import server
+from logs import get_logger, new_request_id, request_context
+from sessions import InvalidSessionId, SESSION_ID_RE, new_session_id
+
+DEFAULT_WS_PORT = int(os.environ.get('AURA_WS_PORT', 5001))
+DEFAULT_WORKERS = int(os.environ.get('AURA_WS_WORKERS', 8))
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get('AURA_WS_MAX_IN_FLIGHT', 32))
+DEFAULT_MAX_QUEUE = int(os.environ.get('AURA_WS_MAX_QUEUE', 256))
+DEFAULT_MAX_MESSAGE = int(os.environ.get('AURA_WS_MAX_MESSAGE', 64 * 1024))
+
+log = get_logger("wsserver")
+WS_CONNECTIONS = metrics.gauge("aura_ws_connections_open", "Open WebSocket command channels")
+WS_COMMANDS = metrics.counter("aura_ws_commands_total", "Commands received over WebSocket, by result",
+                              ["result"])
+WS_SECONDS = metrics.histogram("aura_ws_command_duration_seconds",
+                               "Time from receiving a WebSocket command to sending its reply")
+WS_PENDING = metrics.gauge("aura_ws_commands_pending", "WebSocket commands waiting for or running on the pool")
+
+
+class CommandChannel:
+    def __init__(self, sessions, workers=DEFAULT_WORKERS, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 max_queue=DEFAULT_MAX_QUEUE):
+        self.sessions = sessions
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.pending = 0  # only touched on the event loop thread
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="aura-ws")
+
+    async def handle(self, connection):
+        """Serve one WebSocket connection until the client closes it."""
+        default_session = connection_session(connection.request)
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        ordering = {}  # session id -> asyncio.Lock; FIFO, so a session's commands keep their order
+        tasks = set()
+        WS_CONNECTIONS.inc()
+        try:
+            while True:
+                await in_flight.acquire()
+                try:
+                    message = await connection.recv()
+                except ConnectionClosed:
+                    break
+                task = asyncio.create_task(self._reply(connection, message, default_session, ordering, in_flight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            WS_CONNECTIONS.dec()
+            # Let commands already running finish; their replies have nowhere to go
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _reply(self, connection, message, default_session, ordering, in_flight):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            try:
+                result = await self._answer(message, default_session, ordering)
+            except Exception as e:
+                log.error("message failed", exc_info=True)
+                result = {'id': None, 'error': str(e), 'status': 500}
+            if result is None:
+                return
+            WS_COMMANDS.labels(result_label(result)).inc()
+            try:
+                await connection.send(json.dumps(result))
+            except ConnectionClosed:
+                pass
+        finally:
+            in_flight.release()
+            WS_SECONDS.observe(loop.time() - start)
+
+    async def _answer(self, message, default_session, ordering):
+        # default_session: the connection's (session id, named) from connection_session()
+        try:
+            data = json.loads(message)
+        except (TypeError, ValueError):
+            return {'id': None, 'error': 'expected a JSON object', 'status': 400}
+        if not isinstance(data, dict):
+            return {'id': None, 'error': 'expected a JSON object', 'status': 400}
+        rid = data.get('id')
+        if not isinstance(rid, str) or not server.REQUEST_ID_RE.match(rid):
+            rid = new_request_id()
+        session_id, named = default_session
+        if data.get('session'):
+            session_id, named = data['session'], True
+        if not isinstance(session_id, str) or not SESSION_ID_RE.match(session_id):
+            return {'id': rid, 'error': 'invalid session id', 'status': 400}
+        interim = data.get('interim')
+        if isinstance(interim, str) and interim:
+            # Not queued behind the session's commands, and dropped rather than refused when busy
+            if self.pending >= self.max_queue:
+                return None
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._pool, self._interim, session_id, named, interim)
+            return {'id': rid, **result} if 'id' in data else None
+        command = data.get('command')
+        if not isinstance(command, str) or not command:
+            return {'id': rid, 'error': 'no command provided', 'status': 400}
+        if self.pending >= self.max_queue:
+            return {'id': rid, 'error': 'server busy, retry later', 'status': 503}
+        self.pending += 1
+        WS_PENDING.inc()
+        try:
+            lock = ordering.setdefault(session_id, asyncio.Lock())
+            async with lock:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._pool, self._run, rid, session_id, named, command)
+        finally:
+            self.pending -= 1
+            WS_PENDING.dec()
+        return {'id': rid, **result}
+
+    def _run(self, rid, session_id, named, command):
+        # On a pool thread: the request ID does not follow run_in_executor, so set it here
+        with request_context(rid):
+            try:
+                response, jobs = self.sessions.run(session_id, command, named)
+            except InvalidSessionId as e:
+                return {'error': str(e), 'status': 400}
+            except Exception as e:
+                log.error("command failed", exc_info=True, command=command)
+                return {'error': str(e), 'status': 500}
+        result = {'response': response}
+        if jobs:
+            result['jobs'] = jobs
+        return result
+
+    def _interim(self, session_id, named, text):
+        try:
+            session = self.sessions.get(session_id, named)
+        except InvalidSessionId as e:
+            return {'error': str(e), 'status': 400}
+        return {'speculating': session.processor.speculator.interim(text)}
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def result_label(result):
+    if 'error' not in result:
+        return 'ok'
+    return 'rejected' if result['status'] == 503 else 'error'
+
+
+def connection_session(request):
+    """(session id, named) for a connection: ?session=, then the aura_session cookie,
+    as server.current_session_id does; otherwise a new unnamed one, never a shared default."""
+    query = parse_qs(urlsplit(request.path).query)
+    if query.get('session'):
+        return query['session'][0], True
+    cookies = SimpleCookie()
+    try:
+        cookies.load(request.headers.get('Cookie', ''))
+    except Exception:
+        pass
+    if 'aura_session' in cookies:
+        return cookies['aura_session'].value, True
+    return new_session_id(), False
+
+
+def start_http(host, port):
+    """Serve the Flask app on a thread per request; returns the werkzeug server."""
+    http = make_server(host, port, server.app, threaded=True)
+    threading.Thread(target=http.serve_forever, name="aura-http", daemon=True).start()
+    return http
+
+
+def only_ws_path(connection, request):
+    if urlsplit(request.path).path != '/ws':
+        return connection.respond(404, "not found\n")
+    return None
+
+
+async def serve_channel(channel, host, port, max_message=DEFAULT_MAX_MESSAGE, ready=None):
+    # Commands and replies are a few hundred bytes: per-message deflate would cost
+    # more CPU than it saves on the wire
+    async with serve(channel.handle, host, port, process_request=only_ws_path,
+                     max_size=max_message, compression=None) as ws:
+        if ready is not None:
+            ready(ws)
+        await ws.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with a WebSocket command channel.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000, help="HTTP API port (default 5000)")
+    parser.add_argument("--ws-port", type=int, default=DEFAULT_WS_PORT,
+                        help=f"WebSocket port (default {DEFAULT_WS_PORT})")
+    args = parser.parse_args(argv)
+    http = start_http(args.host, args.port)
+    if os.environ.get('AURA_WARM_UP', '1') != '0':
+        server.warm_up_when_listening(args.port)
+    channel = CommandChannel(server.sessions)
+    log.info("listening", http=args.port, ws=args.ws_port)
+    try:
+        asyncio.run(serve_channel(channel, args.host, args.ws_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        channel.close()
+        http.shutdown()
+
+
+if __name__ == '__main__':
+    main()